@@ -1,13 +1,34 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 import os
+import asyncio
+import contextvars
+import functools
 import json
-import subprocess
+import queue
+import threading
+import time
+from concurrent.futures import TimeoutError
+from contextlib import contextmanager
 
-from src.core.tooling.tool_manager import ToolManager
+from src.core.tooling.tool_manager import ConfirmationCallback, ToolManager
+from src.core.tooling.tool_retriever import ToolRetriever
+from src.core.tooling.shell_executor import OutputCallback, ShellExecutor
 from src.core.memory.working_memory_manager import WorkingMemoryManager
 from src.core.memory.long_term_memory_manager import LongTermMemoryManager
 from src.core.memory.thought_process_manager import ThoughtProcessManager
+from src.core.memory.directive_cache import DirectiveCache
+from src.core.memory.procedural_memory import ProceduralMemory
+from src.core.agent.plan_executor import PlanExecutor, is_shareable_step
+from src.core.agent.standing_job import StandingJob
+from src.core.agent.result_compactor import ResultCompactor
+from src.core.agent.deadline import Deadline
+from src.core.agent.prefetcher import ResourcePrefetcher, Warmup
+from src.core.agent.intent_classifier import IntentClassifier
+from src.core.agent.plan_checkpoint import PlanCheckpointer
+from src.core.agent.schemas import REFACTOR_SCHEMA, PLAN_SCHEMA, FUSED_SCHEMA, PLAN_DELTA_SCHEMA, INSIGHT_SCHEMA
+from src.llm_inference.base_llm import LLMProviderInterface
 from src.llm_inference.llm_factory import LLMFactory
+from src.llm_inference.inference_queue import InferenceQueue
 from src.ml_models.ml_model_factory import MLModelFactory
 from src.perception.sensor_factory import SensorFactory
 
@@ -17,43 +38,227 @@ class Agent:
     It orchestrates the Refactor, Break Down, and Compile steps using various managers and tools.
     """
 
+    # Tools whose plan steps always go through user confirmation
+    CONFIRMATION_TOOLS = ("send_alert_notification", "run_shell_command")
+
+    # "standard" runs Refactor and Break Down as separate LLM calls; "fused" produces both from a single generation
+    PIPELINE_MODES = ("standard", "fused")
+
+    # "compact" fits all execution results into one Compile prompt, eliding steps if needed; "map_reduce" compiles
+    # results beyond the compile token budget chunk by chunk and reduces the partial insights into one
+    COMPILE_MODES = ("compact", "map_reduce")
+
+    # Weight of the latest measurement in the moving average of LLM stage latencies
+    STAGE_LATENCY_SMOOTHING = 0.3
+
     def __init__(
         self, 
         session_id: str,
         project_root: str,
         llm_provider_name: str,
-        llm_config: Dict[str, Any]
+        llm_config: Dict[str, Any],
+        max_plan_workers: int = 4,
+        pipeline_mode: str = "standard",
+        directive_cache_config: Optional[Dict[str, Any]] = None,
+        procedural_memory_config: Optional[Dict[str, Any]] = None,
+        compile_token_budget: int = 1024,
+        deadline_stage_shares: Optional[Dict[str, float]] = None,
+        prefetch_config: Optional[Dict[str, Any]] = None,
+        intent_classifier_config: Optional[Dict[str, Any]] = None,
+        compile_mode: str = "compact",
+        checkpoint_config: Optional[Dict[str, Any]] = None,
+        tool_retrieval_config: Optional[Dict[str, Any]] = None,
+        tool_memoization_config: Optional[Dict[str, Any]] = None,
+        confirmation_callback: Optional[ConfirmationCallback] = None,
+        tool_eviction_config: Optional[Dict[str, Any]] = None,
+        shell_config: Optional[Dict[str, Any]] = None,
+        tool_resilience_config: Optional[Dict[str, Any]] = None,
+        shell_output_callback: Optional[OutputCallback] = None
     ):
+        if pipeline_mode not in self.PIPELINE_MODES:
+            raise ValueError(f"Unknown pipeline_mode: {pipeline_mode}. Expected one of {self.PIPELINE_MODES}.")
+        if compile_mode not in self.COMPILE_MODES:
+            raise ValueError(f"Unknown compile_mode: {compile_mode}. Expected one of {self.COMPILE_MODES}.")
         self.session_id = session_id
         self.project_root = project_root
+        self.llm_provider_name = llm_provider_name
+        self.llm_config = llm_config
+        self.max_plan_workers = max_plan_workers
+        self.pipeline_mode = pipeline_mode
+        self.directive_cache_config = directive_cache_config
+        self.procedural_memory_config = procedural_memory_config
+        self.compile_token_budget = compile_token_budget
+        self.compile_mode = compile_mode
+        self.checkpoint_config = checkpoint_config
+        self.tool_retrieval_config = tool_retrieval_config
+        self.tool_memoization_config = tool_memoization_config
+        self.confirmation_callback = confirmation_callback
+        self.tool_eviction_config = tool_eviction_config
+        self.shell_config = shell_config
+        self.shell_output_callback = shell_output_callback
+        self.tool_resilience_config = tool_resilience_config
+        self.deadline_stage_shares = deadline_stage_shares
+        self.prefetch_config = prefetch_config
+        self.intent_classifier_config = intent_classifier_config
+
+        # Memory, tools and the LLM are constructed on first use (or by warmup()), so operations that don't need
+        # the model don't pay for loading it. RLock, since components are built from other components.
+        self._components: Dict[str, Any] = {}
+        self._components_lock = threading.RLock()
 
-        self.long_term_memory = LongTermMemoryManager(os.path.join(project_root, ".severino", "knowledge", "mnemonic.db"))
-        self.working_memory = WorkingMemoryManager(session_id=session_id, project_root=project_root)
         self.thought_process_manager = ThoughtProcessManager(session_id=session_id)
-        self.tool_manager = ToolManager()
+        # Per-directive thought logs for directives processed concurrently (see process_directive_async)
+        self._directive_thoughts: contextvars.ContextVar = contextvars.ContextVar(f"agent_thoughts_{id(self)}", default=None)
+        # Deadline of the directive being processed in the current context, if it has one (see process_directive)
+        self._directive_deadline: contextvars.ContextVar = contextvars.ContextVar(f"agent_deadline_{id(self)}", default=None)
+        # Cancel event of the plan whose step runs in the current context, which kills its shell command (see _run_plan_step)
+        self._step_cancel_event: contextvars.ContextVar = contextvars.ContextVar(f"agent_step_cancel_{id(self)}", default=None)
+        # Moving average of each LLM stage's latency, used to skip stages that would not fit their budget
+        self._stage_latency: Dict[str, float] = {}
+
+    def _component(self, name: str, factory: Callable[[], Any]) -> Any:
+        if name not in self._components:
+            with self._components_lock:
+                if name not in self._components:
+                    self._components[name] = factory()
+        return self._components[name]
+
+    @property
+    def long_term_memory(self) -> LongTermMemoryManager:
+        return self._component("long_term_memory", lambda: LongTermMemoryManager(os.path.join(self.project_root, ".severino", "knowledge", "mnemonic.db")))
+
+    @property
+    def working_memory(self) -> WorkingMemoryManager:
+        # Shares the agent's memory manager instead of opening a second one on the same database
+        return self._component("working_memory", lambda: WorkingMemoryManager(
+            session_id=self.session_id, project_root=self.project_root, long_term_memory_manager=self.long_term_memory))
+
+    @property
+    def tool_manager(self) -> ToolManager:
+        return self._component("tool_manager", self._create_tool_manager)
+
+    @property
+    def directive_cache(self) -> Optional[DirectiveCache]:
+        """
+        Semantic cache of Refactor/Break Down results; None unless configured.
+        """
+        if self.directive_cache_config is None:
+            return None
+        return self._component("directive_cache", lambda: DirectiveCache(self.long_term_memory, self.directive_cache_config))
+
+    @property
+    def procedural_memory(self) -> Optional[ProceduralMemory]:
+        """
+        Plan templates learned from successful executions; None unless configured.
+        """
+        if self.procedural_memory_config is None:
+            return None
+        return self._component("procedural_memory", lambda: ProceduralMemory(self.long_term_memory, self.procedural_memory_config))
+
+    @property
+    def prefetcher(self) -> Optional[ResourcePrefetcher]:
+        """
+        Speculative warmup of sensors and models while the LLM plans; None unless configured.
+        """
+        if self.prefetch_config is None:
+            return None
+        return self._component("prefetcher", lambda: ResourcePrefetcher(
+            self._run_tool_directly, self.prefetch_config, is_available=lambda tool_name: self.tool_manager.get_tool_definition(tool_name) is not None))
+
+    @property
+    def intent_classifier(self) -> Optional[IntentClassifier]:
+        """
+        Deterministic fast path for common directives, ahead of the LLM Refactor step; None unless configured.
+        """
+        if self.intent_classifier_config is None:
+            return None
+        return self._component("intent_classifier", lambda: IntentClassifier(
+            self.intent_classifier_config, tool_lookup=lambda tool_name, factory_type: tool_name in self.tool_manager.get_tool_names(factory_type)))
+
+    @property
+    def plan_checkpointer(self) -> Optional[PlanCheckpointer]:
+        """
+        Checkpoints of plan step results, for resuming interrupted runs; None unless configured.
+        """
+        if self.checkpoint_config is None:
+            return None
+        return self._component("plan_checkpointer", lambda: PlanCheckpointer(self.long_term_memory, self.session_id, self.checkpoint_config))
+
+    @property
+    def tool_retriever(self) -> Optional[ToolRetriever]:
+        """
+        Selects the tools listed in planning prompts; None unless configured, in which case every tool is listed.
+        """
+        if self.tool_retrieval_config is None:
+            return None
+        return self._component("tool_retriever", lambda: ToolRetriever(
+            self.tool_manager, self.tool_retrieval_config, count_tokens=self.llm_provider.count_tokens))
+
+    @property
+    def llm_provider(self) -> LLMProviderInterface:
+        return self._component("llm_provider", self._load_llm_provider)
 
-        # Initialize LLM Provider
-        self.llm_provider = LLMFactory.create_provider(llm_provider_name, "agent_llm", llm_config)
-        if not self.llm_provider.load_llm():
+    @property
+    def inference_queue(self) -> InferenceQueue:
+        # All of the agent's generations go through one queue, so concurrent directives share the loaded model
+        return self._component("inference_queue", lambda: InferenceQueue(self.llm_provider))
+
+    @property
+    def result_compactor(self) -> ResultCompactor:
+        # Execution results are compacted to this many tokens (of the agent's own model) before Compile
+        return self._component("result_compactor", lambda: ResultCompactor(self.llm_provider.count_tokens, token_budget=self.compile_token_budget))
+
+    @property
+    def shell_executor(self) -> ShellExecutor:
+        return self._component("shell_executor", lambda: ShellExecutor(self.shell_config))
+
+    def _load_llm_provider(self) -> LLMProviderInterface:
+        llm_provider = LLMFactory.create_provider(self.llm_provider_name, "agent_llm", self.llm_config)
+        if not llm_provider.load_llm():
             raise RuntimeError("Failed to load LLM provider for the agent.")
+        return llm_provider
 
+    def _create_tool_manager(self) -> ToolManager:
+        tool_manager = ToolManager(memoization_config=self.tool_memoization_config, confirmation_callback=self.confirmation_callback,
+                                   eviction_config=self.tool_eviction_config, resilience_config=self.tool_resilience_config)
         # Register core tools (can be expanded dynamically)
-        self._register_core_tools()
+        self._register_core_tools(tool_manager)
+        return tool_manager
+
+    def warmup(self):
+        """
+        Constructs all components up front and loads the LLM, for long-running processes that would rather
+        pay the startup cost before the first directive. Raises RuntimeError if the LLM fails to load.
+        """
+        for component in ("long_term_memory", "working_memory", "tool_manager", "directive_cache", "procedural_memory",
+                          "prefetcher", "intent_classifier", "plan_checkpointer", "tool_retriever", "inference_queue", "result_compactor"):
+            getattr(self, component)
+
+    @property
+    def thought_process_manager(self) -> ThoughtProcessManager:
+        """
+        The thought log of the directive being processed in the current context.
+        """
+        return self._directive_thoughts.get() or self._thought_process_manager
 
-    def _register_core_tools(self):
+    @thought_process_manager.setter
+    def thought_process_manager(self, thought_process_manager: ThoughtProcessManager):
+        self._thought_process_manager = thought_process_manager
+
+    def _register_core_tools(self, tool_manager: ToolManager):
         # Example: Registering a generic shell command tool
-        self.tool_manager.register_tool(
+        tool_manager.register_tool(
             tool_definition={
                 "name": "run_shell_command",
                 "description": "Executes a shell command.",
-                "parameters": {"command": {"type": "string"}},
+                "parameters": {"command": {"type": "string"}, "timeout_seconds": {"type": "number"}},
                 "side_effects": True
             },
             implementation=self._run_shell_command_impl
         )
 
         # Register the LLM provider itself as a tool for the agent to use
-        self.tool_manager.register_tool(
+        tool_manager.register_tool(
             tool_definition={
                 "name": "agent_llm_inference",
                 "description": """Performs inference using the agent's primary LLM.""",
@@ -66,51 +271,448 @@ class Agent:
                 },
                 "side_effects": False
             },
-            factory_type="llm", factory_name=self.llm_provider.config.get("provider_name", "llama_cpp"), config=self.llm_provider.config
+            factory_type="llm", factory_name=self.llm_config.get("provider_name", "llama_cpp"), config=self.llm_config
         )
 
-    def _run_shell_command_impl(self, command: str) -> Dict[str, Any]:
-        try:
-            result = subprocess.run(command, shell=True, capture_output=True, text=True, check=True)
-            return {"status": "success", "stdout": result.stdout, "stderr": result.stderr}
-        except subprocess.CalledProcessError as e:
-            return {"status": "error", "stdout": e.stdout, "stderr": e.stderr, "message": str(e)}
-        except Exception as e:
-            return {"status": "error", "message": f"Error running command: {e}"}
+    def _run_shell_command_impl(self, command: str, timeout_seconds: Optional[float] = None) -> Dict[str, Any]:
+        return self.shell_executor.run(command, timeout_seconds=timeout_seconds, on_output=self.shell_output_callback,
+                                       cancel_event=self._step_cancel_event.get())
 
-    def process_directive(self, directive: str) -> Dict[str, Any]:
+    def process_directive(self, directive: str, deadline_seconds: Optional[float] = None) -> Dict[str, Any]:
         """
         Processes a high-level user directive through the CAMA Refactor, Break Down, and Compile steps.
+        Args:
+            directive (str): The user directive.
+            deadline_seconds (Optional[float]): Time budget for the whole directive. Each stage gets a share of it
+                (see Deadline); a stage that would exceed its share degrades instead of delaying the insight:
+                Break Down falls back to the deterministic plan skeleton, Execute cancels the steps not yet started,
+                and Compile emits a templated insight. Timings and degradations are recorded in the thought log.
+        """
+        for event in self.process_directive_stream(directive, deadline_seconds=deadline_seconds):
+            if event["type"] == "complete":
+                return {"insight": event["insight"], "thought_log": event["thought_log"]}
+
+    async def process_directive_async(self, directive: str, deadline_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Awaitable variant of process_directive. Several directives can be awaited concurrently on one event loop:
+        each gets its own thought log, LLM calls are serialized through the shared inference queue, and tool calls
+        (sensors, models, shell commands) of different directives run in parallel.
         """
+        return await asyncio.to_thread(self._process_directive_isolated, directive, deadline_seconds)
+
+    def _process_directive_isolated(self, directive: str, deadline_seconds: Optional[float] = None) -> Dict[str, Any]:
+        with self._directive_context(ThoughtProcessManager(session_id=self.session_id)):
+            return self.process_directive(directive, deadline_seconds=deadline_seconds)
+
+    @contextmanager
+    def _directive_context(self, thought_process_manager: ThoughtProcessManager):
+        """
+        Makes the given thought log the current one (see the thought_process_manager property) within the block.
+        """
+        token = self._directive_thoughts.set(thought_process_manager)
+        try:
+            yield thought_process_manager
+        finally:
+            self._directive_thoughts.reset(token)
+
+    def process_directives(self, directives: List[str]) -> List[Dict[str, Any]]:
+        """
+        Processes a batch of directives (e.g., one per camera or model of a monitoring sweep) stage by stage instead
+        of one after another: the Refactor prompts of all directives are evaluated as one batch, directives with the
+        same interpretation share one Break Down, all plans execute together on the shared worker pool with the
+        steps they have in common (e.g., reading the same camera) run once, and the Compile prompts form another batch.
+        Identical directives are processed once.
+        Returns one {'insight', 'thought_log'} dictionary per directive, in order.
+        """
+        unique_directives = list(dict.fromkeys(directives))
+        thoughts = {directive: ThoughtProcessManager(session_id=self.session_id) for directive in unique_directives}
+        planned: Dict[str, Tuple[Dict[str, Any], List[Dict[str, Any]]]] = {}
+
+        # --- Refactor Step (batched) ---
+        to_refactor = []
+        for directive in unique_directives:
+            with self._directive_context(thoughts[directive]):
+                self.thought_process_manager.log_thought("Directive Received", directive, {"directive": directive})
+                if self.prefetcher:
+                    self._prefetch(self.prefetcher.warmups_for_directive(directive), "directive keywords")
+                cached = self._classified_plan(directive) or self._cached_plan(directive)
+                if cached:
+                    planned[directive] = cached
+                elif self.pipeline_mode == "fused":
+                    planned[directive] = self._plan_fused(directive) # Already looked up above
+                else:
+                    to_refactor.append(directive)
+        refactored_batch = self._refactor_directives(to_refactor)
+
+        # --- Break Down Step (once per distinct interpretation) ---
+        plans_by_interpretation: Dict[str, List[Dict[str, Any]]] = {}
+        for directive, refactored_data in zip(to_refactor, refactored_batch):
+            with self._directive_context(thoughts[directive]):
+                self.thought_process_manager.log_thought("Refactor Step", "Directive interpreted and initial data structured.", {"refactored_data": refactored_data})
+                if self.prefetcher:
+                    self._prefetch(self.prefetcher.warmups_for_capabilities(refactored_data.get("required_capabilities", {})), "required capabilities")
+                interpretation_key = json.dumps(refactored_data, sort_keys=True, default=str)
+                if interpretation_key not in plans_by_interpretation:
+                    plans_by_interpretation[interpretation_key] = self._plan_refactored(refactored_data)
+                plan = plans_by_interpretation[interpretation_key]
+                self.thought_process_manager.log_thought("Break Down Step", "Task decomposed into a plan.", {"plan": plan})
+                self._cache_plan(directive, refactored_data, plan)
+                planned[directive] = (refactored_data, plan)
+
+        self._cancel_unused_prefetches([step for directive in unique_directives for step in planned[directive][1]])
+
+        # --- Execute Plans (shared worker pool) ---
+        results_batch = self._execute_plans([planned[directive][1] for directive in unique_directives])
+        for directive, execution_results in zip(unique_directives, results_batch):
+            with self._directive_context(thoughts[directive]):
+                self.thought_process_manager.log_thought("Execution Step", "Plan executed.", {"results": execution_results})
+                self._learn_plan(planned[directive][0], planned[directive][1], execution_results)
+
+        # --- Compile Step (batched) ---
+        insights = self._compile_results_batch(results_batch)
+        outcomes = {}
+        for directive, insight in zip(unique_directives, insights):
+            with self._directive_context(thoughts[directive]):
+                self.thought_process_manager.log_thought("Compile Step", "Results compiled into final insight.", {"insight": insight})
+                outcomes[directive] = {"insight": insight, "thought_log": self.thought_process_manager.get_thought_log()}
+        if insights:
+            self.working_memory.update_session_data("last_insight", insights[-1])
+        return [outcomes[directive] for directive in directives]
+
+    def process_directive_stream(self, directive: str, deadline_seconds: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Processes a directive like process_directive (including its deadline), yielding progress events as soon as they are produced:
+            - {"type": "thought", "entry": ...} for each thought log entry.
+            - {"type": "step_result", "index": int, "result": ...} for each plan step, in completion order.
+            - {"type": "insight", "insight": ...} once the Compile step finishes.
+            - {"type": "complete", "insight": ..., "thought_log": ...} at the end.
+        Closing the generator early cancels the plan steps that haven't started yet.
+        """
+        deadline = Deadline(deadline_seconds, self.deadline_stage_shares) if deadline_seconds is not None else None
+        token = self._directive_deadline.set(deadline)
+        try:
+            yield from self._directive_events(directive, deadline)
+        finally:
+            self._directive_deadline.reset(token)
+
+    def _directive_events(self, directive: str, deadline: Optional[Deadline]) -> Iterator[Dict[str, Any]]:
         self.thought_process_manager.clear_thought_log() # Clear log for new directive
-        self.thought_process_manager.log_thought("Directive Received", directive, {"directive": directive})
+        emitted = 0
 
-        # --- Refactor Step ---
-        refactored_data = self._refactor_directive(directive)
-        self.thought_process_manager.log_thought("Refactor Step", "Directive interpreted and initial data structured.", {"refactored_data": refactored_data})
+        def new_thoughts() -> Iterator[Dict[str, Any]]:
+            nonlocal emitted
+            thought_log = self.thought_process_manager.get_thought_log()
+            for entry in thought_log[emitted:]:
+                yield {"type": "thought", "entry": entry}
+            emitted = len(thought_log)
 
-        # --- Break Down Step ---
-        plan = self._break_down_task(refactored_data)
-        self.thought_process_manager.log_thought("Break Down Step", "Task decomposed into a plan.", {"plan": plan})
+        self.thought_process_manager.log_thought("Directive Received", directive, {"directive": directive})
+        if self.prefetcher:
+            self._prefetch(self.prefetcher.warmups_for_directive(directive), "directive keywords")
+        yield from new_thoughts()
+
+        run = self.plan_checkpointer.find_run(directive) if self.plan_checkpointer else None
+        if run:
+            # An earlier run of this directive was interrupted; resume its plan instead of planning again
+            refactored_data, plan = run["refactored_data"], run["plan"]
+            self.thought_process_manager.log_thought("Plan Resumed", "Resuming the plan of an interrupted run from its checkpoints.", {
+                "run_id": run["run_id"], "refactored_data": refactored_data, "plan": plan
+            })
+            run_id = run["run_id"]
+        else:
+            refactored_data, plan = self._plan_directive(directive)
+            run_id = self.plan_checkpointer.start_run(directive, refactored_data, plan) if self.plan_checkpointer else None
+        self._cancel_unused_prefetches(plan)
+        yield from new_thoughts()
 
         # --- Execute Plan ---
-        execution_results = self._execute_plan(plan)
+        # The plan runs on a background thread so step results can be yielded while later steps are still running
+        step_events: queue.Queue = queue.Queue()
+        cancel_event = threading.Event()
+        execution: Dict[str, Any] = {}
+
+        def run_plan():
+            try:
+                execution["results"] = self._execute_plan(
+                    plan,
+                    on_step_complete=lambda index, step_result: step_events.put({"type": "step_result", "index": index, "result": step_result}),
+                    cancel_event=cancel_event,
+                    checkpoint_run_id=run_id
+                )
+            except Exception as e:
+                execution["error"] = e
+            finally:
+                step_events.put(None)
+
+        threading.Thread(target=run_plan, name="directive_plan", daemon=True).start()
+        execute_started = time.monotonic()
+        execute_budget = deadline.stage_budget("execute") if deadline else None
+        try:
+            while True:
+                try:
+                    # Once the Execute budget is spent, the steps not yet started are cancelled and only running ones are awaited
+                    timeout = None if execute_budget is None or cancel_event.is_set() else max(0.0, execute_started + execute_budget - time.monotonic())
+                    event = step_events.get(timeout=timeout)
+                except queue.Empty:
+                    cancel_event.set()
+                    self._log_degradation("execute", execute_budget, "Execute step exceeded its budget.", "cancelled the steps not yet started")
+                    yield from new_thoughts()
+                    continue
+                if event is None:
+                    break
+                yield event
+        finally:
+            cancel_event.set() # Only has an effect if the consumer stopped iterating mid-plan
+        if "error" in execution:
+            raise execution["error"]
+        execution_results = execution["results"]
+        if deadline:
+            self._log_stage_timing("execute", time.monotonic() - execute_started, execute_budget)
+        if run_id is not None:
+            self.plan_checkpointer.end_run(run_id, execution_results) # Runs interrupted by transient errors stay resumable
         self.thought_process_manager.log_thought("Execution Step", "Plan executed.", {"results": execution_results})
+        self._learn_plan(refactored_data, plan, execution_results)
+        yield from new_thoughts()
 
         # --- Compile Step ---
         final_insight = self._compile_results(execution_results)
         self.thought_process_manager.log_thought("Compile Step", "Results compiled into final insight.", {"insight": final_insight})
+        yield from new_thoughts()
+        yield {"type": "insight", "insight": final_insight}
 
         # Store final insight in working memory or long-term memory if significant
         self.working_memory.update_session_data("last_insight", final_insight)
 
-        return {"insight": final_insight, "thought_log": self.thought_process_manager.get_thought_log()}
+        yield {"type": "complete", "insight": final_insight, "thought_log": self.thought_process_manager.get_thought_log()}
+
+    def _plan_directive(self, directive: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Produces the refactored data and the plan for a directive, from the intent classifier or the directive cache when possible.
+        """
+        cached = self._classified_plan(directive) or self._cached_plan(directive)
+        if cached:
+            return cached
+
+        if self.pipeline_mode == "fused":
+            return self._plan_fused(directive)
+
+        # --- Refactor Step ---
+        refactored_data = self._refactor_directive(directive)
+        self.thought_process_manager.log_thought("Refactor Step", "Directive interpreted and initial data structured.", {"refactored_data": refactored_data})
+        if self.prefetcher:
+            self._prefetch(self.prefetcher.warmups_for_capabilities(refactored_data.get("required_capabilities", {})), "required capabilities")
+
+        # --- Break Down Step ---
+        plan = self._plan_refactored(refactored_data)
+        self.thought_process_manager.log_thought("Break Down Step", "Task decomposed into a plan.", {"plan": plan})
+
+        self._cache_plan(directive, refactored_data, plan)
+        return refactored_data, plan
+
+    def _plan_fused(self, directive: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Refactor and Break Down steps from a single generation, for a directive the classifier and the cache don't know.
+        """
+        refactored_data, plan = self._refactor_and_break_down(directive)
+        self.thought_process_manager.log_thought("Refactor Step", "Directive interpreted and initial data structured.", {"refactored_data": refactored_data})
+        self.thought_process_manager.log_thought("Break Down Step", "Task decomposed into a plan.", {"plan": plan})
+        self._cache_plan(directive, refactored_data, plan)
+        return refactored_data, plan
+
+    def _classified_plan(self, directive: str) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Refactor step without the LLM: returns the refactored data and plan if the directive matches a known intent,
+        or None. Intents without a plan of their own still go through Break Down.
+        """
+        intent = self.intent_classifier.classify(directive) if self.intent_classifier else None
+        if not intent:
+            return None
+        refactored_data = intent["refactored_data"]
+        self.thought_process_manager.log_thought("Intent Fast Path", f"Directive matched the '{intent['intent']}' intent; the LLM Refactor step is skipped.", {
+            "intent": intent["intent"], "planned": intent["plan"] is not None
+        })
+        self.thought_process_manager.log_thought("Refactor Step", "Directive interpreted and initial data structured.", {"refactored_data": refactored_data})
+        if self.prefetcher:
+            self._prefetch(self.prefetcher.warmups_for_capabilities(refactored_data.get("required_capabilities", {})), "required capabilities")
+
+        seconds_saved = self._stage_latency.get("refactor", 0.0)
+        if intent["plan"] is not None:
+            plan = intent["plan"]
+            seconds_saved += self._stage_latency.get("break_down", 0.0)
+        else:
+            plan = self._plan_refactored(refactored_data)
+        self.intent_classifier.record_seconds_saved(seconds_saved)
+        self.thought_process_manager.log_thought("Break Down Step", "Task decomposed into a plan.", {"plan": plan})
+        return refactored_data, plan
+
+    def _cached_plan(self, directive: str) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Returns the refactored data and plan cached for the directive, or None on a miss.
+        """
+        cached = self.directive_cache.lookup(directive) if self.directive_cache else None
+        if not cached:
+            return None
+        self.thought_process_manager.log_thought("Directive Cache Hit", "Reusing refactored data and plan from a previous directive.", {
+            "matched_directive": cached["directive"], "similarity": cached["similarity"],
+            "refactored_data": cached["refactored_data"], "plan": cached["plan"]
+        })
+        return cached["refactored_data"], cached["plan"]
+
+    def _cache_plan(self, directive: str, refactored_data: Dict[str, Any], plan: List[Dict[str, Any]]):
+        # Only cache interpretations and plans the LLM produced cleanly, not fallbacks taken to meet a deadline
+        deadline = self._directive_deadline.get()
+        degraded = deadline is not None and bool(deadline.degraded_stages)
+        if self.directive_cache and not degraded and "interpretation_error" not in refactored_data and not any("error" in step for step in plan):
+            self.directive_cache.store(directive, refactored_data, plan)
+
+    def _plan_refactored(self, refactored_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Break Down step: instantiates a learned plan template if there is one, or plans from scratch.
+        """
+        plan = self._plan_from_procedural_memory(refactored_data)
+        if plan is None:
+            plan = self._break_down_task(refactored_data)
+        return plan
+
+    def _plan_from_procedural_memory(self, refactored_data: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns a plan instantiated from a learned template, or None if there is none for this goal.
+        Exact matches are used as is; similar goals only ask the LLM for the changes to the template.
+        """
+        if not self.procedural_memory or "interpretation_error" in refactored_data:
+            return None
+        found = self.procedural_memory.find_template(refactored_data)
+        if not found:
+            return None
+        self.thought_process_manager.log_thought("Procedural Memory Hit", f"Reusing plan template learned for '{found['template']['goal']}'.", {
+            "match": found["match"], "similarity": found["similarity"], "template_id": found["template"]["template_id"]
+        })
+        if found["match"] == "exact":
+            return found["plan"]
+        return self._adapt_plan_template(refactored_data, found["plan"])
+
+    def _adapt_plan_template(self, refactored_data: Dict[str, Any], base_plan: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Asks the LLM only for the delta between a proven plan and the current goal, instead of a full refined plan.
+        """
+        llm_prompt = f"""Given the goal: '{refactored_data.get("goal", "")}', entities: {refactored_data.get("entities", [])},
+        and this proven plan for a similar goal: {json.dumps(base_plan)},
+        list only the changes needed to fulfill the goal.
+        Output in JSON format with the following keys:
+        - 'remove': (List[int]) Indices of steps to drop.
+        - 'append': (List[Dict]) New steps, each with 'description' and optional 'tool_call'.
+        """
+        response = self._generate_for_stage(("break_down",), llm_prompt, PLAN_DELTA_SCHEMA, max_tokens=250, temperature=0.3,
+                                            fallback="used the proven plan unchanged")
+        delta = response.get("data") if response else None
+        if not isinstance(delta, dict):
+            return base_plan
+        try:
+            removed = set(delta.get("remove", []))
+            return [step for index, step in enumerate(base_plan) if index not in removed] + list(delta.get("append", []))
+        except TypeError:
+            return base_plan
+
+    def _learn_plan(self, refactored_data: Dict[str, Any], plan: List[Dict[str, Any]], execution_results: List[Dict[str, Any]]):
+        """
+        Stores the plan in procedural memory if every step executed successfully.
+        Like _cache_plan, skips plans produced by fallbacks taken to meet a deadline.
+        """
+        if not self.procedural_memory or "interpretation_error" in refactored_data or not plan:
+            return
+        deadline = self._directive_deadline.get()
+        if deadline is not None and deadline.degraded_stages:
+            return
+        if all(result.get("status") in ("executed", "no_tool_call") for result in execution_results):
+            self.procedural_memory.record_success(refactored_data, plan)
+
+    def compile_standing_job(self, directive: str, condition: Callable[[Dict[str, Any]], bool], rate_hz: float = 1.0, **job_options) -> StandingJob:
+        """
+        Plans a directive once and compiles the plan into a StandingJob that runs repeatedly against the sensor
+        stream, re-entering the LLM only when the condition fires. See StandingJob for job_options.
+        """
+        self.thought_process_manager.clear_thought_log()
+        self.thought_process_manager.log_thought("Directive Received", directive, {"directive": directive})
+        refactored_data, plan = self._plan_directive(directive)
+        self._cancel_unused_prefetches(plan)
+
+        tool_definitions = {tool.get("name"): tool for tool in self.tool_manager.get_all_tool_definitions()}
+        job = StandingJob([self._with_default_io(step) for step in plan], condition, self._run_plan_step, self._compile_results,
+                          tool_definitions=tool_definitions, rate_hz=rate_hz, **job_options)
+        self.thought_process_manager.log_thought("Standing Job Compiled", "Plan compiled into a standing job.", {
+            "setup_steps": len(job.setup_steps), "iteration_steps": len(job.iteration_steps),
+            "trigger_steps": len(job.trigger_steps), "rate_hz": rate_hz
+        })
+        return job
+
+    def _generate_for_stage(self, stages: Tuple[str, ...], llm_prompt: str, schema: Dict[str, Any], max_tokens: int,
+                            temperature: float, fallback: str) -> Optional[Dict[str, Any]]:
+        """
+        Runs a stage's schema-constrained generation within the stage's share of the directive deadline, if there is one.
+        Returns None if the stage is degraded instead: its expected latency exceeds the budget, or the generation times out.
+        Args:
+            stages (Tuple[str, ...]): The stages the generation performs (see Deadline.STAGES).
+            fallback (str): What the caller does instead, recorded in the thought log when degrading.
+        """
+        stage = "+".join(stages)
+        deadline = self._directive_deadline.get()
+        budget = deadline.stage_budget(*stages) if deadline else None
+        expected = self._stage_latency.get(stage)
+        if budget is not None and budget <= 0:
+            self._log_degradation(stage, budget, "No time left before the deadline.", fallback)
+            return None
+        if budget is not None and expected is not None and expected > budget:
+            self._log_degradation(stage, budget, f"Expected latency of {expected:.2f}s exceeds the budget.", fallback)
+            return None
+
+        started = time.monotonic()
+        try:
+            response = self.inference_queue.generate_structured(llm_prompt, schema, max_tokens=max_tokens, temperature=temperature, timeout=budget)
+        except TimeoutError:
+            self._log_degradation(stage, budget, "Generation timed out.", fallback)
+            return None
+        seconds = time.monotonic() - started
+        self._stage_latency[stage] = seconds if expected is None else expected + self.STAGE_LATENCY_SMOOTHING * (seconds - expected)
+        if deadline:
+            self._log_stage_timing(stage, seconds, budget)
+        return response
+
+    def _log_stage_timing(self, stage: str, seconds: float, budget: Optional[float]):
+        self.thought_process_manager.log_thought("Stage Timing", f"{stage} took {seconds:.2f}s.", {
+            "stage": stage, "seconds": seconds, "budget_seconds": budget
+        })
+
+    def _log_degradation(self, stage: str, budget: Optional[float], reason: str, fallback: str):
+        deadline = self._directive_deadline.get()
+        if deadline:
+            deadline.degraded_stages.append(stage)
+        self.thought_process_manager.log_thought("Stage Degraded", f"{reason} The agent {fallback}.", {
+            "stage": stage, "budget_seconds": budget, "reason": reason, "fallback": fallback
+        })
 
     def _refactor_directive(self, directive: str) -> Dict[str, Any]:
         """
         Refactors the user directive into a structured format, identifying goal, entities, context, and required capabilities.
         """
-        llm_prompt = f"""Analyze the following user directive and extract the primary goal, key entities, relevant context, and the types of capabilities (sensors, ML models, actions) that would be needed to fulfill it. 
+        response = self._generate_for_stage(("refactor",), self._refactor_prompt(directive), REFACTOR_SCHEMA, max_tokens=300, temperature=0.2,
+                                            fallback="continued without an interpretation")
+        if response is None:
+            return {"raw_directive": directive, "interpretation_error": "Refactor step skipped to meet the deadline."}
+        return self._parse_refactored(directive, response)
+
+    def _refactor_directives(self, directives: List[str]) -> List[Dict[str, Any]]:
+        """
+        Refactors several directives with one batched evaluation of their Refactor prompts.
+        """
+        if not directives:
+            return []
+        responses = self.inference_queue.generate_structured_batch([self._refactor_prompt(directive) for directive in directives],
+                                                                   REFACTOR_SCHEMA, max_tokens=300, temperature=0.2)
+        return [self._parse_refactored(directive, response) for directive, response in zip(directives, responses)]
+
+    @staticmethod
+    def _refactor_prompt(directive: str) -> str:
+        return f"""Analyze the following user directive and extract the primary goal, key entities, relevant context, and the types of capabilities (sensors, ML models, actions) that would be needed to fulfill it. 
         Output in JSON format with the following keys:
         - 'goal': (str) The main objective.
         - 'entities': (List[str]) List of key objects or subjects.
@@ -119,21 +721,101 @@ class Agent:
 
         Directive: '{directive}'
         """
-        response = self.llm_provider.generate_response(llm_prompt, max_tokens=300, temperature=0.2)
-        try:
-            refactored_data = json.loads(response.get("generated_text", "{}"))
-        except json.JSONDecodeError:
+
+    @staticmethod
+    def _parse_refactored(directive: str, response: Dict[str, Any]) -> Dict[str, Any]:
+        refactored_data = response.get("data")
+        if not isinstance(refactored_data, dict):
             refactored_data = {"raw_directive": directive, "interpretation_error": response.get("generated_text")}
         return refactored_data
 
+    def _refactor_and_break_down(self, directive: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Fused Refactor and Break Down: produces the structured interpretation and the refined plan from one LLM generation
+        against a combined schema. Falls back to the separate Break Down step if the plan part is unusable.
+        """
+        tools = self._tool_catalog(directive)
+        llm_prompt = f"""Analyze the following user directive, then plan the concrete steps needed to fulfill it.
+        Output a single JSON object with the following keys:
+        - 'interpretation': (Dict[str, Any]) An object with the keys:
+            - 'goal': (str) The main objective.
+            - 'entities': (List[str]) List of key objects or subjects.
+            - 'context': (str) Any specific conditions or environmental factors.
+            - 'required_capabilities': (Dict[str, List[str]]) Dictionary where keys are capability types (e.g., 'sensors', 'ml_models', 'actions') and values are lists of specific capabilities (e.g., 'video_camera', 'object_detection', 'send_alert').
+        - 'plan': (List[Dict[str, Any]]) Ordered steps including detailed analysis steps and conditional logic, each with 'description' and optional 'tool_call' ({{'tool_name': str, 'args': dict}}).
+          Steps may also declare 'inputs' (argument name to slot name), 'requires' (slot names) and 'outputs' (slot names).
+
+        Available tools: {tools}
+
+        Directive: '{directive}'
+        """
+        response = self._generate_for_stage(("refactor", "break_down"), llm_prompt, FUSED_SCHEMA, max_tokens=1000, temperature=0.3,
+                                            fallback="continued without an interpretation")
+        if response is None:
+            refactored_data = {"raw_directive": directive, "interpretation_error": "Refactor step skipped to meet the deadline."}
+            return refactored_data, self._plan_skeleton(refactored_data)
+        fused = response.get("data")
+
+        if not isinstance(fused, dict) or not isinstance(fused.get("interpretation"), dict):
+            refactored_data = {"raw_directive": directive, "interpretation_error": response.get("generated_text")}
+            return refactored_data, self._break_down_task(refactored_data)
+
+        refactored_data = fused["interpretation"]
+        plan = fused.get("plan")
+        if not isinstance(plan, list):
+            plan = self._break_down_task(refactored_data)
+        return refactored_data, plan
+
+    def _tool_catalog(self, query: str, required_capabilities: Optional[Dict[str, List[str]]] = None) -> Any:
+        """
+        The tools listed in a planning prompt: the ones relevant to the query if tool retrieval is configured, otherwise all of them.
+        """
+        if self.tool_retriever:
+            return self.tool_retriever.catalog(query, required_capabilities)
+        return [{"name": tool.get("name"), "description": tool.get("description")} for tool in self.tool_manager.get_all_tool_definitions()]
+
     def _break_down_task(self, refactored_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Decomposes the refactored data into a sequence of concrete steps and tool calls.
         This involves LLM-driven planning based on identified goals and capabilities.
+        If the refinement doesn't fit the directive's deadline, the deterministic plan skeleton is used as is.
         """
         # Example: If goal is child safety, plan involves camera, object detection, and alert
         goal = refactored_data.get("goal", "")
         entities = refactored_data.get("entities", [])
+        plan_steps = self._plan_skeleton(refactored_data)
+        # Only tool retrieval adds tools to this prompt, since listing the whole catalog would make it much longer
+        available_tools = ""
+        if self.tool_retriever:
+            tools = self._tool_catalog(f"{goal} {' '.join(str(entity) for entity in entities)}", refactored_data.get("required_capabilities"))
+            available_tools = f"\n\n        Available tools: {tools}"
+
+        # Step 3: LLM-driven analysis (more detailed breakdown)
+        llm_prompt = f"""Given the goal: '{goal}', entities: {entities}, and initial plan steps: {plan_steps},
+        refine this plan to include detailed analysis steps and conditional logic. 
+        For example, if 'child safety' is the goal and 'object_detection' is a capability, 
+        include steps to analyze child's position relative to a 'balcony' and trigger 'send_alert' if dangerous.
+        Output as a JSON list of refined steps, each with 'description' and optional 'tool_call'.
+        Steps may also declare 'inputs' (argument name to slot name), 'requires' (slot names) and 'outputs' (slot names)
+        so that independent steps can run in parallel and results flow to the steps that depend on them.{available_tools}
+        """
+        response = self._generate_for_stage(("break_down",), llm_prompt, PLAN_SCHEMA, max_tokens=700, temperature=0.5,
+                                            fallback="used the deterministic plan skeleton")
+        if response is None:
+            return plan_steps
+        refined_plan = response.get("data")
+        if not isinstance(refined_plan, list):
+            refined_plan = [{
+                "description": "Failed to generate refined plan from LLM.",
+                "error": response.get("generated_text")
+            }]
+        return refined_plan
+
+    @staticmethod
+    def _plan_skeleton(refactored_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Builds the deterministic part of the plan (sensor and ML model steps) from the required capabilities, without the LLM.
+        """
         required_capabilities = refactored_data.get("required_capabilities", {})
 
         plan_steps = []
@@ -150,7 +832,8 @@ class Agent:
                     })
                     plan_steps.append({
                         "description": f"Read frame from {sensor_type}",
-                        "tool_call": {"tool_name": "main_camera_sensor", "args": {"operation": "read_data"}}
+                        "tool_call": {"tool_name": "main_camera_sensor", "args": {"operation": "read_data"}},
+                        "outputs": ["frame"]
                     })
 
         # Step 2: Perform ML inference
@@ -159,111 +842,183 @@ class Agent:
                 if ml_model_type == "object_detection": # Assuming a specific ML model type
                     plan_steps.append({
                         "description": f"Load {ml_model_type} model",
-                        "tool_call": {"tool_name": "object_detection_model", "args": {"operation": "load_model"}}
+                        "tool_call": {"tool_name": "object_detection_model", "args": {"operation": "load_model"}},
+                        "outputs": ["object_detection_model.loaded"]
                     })
                     plan_steps.append({
                         "description": f"Perform {ml_model_type} on frame",
-                        "tool_call": {"tool_name": "object_detection_model", "args": {"operation": "predict", "data": "<frame_placeholder>"}} # Placeholder for actual frame
+                        "tool_call": {"tool_name": "object_detection_model", "args": {"operation": "predict"}},
+                        "inputs": {"data": "frame"}, # The frame is bound from the 'frame' slot at execution time
+                        "requires": ["object_detection_model.loaded"],
+                        "outputs": ["detections"]
                     })
+        return plan_steps
 
-        # Step 3: LLM-driven analysis (more detailed breakdown)
-        llm_prompt = f"""Given the goal: '{goal}', entities: {entities}, and initial plan steps: {plan_steps},
-        refine this plan to include detailed analysis steps and conditional logic. 
-        For example, if 'child safety' is the goal and 'object_detection' is a capability, 
-        include steps to analyze child's position relative to a 'balcony' and trigger 'send_alert' if dangerous.
-        Output as a JSON list of refined steps, each with 'description' and optional 'tool_call'.
+    def _execute_plans(self, plans: List[List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
         """
-        response = self.llm_provider.generate_response(llm_prompt, max_tokens=700, temperature=0.5)
-        try:
-            refined_plan = json.loads(response.get("generated_text", "[]"))
-        except json.JSONDecodeError:
-            refined_plan = [{
-                "description": "Failed to generate refined plan from LLM.",
-                "error": response.get("generated_text")
-            }]
-        return refined_plan
+        Executes several plans together, running the steps they have in common once (see PlanExecutor.merge).
+        """
+        executor = PlanExecutor(self._run_plan_step, max_workers=self.max_plan_workers)
+        return executor.execute_many([[self._with_default_io(step) for step in plan] for plan in plans], is_shareable=self._is_shareable_step)
 
-    def _execute_plan(self, plan: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """
-        Executes the generated plan, calling tools and managing intermediate results.
-        """
-        results = []
-        current_frame = None # To hold the frame read from camera
-        loaded_models = {} # To keep track of loaded models
-
-        for step in plan:
-            step_result = {"step": step.get("description", "Unknown Step"), "status": "executed"}
-            tool_call = step.get("tool_call")
-
-            if tool_call:
-                tool_name = tool_call.get("tool_name")
-                args = tool_call.get("args", {})
-
-                # Handle specific tool operations and pass data between steps
-                if tool_name == "main_camera_sensor":
-                    if args.get("operation") == "read_data":
-                        # Execute the tool to get the frame
-                        frame_result = self.tool_manager.execute_tool(tool_name, args, require_confirmation=False)
-                        if frame_result and frame_result is not None: # Assuming frame_result is the frame itself
-                            current_frame = frame_result
-                            step_result["result"] = "Frame captured."
-                        else:
-                            step_result["status"] = "failed"
-                            step_result["error"] = "Failed to capture frame."
-                    else:
-                        # For connect, release, get_status
-                        result = self.tool_manager.execute_tool(tool_name, args, require_confirmation=False)
-                        step_result["result"] = result
-
-                elif tool_name == "object_detection_model":
-                    if args.get("operation") == "load_model":
-                        load_result = self.tool_manager.execute_tool(tool_name, args, require_confirmation=False)
-                        if load_result: # Assuming load_model returns True on success
-                            loaded_models["object_detection_model"] = True
-                            step_result["result"] = "Model loaded."
-                        else:
-                            step_result["status"] = "failed"
-                            step_result["error"] = "Failed to load model."
-                    elif args.get("operation") == "predict":
-                        if current_frame is not None and loaded_models.get("object_detection_model"):
-                            # Replace placeholder with actual frame
-                            predict_args = args.copy()
-                            predict_args["data"] = current_frame
-                            detections = self.tool_manager.execute_tool(tool_name, predict_args, require_confirmation=False)
-                            step_result["result"] = {"detections": detections}
-                        else:
-                            step_result["status"] = "skipped"
-                            step_result["error"] = "No frame or model not loaded for prediction."
-
-                elif tool_name == "send_alert_notification": # Example action tool
-                    payload = args.get("payload", {})
-                    alert_result = self.tool_manager.execute_tool(tool_name, {"payload": payload}, require_confirmation=True)
-                    step_result["result"] = alert_result
-
-                elif tool_name == "run_shell_command": # Generic shell command
-                    command = args.get("command")
-                    shell_result = self.tool_manager.execute_tool(tool_name, {"command": command}, require_confirmation=True)
-                    step_result["result"] = shell_result
+    def _is_shareable_step(self, step: Dict[str, Any]) -> bool:
+        # Calls with side effects run once per plan, even if several plans make them
+        tool_name = (step.get("tool_call") or {}).get("tool_name")
+        tool_definition = self.tool_manager.get_tool_definition(tool_name) if tool_name else None
+        return bool(tool_definition) and not tool_definition.get("side_effects", False) and is_shareable_step(step)
 
-                else:
-                    # Fallback for other tools
-                    try:
-                        generic_result = self.tool_manager.execute_tool(tool_name, args, require_confirmation=False)
-                        step_result["result"] = generic_result
-                    except Exception as e:
-                        step_result["status"] = "error"
-                        step_result["error"] = str(e)
-            else:
-                step_result["status"] = "no_tool_call"
-
-            results.append(step_result)
-        return results
+    def _execute_plan(self, plan: List[Dict[str, Any]], on_step_complete: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                      cancel_event: Optional[threading.Event] = None, checkpoint_run_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Executes the generated plan as a dependency graph, passing intermediate results between steps through named slots.
+        With a checkpoint_run_id, step results are checkpointed and restored from the run's checkpoints (see PlanCheckpointer).
+        """
+        step_runner = self._run_plan_step
+        if cancel_event is not None:
+            step_runner = functools.partial(step_runner, cancel_event=cancel_event)
+        if checkpoint_run_id is not None:
+            step_runner = self.plan_checkpointer.wrap(checkpoint_run_id, step_runner)
+        executor = PlanExecutor(step_runner, max_workers=self.max_plan_workers)
+        return executor.execute([self._with_default_io(step) for step in plan], on_step_complete=on_step_complete, cancel_event=cancel_event)
+
+    @staticmethod
+    def _with_default_io(step: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fills in slot declarations for steps that don't declare their own (e.g., LLM-refined plans),
+        so that frames and loaded models flow between sensor and model steps.
+        """
+        tool_call = step.get("tool_call")
+        if not tool_call or "inputs" in step or "outputs" in step or "requires" in step:
+            return step
+        tool_name = tool_call.get("tool_name")
+        args = tool_call.get("args", {})
+        operation = args.get("operation")
+        step = dict(step)
+        if operation == "read_data":
+            step["outputs"] = ["frame"]
+        elif operation == "load_model":
+            step["outputs"] = [f"{tool_name}.loaded"]
+        elif operation == "predict":
+            step["requires"] = [f"{tool_name}.loaded"]
+            step["outputs"] = ["detections"]
+            if isinstance(args.get("data"), str):
+                step["inputs"] = {"data": "frame"}
+        return step
+
+    def _run_tool_directly(self, tool_name: str, args: Dict[str, Any]) -> Any:
+        return self.tool_manager.execute_tool(tool_name, dict(args), require_confirmation=False)
+
+    def _prefetch(self, warmups: List[Warmup], source: str):
+        started = self.prefetcher.prefetch(warmups)
+        if started:
+            self.thought_process_manager.log_thought("Speculative Prefetch", f"Warming up resources hinted by the {source}.", {
+                "warmups": [{"tool_name": tool_name, "operation": operation} for tool_name, operation in started]
+            })
+
+    def _cancel_unused_prefetches(self, plan: List[Dict[str, Any]]):
+        if not self.prefetcher:
+            return
+        unused = self.prefetcher.cancel_unused(plan)
+        if unused:
+            self.thought_process_manager.log_thought("Prefetch Cancelled", "The plan doesn't use some prefetched resources.", {
+                "warmups": [{"tool_name": tool_name, "operation": operation} for tool_name, operation in unused]
+            })
+
+    def _run_plan_step(self, tool_name: str, args: Dict[str, Any], cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Executes a single plan step's tool call. Runs on the plan executor's worker pool.
+        Returns a partial step result; 'output' carries the value published to the step's output slots.
+        Setting the plan's cancel_event kills a shell command the step is running.
+        """
+        operation = args.get("operation")
+
+        if tool_name in self.CONFIRMATION_TOOLS:
+            if tool_name == "send_alert_notification":
+                args = {"payload": args.get("payload", {})}
+            elif tool_name == "run_shell_command":
+                args = {key: args[key] for key in ("command", "timeout_seconds") if key in args}
+            # The tool manager shows one confirmation prompt at a time; confirmed commands and alerts then run concurrently
+            token = self._step_cancel_event.set(cancel_event)
+            try:
+                result = self.tool_manager.execute_tool(tool_name, args, require_confirmation=True)
+            finally:
+                self._step_cancel_event.reset(token)
+            return self._confirmed_step_result(result)
+
+        prefetched = self.prefetcher.claim(tool_name, operation) if self.prefetcher else None
+        if prefetched is not None:
+            result = prefetched.result() # Started during planning; usually done by now
+        else:
+            result = self.tool_manager.execute_tool(tool_name, args, require_confirmation=False)
+        if operation == "read_data":
+            if result is None:
+                return {"status": "failed", "error": "Failed to capture frame."}
+            return {"result": "Frame captured.", "output": result}
+        if operation == "load_model":
+            if not result: # load_model returns True on success
+                return {"status": "failed", "error": "Failed to load model."}
+            return {"result": "Model loaded.", "output": True}
+        if operation == "predict":
+            return {"result": {"detections": result}, "output": result}
+        return {"result": result, "output": result}
+
+    @staticmethod
+    def _confirmed_step_result(result: Any) -> Dict[str, Any]:
+        """
+        Maps the result of a shell command or alert to a step result: declined or killed calls are 'cancelled', and
+        errors, timeouts and non-zero exit codes are 'failed', so dependent steps don't run on their output.
+        """
+        if not isinstance(result, dict):
+            return {"result": result, "output": result}
+        if result.get("status") == "cancelled":
+            return {"status": "cancelled", "result": result, "error": result.get("message", "Cancelled.")}
+        returncode = result.get("returncode")
+        if result.get("status") == "error" or result.get("timed_out") or (returncode is not None and returncode != 0):
+            return {"status": "failed", "result": result, "error": result.get("message", f"Exited with status {returncode}.")}
+        return {"result": result, "output": result}
 
     def _compile_results(self, execution_results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Synthesizes the execution results into a concise and actionable insight.
+        The results are compacted to the compile token budget first, so large detection lists or
+        command outputs don't overflow the context window. In map_reduce mode, results beyond the budget are compiled
+        chunk by chunk instead.
+        """
+        if self.compile_mode == "map_reduce":
+            chunks = self.result_compactor.partition(execution_results)
+            if len(chunks) > 1:
+                return self._map_reduce_compile(chunks)
+        response = self._generate_for_stage(("compile",), self._compile_prompt(execution_results), INSIGHT_SCHEMA, max_tokens=500, temperature=0.3,
+                                            fallback="emitted a templated insight")
+        if response is None:
+            return self._template_insight(execution_results)
+        return self._parse_insight(execution_results, response)
+
+    def _compile_results_batch(self, execution_results_batch: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Compiles the results of several plans with one batched evaluation of their Compile prompts.
+        In map_reduce mode, plans whose results exceed the compile token budget are compiled chunk by chunk afterwards.
         """
-        llm_prompt = f"""Given the following execution results from a task: {json.dumps(execution_results, indent=2)}
+        if not execution_results_batch:
+            return []
+        if self.compile_mode == "map_reduce":
+            chunks_batch = [self.result_compactor.partition(results) for results in execution_results_batch]
+            fitting = [index for index, chunks in enumerate(chunks_batch) if len(chunks) <= 1]
+            if len(fitting) < len(execution_results_batch):
+                insights = dict(zip(fitting, self._compile_prompts_batch([execution_results_batch[index] for index in fitting])))
+                return [insights[index] if index in insights else self._map_reduce_compile(chunks) for index, chunks in enumerate(chunks_batch)]
+        return self._compile_prompts_batch(execution_results_batch)
+
+    def _compile_prompts_batch(self, execution_results_batch: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        if not execution_results_batch:
+            return []
+        responses = self.inference_queue.generate_structured_batch([self._compile_prompt(results) for results in execution_results_batch],
+                                                                   INSIGHT_SCHEMA, max_tokens=500, temperature=0.3)
+        return [self._parse_insight(results, response) for results, response in zip(execution_results_batch, responses)]
+
+    def _compile_prompt(self, execution_results: List[Dict[str, Any]]) -> str:
+        compacted = self.result_compactor.compact(execution_results)
+        return f"""Given the following execution results from a task: {ResultCompactor.serialize(compacted["results"])}
         
         Synthesize a concise and actionable insight. Focus on:
         - A brief summary of what was achieved.
@@ -275,9 +1030,100 @@ class Agent:
         - 'key_findings': (List[str]) Important observations.
         - 'recommendations': (List[str]) Actionable suggestions.
         """
-        response = self.llm_provider.generate_response(llm_prompt, max_tokens=500, temperature=0.3)
-        try:
-            insight = json.loads(response.get("generated_text", "{}"))
-        except json.JSONDecodeError:
+
+    def _map_reduce_compile(self, chunks: List[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Hierarchical Compile: the chunks are compiled into partial insights as one batch (map), then partial insights are
+        combined group by group, each group fitting the compile token budget, until one insight is left (reduce).
+        Every batch runs only while the Compile budget of the directive deadline lasts: once it is spent, a templated
+        insight is emitted instead of the map, and the partial insights are merged without the LLM instead of further reduces.
+        """
+        execution_results = [result for chunk in chunks for result in chunk]
+        if self._compile_budget_spent("emitted a templated insight"):
+            return self._template_insight(execution_results)
+
+        insights = self._compile_prompts_batch(chunks)
+        self.thought_process_manager.log_thought("Compile Map", f"Compiled {len(execution_results)} execution results in {len(chunks)} chunks.", {
+            "steps_per_chunk": [len(chunk) for chunk in chunks]
+        })
+        while True:
+            groups = self.result_compactor.partition(insights)
+            if len(groups) == 1:
+                break
+            if len(groups) == len(insights):
+                # Every partial insight fills the budget on its own; combine them pairwise so the reduction still converges
+                groups = [insights[index:index + 2] for index in range(0, len(insights), 2)]
+            if self._compile_budget_spent("merged the partial insights without the LLM"):
+                return self._merge_insights(insights)
+            reducible = [group for group in groups if len(group) > 1]
+            responses = self.inference_queue.generate_structured_batch([self._reduce_prompt(group) for group in reducible],
+                                                                       INSIGHT_SCHEMA, max_tokens=500, temperature=0.3)
+            reduced = iter([self._parse_insight(group, response) for group, response in zip(reducible, responses)])
+            insights = [next(reduced) if len(group) > 1 else group[0] for group in groups]
+
+        response = self._generate_for_stage(("compile",), self._reduce_prompt(insights), INSIGHT_SCHEMA, max_tokens=500, temperature=0.3,
+                                            fallback="merged the partial insights without the LLM")
+        if response is None:
+            return self._merge_insights(insights)
+        return self._parse_insight(insights, response)
+
+    def _compile_budget_spent(self, fallback: str) -> bool:
+        deadline = self._directive_deadline.get()
+        if deadline is None or deadline.stage_budget("compile") > 0:
+            return False
+        self._log_degradation("compile", 0.0, "No time left before the deadline.", fallback)
+        return True
+
+    def _reduce_prompt(self, insights: List[Dict[str, Any]]) -> str:
+        compacted = self.result_compactor.compact(insights)
+        return f"""Given the following partial insights, each compiled from a part of the execution results of one task: {ResultCompactor.serialize(compacted["results"])}
+        
+        Combine them into one concise and actionable insight. Merge duplicate findings and recommendations, and keep the most important ones.
+        
+        Output in JSON format with the following keys:
+        - 'summary': (str) A brief overview of the whole task.
+        - 'key_findings': (List[str]) Important observations.
+        - 'recommendations': (List[str]) Actionable suggestions.
+        """
+
+    @staticmethod
+    def _merge_insights(insights: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Combines partial insights without the LLM: summaries are joined, findings and recommendations deduplicated.
+        """
+        return {
+            "summary": " ".join(str(insight.get("summary", "")) for insight in insights if insight.get("summary")),
+            "key_findings": list(dict.fromkeys(finding for insight in insights for finding in insight.get("key_findings", []))),
+            "recommendations": list(dict.fromkeys(recommendation for insight in insights for recommendation in insight.get("recommendations", []))),
+            "degraded": True
+        }
+
+    @staticmethod
+    def _parse_insight(execution_results: List[Dict[str, Any]], response: Dict[str, Any]) -> Dict[str, Any]:
+        insight = response.get("data")
+        if not isinstance(insight, dict):
             insight = {"raw_results": execution_results, "compilation_error": response.get("generated_text")}
-        return insight
\ No newline at end of file
+        return insight
+
+    @staticmethod
+    def _template_insight(execution_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Builds an insight from the execution results without the LLM, for when Compile doesn't fit the deadline.
+        """
+        executed = [r for r in execution_results if r.get("status") in ("executed", "no_tool_call")]
+        unsuccessful = [r for r in execution_results if r.get("status") not in ("executed", "no_tool_call")]
+        key_findings = []
+        for result in executed:
+            output = result.get("result")
+            detections = output.get("detections") if isinstance(output, dict) else None
+            if isinstance(detections, list) and detections:
+                by_class = ResultCompactor.summarize_detections(detections)["by_class"]
+                key_findings.append(f"{result.get('step', 'A step')}: " + ", ".join(
+                    f"{summary['count']} {class_name} (max confidence {summary['max_confidence']:.2f})" for class_name, summary in by_class.items()))
+        key_findings += [f"{r.get('step', 'A step')}: {r.get('status')}" + (f" ({r['error']})" if r.get("error") else "") for r in unsuccessful]
+        return {
+            "summary": f"{len(executed)} of {len(execution_results)} plan steps completed. This insight was generated from a template to meet the deadline.",
+            "key_findings": key_findings,
+            "recommendations": ["Review the steps that did not complete."] if unsuccessful else [],
+            "degraded": True
+        }
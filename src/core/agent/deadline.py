@@ -0,0 +1,42 @@
+from typing import Dict, List, Optional
+import time
+
+class Deadline:
+    """
+    Time budget of a single directive, split into sub-budgets for the CAMA stages.
+    A stage's budget is its share of the time remaining when the stage starts, relative to the shares of the
+    stages still to run, so time left over by a fast stage carries over to the later ones.
+    """
+
+    STAGES = ("refactor", "break_down", "execute", "compile")
+    DEFAULT_STAGE_SHARES = {"refactor": 0.2, "break_down": 0.25, "execute": 0.35, "compile": 0.2}
+
+    def __init__(self, seconds: float, stage_shares: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            seconds (float): Total time budget, starting now.
+            stage_shares (Optional[Dict[str, float]]): Relative shares of the stages, overriding DEFAULT_STAGE_SHARES.
+        """
+        self.seconds = seconds
+        self.stage_shares = {**self.DEFAULT_STAGE_SHARES, **(stage_shares or {})}
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds
+        self.degraded_stages: List[str] = [] # Stages that fell back to a deterministic result
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def stage_budget(self, *stages: str) -> float:
+        """
+        Returns the seconds available to the given stages (several for fused stages, e.g. 'refactor' and 'break_down').
+        """
+        first = min(self.STAGES.index(stage) for stage in stages)
+        pending = sum(self.stage_shares[stage] for stage in self.STAGES[first:])
+        share = sum(self.stage_shares[stage] for stage in stages)
+        return self.remaining() * share / pending if pending > 0 else self.remaining()
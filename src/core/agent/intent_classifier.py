@@ -0,0 +1,177 @@
+from typing import Any, Callable, Dict, List, Optional
+import copy
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Custom matchers map a normalized directive to {'refactored_data': ..., optional 'plan': ...}, or None
+IntentMatcher = Callable[[str], Optional[Dict[str, Any]]]
+
+# Tells whether a tool with the given name was registered by the given factory type (e.g., 'sensor')
+ToolLookup = Callable[[str, str], bool]
+
+# Rules for directives the agent sees all the time. Named groups of the patterns fill the {placeholders} of
+# 'refactored_data' and 'plan'; rules without a 'plan' still go through Break Down. 'tools' binds further
+# placeholders of the plan to the first registered tool among candidate names, built from the groups as identifiers.
+DEFAULT_INTENT_RULES: List[Dict[str, Any]] = [
+    {
+        "name": "check_camera",
+        "patterns": [
+            r"^(?:check|show|view|look at)\s+(?:the\s+)?camera\s+(?P<camera>[\w-]+)$",
+            r"^(?:check|show|view|look at)\s+(?:the\s+)?(?P<camera>[\w-]+(?:\s[\w-]+)?)\s+camera$",
+        ],
+        "refactored_data": {
+            "goal": "check camera",
+            "entities": ["{camera}"],
+            "context": "",
+            "required_capabilities": {"sensors": ["video_camera"]}
+        },
+        "tools": {
+            "camera_tool": {"factory_type": "sensor", "candidates": ["{camera}_camera_sensor", "{camera}_camera", "{camera}"]}
+        },
+        "plan": [
+            {"description": "Connect to camera {camera}",
+             "tool_call": {"tool_name": "{camera_tool}", "args": {"operation": "connect"}}},
+            {"description": "Read frame from camera {camera}",
+             "tool_call": {"tool_name": "{camera_tool}", "args": {"operation": "read_data"}}, "outputs": ["frame"]},
+            {"description": "Get status of camera {camera}",
+             "tool_call": {"tool_name": "{camera_tool}", "args": {"operation": "get_status"}}},
+        ]
+    },
+    {
+        "name": "summarize_drift_report",
+        "patterns": [
+            r"^(?:summarize|summarise|explain)\s+(?:the\s+)?drift\s+report\s+(?P<report>\S+)$",
+            r"^(?:summarize|summarise|explain)\s+(?:the\s+)?(?P<report>\S+)\s+drift\s+report$",
+        ],
+        "refactored_data": {
+            "goal": "summarize drift report",
+            "entities": ["{report}"],
+            "context": "",
+            "required_capabilities": {"actions": ["read_report", "summarize"]}
+        }
+    },
+]
+
+class IntentClassifier:
+    """
+    Deterministic fast path ahead of the LLM Refactor step. Directives matching a known intent are turned into
+    the same refactored data the LLM would produce (and, for some intents, a ready-made plan) with regular
+    expressions or custom matchers, in microseconds. Anything else falls back to the LLM.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, tool_lookup: Optional[ToolLookup] = None):
+        """
+        Args:
+            config (Optional[Dict[str, Any]]): 'rules' (List[Dict]) tried before the defaults, and
+                'include_default_rules' (default True).
+            tool_lookup (Optional[ToolLookup]): Resolves the 'tools' of rules. Without it, rules with tools
+                return no plan.
+        """
+        config = config or {}
+        self.tool_lookup = tool_lookup
+        self._rules: List[Dict[str, Any]] = []
+        self._matchers: List[IntentMatcher] = []
+        for rule in config.get("rules", []) + (DEFAULT_INTENT_RULES if config.get("include_default_rules", True) else []):
+            self.add_rule(rule)
+        self._stats = {"matches": 0, "misses": 0, "classify_seconds": 0.0, "estimated_seconds_saved": 0.0}
+        self._matches_by_intent: Dict[str, int] = {}
+
+    def add_rule(self, rule: Dict[str, Any]):
+        """
+        Adds a rule: {'name', 'patterns' (regular expressions matched against the normalized directive),
+        'refactored_data', optional 'plan' and optional 'tools' ({placeholder: {'factory_type', 'candidates'}})}.
+        Rules are tried in the order they were added.
+        """
+        if not rule.get("name") or not rule.get("patterns") or "refactored_data" not in rule:
+            raise ValueError("Intent rules need a 'name', 'patterns' and 'refactored_data'.")
+        self._rules.append({**rule, "compiled": [re.compile(pattern, re.IGNORECASE) for pattern in rule["patterns"]]})
+
+    def add_matcher(self, name: str, matcher: IntentMatcher):
+        """
+        Adds a custom matcher, tried after the rules.
+        """
+        self._matchers.append(lambda directive: self._named(name, matcher(directive)))
+
+    @staticmethod
+    def _named(name: str, match: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        return {**match, "intent": name} if match else None
+
+    @staticmethod
+    def normalize(directive: str) -> str:
+        return re.sub(r"\s+", " ", directive.strip()).rstrip(".!?")
+
+    @staticmethod
+    def _fill(value: Any, groups: Dict[str, str]) -> Any:
+        if isinstance(value, str):
+            # Unlike str.format, leaves unknown placeholders and literal braces (e.g., JSON in a command) as they are
+            return re.sub(r"\{(\w+)\}", lambda match: groups.get(match.group(1), match.group(0)), value)
+        if isinstance(value, list):
+            return [IntentClassifier._fill(item, groups) for item in value]
+        if isinstance(value, dict):
+            return {key: IntentClassifier._fill(item, groups) for key, item in value.items()}
+        return copy.deepcopy(value)
+
+    def _match_rules(self, directive: str) -> Optional[Dict[str, Any]]:
+        for rule in self._rules:
+            for pattern in rule["compiled"]:
+                match = pattern.match(directive)
+                if match:
+                    groups = {key: value.strip() for key, value in match.groupdict().items() if value is not None}
+                    tools = self._resolve_tools(rule, groups) if rule.get("plan") is not None else None
+                    return {
+                        "intent": rule["name"],
+                        "refactored_data": self._fill(rule["refactored_data"], groups),
+                        "plan": self._fill(rule["plan"], {**groups, **tools}) if tools is not None else None
+                    }
+        return None
+
+    def _resolve_tools(self, rule: Dict[str, Any], groups: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """
+        Binds each of the rule's tool placeholders to a registered tool; None if one can't be bound, so that the
+        directive goes through Break Down instead of running a plan against the wrong tool.
+        """
+        identifiers = {key: re.sub(r"\W+", "_", value).strip("_").lower() for key, value in groups.items()}
+        tools = {}
+        for placeholder, spec in rule.get("tools", {}).items():
+            candidates = [self._fill(candidate, identifiers) for candidate in spec.get("candidates", [])]
+            tool_name = next((candidate for candidate in candidates
+                              if self.tool_lookup and self.tool_lookup(candidate, spec.get("factory_type"))), None)
+            if tool_name is None:
+                logger.debug("Intent '%s' matched, but no registered tool fits '%s'.", rule["name"], placeholder)
+                return None
+            tools[placeholder] = tool_name
+        return tools
+
+    def classify(self, directive: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns {'intent', 'refactored_data', 'plan' (None if Break Down is still needed)} for a recognized directive, or None.
+        """
+        started = time.perf_counter()
+        normalized = self.normalize(directive)
+        result = self._match_rules(normalized)
+        for matcher in self._matchers:
+            if result:
+                break
+            result = matcher(normalized)
+        self._stats["classify_seconds"] += time.perf_counter() - started
+        if result:
+            result.setdefault("plan", None)
+            self._stats["matches"] += 1
+            self._matches_by_intent[result["intent"]] = self._matches_by_intent.get(result["intent"], 0) + 1
+        else:
+            self._stats["misses"] += 1
+        return result
+
+    def record_seconds_saved(self, seconds: float):
+        """
+        Adds the LLM time a match made unnecessary (estimated by the caller from its stage latencies) to the stats.
+        """
+        self._stats["estimated_seconds_saved"] += seconds
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._stats["matches"] + self._stats["misses"]
+        return {**self._stats, "match_rate": self._stats["matches"] / lookups if lookups else 0.0,
+                "matches_by_intent": dict(self._matches_by_intent)}
@@ -0,0 +1,170 @@
+from typing import Any, Callable, Dict, List, Optional, Set
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from src.core.memory.long_term_memory_manager import LongTermMemoryManager
+
+logger = logging.getLogger(__name__)
+
+StepRunner = Callable[[str, Dict[str, Any]], Dict[str, Any]]
+
+# Operations whose effect lives in the process (open streams, loaded models) or whose result is stale right away;
+# they are always re-run on resume
+VOLATILE_OPERATIONS = ("connect", "load_model", "load_llm", "release", "read_data", "get_status")
+
+# Errors of steps that may well succeed when the run is resumed; any other error, or a step that reports it
+# failed (other than a tool call that was killed or timed out), means resuming would only repeat the failure
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError, InterruptedError)
+
+class PlanCheckpointer:
+    """
+    Checkpoints plan step results to the session store as each step finishes, so a run interrupted by a crash
+    or Ctrl-C can be resumed without redoing completed tool calls (e.g., long shell commands).
+
+    A run records the directive's refactored data and plan; processing the same directive again in the same
+    session reuses that plan and restores the result of every step whose tool call and bound arguments have the
+    same checksum as a checkpointed one. Checkpoints expire after a TTL. Runs are dropped once they complete, and
+    also when a step fails for a reason other than an interruption (see TRANSIENT_ERRORS), so the directive is
+    planned again instead of resuming a plan that can't succeed. Only completed work is checkpointed: volatile
+    operations, tool calls that didn't succeed (e.g., a shell command killed at the deadline) and results that
+    aren't JSON-serializable are not.
+    """
+
+    def __init__(self, long_term_memory: LongTermMemoryManager, session_id: str, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            long_term_memory (LongTermMemoryManager): The store in which runs and checkpoints are persisted.
+            session_id (str): Runs are only resumed within the session that started them.
+            config (Optional[Dict[str, Any]]): 'ttl_seconds' (default 3600) after which runs and checkpoints are invalid.
+        """
+        config = config or {}
+        self.long_term_memory = long_term_memory
+        self.session_id = session_id
+        self.ttl_seconds = config.get("ttl_seconds", 3600)
+        self._stats = {"checkpointed": 0, "restored": 0, "resumed_runs": 0, "dropped_runs": 0}
+        self._stats_lock = threading.Lock()
+        self._failed_runs: Set[int] = set() # Runs with a step that failed for a non-transient reason
+
+    @staticmethod
+    def directive_key(directive: str) -> str:
+        return " ".join(directive.strip().lower().split()).rstrip(".!?")
+
+    @staticmethod
+    def checksum(value: Any) -> Optional[str]:
+        """
+        Returns a checksum of a JSON-serializable value, or None if it isn't serializable.
+        """
+        try:
+            return hashlib.sha256(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()
+        except (TypeError, ValueError):
+            return None
+
+    def _count(self, stat: str):
+        with self._stats_lock:
+            self._stats[stat] += 1
+
+    def find_run(self, directive: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the unfinished run ('run_id', 'refactored_data', 'plan', ...) of the directive in this session, or None.
+        """
+        self.long_term_memory.delete_expired_plan_runs(time.time() - self.ttl_seconds)
+        run = self.long_term_memory.get_plan_run(self.session_id, self.directive_key(directive))
+        if run and run["plan_checksum"] != self.checksum(run["plan"]):
+            logger.warning("Discarding a plan run whose stored plan doesn't match its checksum.")
+            self.long_term_memory.delete_plan_run(run["run_id"])
+            return None
+        if run:
+            self._count("resumed_runs")
+        return run
+
+    def start_run(self, directive: str, refactored_data: Dict[str, Any], plan: List[Dict[str, Any]]) -> Optional[int]:
+        """
+        Records a new run of the directive and returns its run_id, or None if the plan can't be checkpointed.
+        """
+        plan_checksum = self.checksum(plan)
+        if plan_checksum is None or self.checksum(refactored_data) is None:
+            return None
+        return self.long_term_memory.start_plan_run(self.session_id, self.directive_key(directive), refactored_data, plan, plan_checksum)
+
+    def finish_run(self, run_id: int):
+        self.long_term_memory.delete_plan_run(run_id)
+
+    def end_run(self, run_id: int, execution_results: List[Dict[str, Any]]) -> bool:
+        """
+        Called once the run's plan has executed. Keeps the run resumable only if some steps didn't finish for a
+        transient reason (e.g., they were cancelled, or their device went away); otherwise drops it.
+        Returns True if the run stays resumable.
+        """
+        with self._stats_lock:
+            failed = run_id in self._failed_runs
+            self._failed_runs.discard(run_id)
+        unfinished = any(result.get("status") in ("cancelled", "error", "failed") or self._interrupted(result) for result in execution_results)
+        if unfinished and not failed:
+            return True
+        if failed:
+            self._count("dropped_runs")
+        self.finish_run(run_id)
+        return False
+
+    @staticmethod
+    def _tool_status(step_result: Dict[str, Any]) -> Optional[str]:
+        result = step_result.get("result")
+        return result.get("status") if isinstance(result, dict) else None
+
+    @classmethod
+    def _interrupted(cls, step_result: Dict[str, Any]) -> bool:
+        # The tool call was killed or timed out (e.g., a shell command at the deadline), so its work didn't finish
+        result = step_result.get("result")
+        return cls._tool_status(step_result) == "cancelled" or (isinstance(result, dict) and bool(result.get("timed_out")))
+
+    def _mark_failed(self, run_id: int):
+        with self._stats_lock:
+            self._failed_runs.add(run_id)
+
+    def _run_and_classify(self, run_id: int, step_runner: StepRunner, tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            step_result = step_runner(tool_name, args)
+        except TRANSIENT_ERRORS:
+            raise
+        except Exception:
+            self._mark_failed(run_id)
+            raise
+        if step_result.get("status") == "failed" and not self._interrupted(step_result):
+            self._mark_failed(run_id)
+        return step_result
+
+    def wrap(self, run_id: int, step_runner: StepRunner) -> StepRunner:
+        """
+        Wraps a step runner (see PlanExecutor) so that results are restored from, and saved to, the run's checkpoints.
+        """
+        occurrences: Dict[str, int] = {}
+        lock = threading.Lock()
+
+        def run_step(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+            step_checksum = None if args.get("operation") in VOLATILE_OPERATIONS else self.checksum({"tool_name": tool_name, "args": args})
+            if step_checksum is None:
+                return self._run_and_classify(run_id, step_runner, tool_name, args)
+            with lock:
+                occurrence = occurrences.get(step_checksum, 0)
+                occurrences[step_checksum] = occurrence + 1
+
+            restored = self.long_term_memory.get_step_checkpoint(run_id, step_checksum, occurrence, time.time() - self.ttl_seconds)
+            if restored is not None:
+                self._count("restored")
+                return {**restored, "restored_from_checkpoint": True}
+
+            step_result = self._run_and_classify(run_id, step_runner, tool_name, args)
+            # Only completed work is checkpointed: never a killed, timed-out or failed tool call, even if reported as executed
+            completed = step_result.get("status", "executed") == "executed" and self._tool_status(step_result) in (None, "success")
+            if completed and not self._interrupted(step_result) and self.checksum(step_result) is not None:
+                self.long_term_memory.set_step_checkpoint(run_id, step_checksum, occurrence, step_result)
+                self._count("checkpointed")
+            return step_result
+        return run_step
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return dict(self._stats)
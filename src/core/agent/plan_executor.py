@@ -0,0 +1,210 @@
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+logger = logging.getLogger(__name__)
+
+# Operations whose every call has an effect or returns fresh data, so identical calls of different plans are never shared
+UNSHAREABLE_OPERATIONS = ("connect", "read_data", "release", "execute")
+
+def is_shareable_step(step: Dict[str, Any]) -> bool:
+    """
+    Default test of whether a step can be shared between plans: it calls an operation that is neither volatile nor
+    effectful. Steps without an operation (shell commands, actions, direct callables) are not shared.
+    """
+    operation = ((step.get("tool_call") or {}).get("args") or {}).get("operation")
+    return operation is not None and operation not in UNSHAREABLE_OPERATIONS
+
+class PlanExecutor:
+    """
+    Executes a plan as a dependency graph on a bounded worker pool.
+
+    Plan steps may declare data flow through named slots:
+        - 'inputs' (Dict[str, str]): Maps a tool argument name to the slot whose value is bound to it.
+        - 'requires' (List[str]): Slots that must be available before the step runs, without being passed as arguments.
+        - 'outputs' (List[str]): Slots filled with the step's output once it succeeds.
+
+    A step depends on the closest preceding step producing each of its input/required slots, and on the
+    preceding step that calls the same tool (tool instances hold state such as open streams and are not
+    driven concurrently). A step that declares no slots at all depends on the step before it, so plans keep
+    their order unless they opt into parallelism through slots. Steps with no unmet dependencies start right away. A step whose slots were never
+    filled (e.g., because the producer failed) is skipped. Results are returned in plan order.
+    """
+
+    def __init__(self, step_runner: Callable[[str, Dict[str, Any]], Dict[str, Any]], max_workers: int = 4):
+        """
+        Args:
+            step_runner (Callable[[str, Dict[str, Any]], Dict[str, Any]]): Called with (tool_name, bound_args) for every
+                step with a tool call. Returns a partial step result ('status', 'result', 'error'); an 'output' key,
+                if present, is removed and stored into the step's output slots.
+            max_workers (int): Maximum number of steps executed concurrently.
+        """
+        self.step_runner = step_runner
+        self.max_workers = max(1, max_workers)
+
+    @staticmethod
+    def _step_slots(step: Dict[str, Any]) -> List[str]:
+        return list(step.get("inputs", {}).values()) + list(step.get("requires", []))
+
+    @staticmethod
+    def _declares_slots(step: Dict[str, Any]) -> bool:
+        return bool(step.get("inputs") or step.get("requires") or step.get("outputs"))
+
+    def build_dependencies(self, plan: List[Dict[str, Any]]) -> List[Set[int]]:
+        """
+        Computes, for each step, the set of step indices it has to wait for.
+        """
+        dependencies: List[Set[int]] = []
+        last_producer: Dict[str, int] = {}
+        last_tool_user: Dict[str, int] = {}
+
+        for index, step in enumerate(plan):
+            deps: Set[int] = set()
+            if index and not self._declares_slots(step):
+                deps.add(index - 1)
+            for slot in self._step_slots(step):
+                if slot in last_producer:
+                    deps.add(last_producer[slot])
+            tool_name = (step.get("tool_call") or {}).get("tool_name")
+            if tool_name:
+                if tool_name in last_tool_user:
+                    deps.add(last_tool_user[tool_name])
+                last_tool_user[tool_name] = index
+            for slot in step.get("outputs", []):
+                last_producer[slot] = index
+            dependencies.append(deps)
+        return dependencies
+
+    def execute(self, plan: List[Dict[str, Any]], slots: Optional[Dict[str, Any]] = None,
+                on_step_complete: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                cancel_event: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
+        """
+        Executes the plan and returns one result per step, in plan order.
+        Args:
+            plan (List[Dict[str, Any]]): The plan steps.
+            slots (Optional[Dict[str, Any]]): Initial slot values available to every step. Updated in place.
+            on_step_complete (Optional[Callable[[int, Dict[str, Any]], None]]): Called with (step_index, step_result) as soon as each step finishes.
+            cancel_event (Optional[threading.Event]): Once set, steps that haven't started are marked 'cancelled' instead of run.
+        """
+        slots = slots if slots is not None else {}
+        dependencies = self.build_dependencies(plan)
+        dependents: List[List[int]] = [[] for _ in plan]
+        pending = [len(deps) for deps in dependencies]
+        for index, deps in enumerate(dependencies):
+            for dep in deps:
+                dependents[dep].append(index)
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(plan)
+        ready = [index for index, count in enumerate(pending) if count == 0]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="plan_step") as pool:
+            running = {}
+
+            def complete(index: int, step_result: Dict[str, Any]):
+                output = step_result.pop("output", None)
+                if step_result.get("status") == "executed":
+                    for slot in plan[index].get("outputs", []):
+                        slots[slot] = output
+                results[index] = step_result
+                if on_step_complete:
+                    on_step_complete(index, step_result)
+                for dependent in dependents[index]:
+                    pending[dependent] -= 1
+                    if pending[dependent] == 0:
+                        ready.append(dependent)
+
+            while ready or running:
+                while ready:
+                    index = ready.pop(0)
+                    step = plan[index]
+                    step_result = {"step": step.get("description", "Unknown Step"), "status": "executed"}
+                    tool_call = step.get("tool_call")
+                    if cancel_event is not None and cancel_event.is_set():
+                        step_result["status"] = "cancelled"
+                        complete(index, step_result)
+                        continue
+                    if not tool_call:
+                        step_result["status"] = "no_tool_call"
+                        complete(index, step_result)
+                        continue
+                    missing = [slot for slot in self._step_slots(step) if slot not in slots]
+                    if missing:
+                        step_result["status"] = "skipped"
+                        step_result["error"] = f"Missing inputs: {', '.join(missing)}"
+                        complete(index, step_result)
+                        continue
+                    args = dict(tool_call.get("args", {}))
+                    for arg_name, slot in step.get("inputs", {}).items():
+                        args[arg_name] = slots[slot]
+                    running[pool.submit(self.step_runner, tool_call.get("tool_name"), args)] = (index, step_result)
+
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, step_result = running.pop(future)
+                    try:
+                        step_result.update(future.result())
+                    except Exception as e:
+                        logger.error(f"Plan step {index} failed: {e}")
+                        step_result["status"] = "error"
+                        step_result["error"] = str(e)
+                    complete(index, step_result)
+
+        return results
+
+    @staticmethod
+    def merge(plans: List[List[Dict[str, Any]]], is_shareable: Optional[Callable[[Dict[str, Any]], bool]] = None
+              ) -> Tuple[List[Dict[str, Any]], List[List[int]]]:
+        """
+        Merges several plans into one in which identical sub-plans of different plans appear once. Two steps are
+        identical if they make the same tool call (or, without a tool call, have the same description) on slots produced
+        by identical steps. Only shareable steps are merged (see is_shareable_step), and never two steps of the same plan:
+        a plan repeating a step runs it every time. Slots are renamed after their producing step, so unrelated plans may
+        use the same slot names.
+        Returns the merged plan and, for each plan, the merged index of each of its steps.
+        """
+        is_shareable = is_shareable or is_shareable_step
+        merged: List[Dict[str, Any]] = []
+        index_maps: List[List[int]] = []
+        merged_index: Dict[Tuple[str, int], int] = {} # (signature, occurrence within its plan) -> merged index
+        for plan in plans:
+            slot_names: Dict[str, str] = {} # Slot name in this plan -> slot name in the merged plan
+            occurrences: Dict[str, int] = {}
+            index_map = []
+            for step in plan:
+                inputs = {arg: slot_names.get(slot, slot) for arg, slot in step.get("inputs", {}).items()}
+                requires = [slot_names.get(slot, slot) for slot in step.get("requires", [])]
+                tool_call = step.get("tool_call")
+                signature = json.dumps({
+                    "tool_call": tool_call, "description": None if tool_call else step.get("description"),
+                    "inputs": inputs, "requires": requires, "outputs": step.get("outputs", [])
+                }, sort_keys=True, default=str)
+                key = (signature, occurrences.get(signature, 0))
+                occurrences[signature] = key[1] + 1
+                index = merged_index.get(key) if is_shareable(step) else None
+                if index is None:
+                    index = len(merged)
+                    merged.append({**step, "inputs": inputs, "requires": requires,
+                                   "outputs": [f"{index}:{slot}" for slot in step.get("outputs", [])]})
+                    if is_shareable(step):
+                        merged_index[key] = index
+                for slot in step.get("outputs", []):
+                    slot_names[slot] = f"{index}:{slot}"
+                index_map.append(index)
+            index_maps.append(index_map)
+        return merged, index_maps
+
+    def execute_many(self, plans: List[List[Dict[str, Any]]], slots: Optional[Dict[str, Any]] = None,
+                     cancel_event: Optional[threading.Event] = None,
+                     is_shareable: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Executes several plans on the shared worker pool, running shareable steps they have in common only once (see merge).
+        Returns the results of each plan, in plan order.
+        """
+        merged, index_maps = self.merge(plans, is_shareable)
+        results = self.execute(merged, slots, cancel_event=cancel_event)
+        return [[{**results[index], "step": step.get("description", "Unknown Step")} for step, index in zip(plan, index_map)]
+                for plan, index_map in zip(plans, index_maps)]
@@ -0,0 +1,122 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+Warmup = Tuple[str, str] # (tool_name, operation)
+
+# Directive keywords hinting at the slow setup operations a plan is likely to need (tool names as in Agent._plan_skeleton)
+DEFAULT_PREFETCH_HINTS: Dict[Warmup, Tuple[str, ...]] = {
+    ("main_camera_sensor", "connect"): ("camera", "cameras", "video", "watch", "monitor", "see", "look", "stream", "frame"),
+    ("object_detection_model", "load_model"): ("detect", "detection", "person", "people", "child", "kid", "toddler",
+                                               "intruder", "object", "objects", "car", "dog", "cat", "count"),
+}
+
+# Refactored capabilities and the setup operations they imply
+DEFAULT_CAPABILITY_WARMUPS: Dict[Tuple[str, str], Warmup] = {
+    ("sensors", "video_camera"): ("main_camera_sensor", "connect"),
+    ("ml_models", "object_detection"): ("object_detection_model", "load_model"),
+}
+
+class ResourcePrefetcher:
+    """
+    Speculatively starts slow setup operations (connecting sensors, loading model weights) in the background
+    while the LLM is still interpreting and planning a directive, based on keyword hints in the directive and
+    on the capabilities found by the Refactor step. When the plan reaches such an operation, it claims the
+    prefetched result instead of running it again. Operations the final plan doesn't use are cancelled, or
+    undone (e.g., a connected sensor is released) if they already ran.
+    """
+
+    # Operations that undo a prefetched operation the plan turned out not to need
+    UNDO_OPERATIONS = {"connect": "release"}
+
+    def __init__(self, run_tool: Callable[[str, Dict[str, Any]], Any], config: Optional[Dict[str, Any]] = None,
+                 is_available: Optional[Callable[[str], bool]] = None):
+        """
+        Args:
+            run_tool (Callable[[str, Dict[str, Any]], Any]): Executes a tool operation and returns its raw result.
+            config (Optional[Dict[str, Any]]): 'hints' (Dict[(tool_name, operation), keywords]), 'capability_warmups'
+                (Dict[(capability_type, capability), (tool_name, operation)]) and 'max_workers' (default 2).
+            is_available (Optional[Callable[[str], bool]]): Whether a tool is registered; unavailable tools are never prefetched.
+        """
+        config = config or {}
+        self.run_tool = run_tool
+        self.hints = config.get("hints", DEFAULT_PREFETCH_HINTS)
+        self.capability_warmups = config.get("capability_warmups", DEFAULT_CAPABILITY_WARMUPS)
+        self.is_available = is_available or (lambda tool_name: True)
+        self._pool = ThreadPoolExecutor(max_workers=config.get("max_workers", 2), thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._pending: Dict[Warmup, Future] = {}
+        self._stats = {"started": 0, "claimed": 0, "cancelled": 0, "undone": 0}
+
+    def warmups_for_directive(self, directive: str) -> List[Warmup]:
+        words = set(re.findall(r"[a-z]+", directive.lower()))
+        return [warmup for warmup, keywords in self.hints.items() if words.intersection(keywords)]
+
+    def warmups_for_capabilities(self, required_capabilities: Dict[str, List[str]]) -> List[Warmup]:
+        return [warmup for (kind, capability), warmup in self.capability_warmups.items()
+                if capability in (required_capabilities or {}).get(kind, [])]
+
+    def prefetch(self, warmups: Iterable[Warmup]) -> List[Warmup]:
+        """
+        Starts the warmups that aren't running or waiting to be claimed already. Returns the ones started.
+        """
+        started = []
+        with self._lock:
+            for tool_name, operation in warmups:
+                if (tool_name, operation) in self._pending or not self.is_available(tool_name):
+                    continue
+                self._pending[(tool_name, operation)] = self._pool.submit(self.run_tool, tool_name, {"operation": operation})
+                started.append((tool_name, operation))
+            self._stats["started"] += len(started)
+        if started:
+            logger.info(f"Prefetching {started}.")
+        return started
+
+    def claim(self, tool_name: str, operation: Optional[str]) -> Optional[Future]:
+        """
+        Hands a prefetched operation over to the plan. Returns its Future, or None if it wasn't prefetched.
+        """
+        with self._lock:
+            future = self._pending.pop((tool_name, operation), None)
+            if future is not None:
+                self._stats["claimed"] += 1
+        return future
+
+    def cancel_unused(self, plan: List[Dict[str, Any]]) -> List[Warmup]:
+        """
+        Cancels or undoes the prefetched operations that no step of the plan performs. Returns them.
+        """
+        used = {((step.get("tool_call") or {}).get("tool_name"), (step.get("tool_call") or {}).get("args", {}).get("operation"))
+                for step in plan}
+        with self._lock:
+            unused = {warmup: future for warmup, future in self._pending.items() if warmup not in used}
+            for warmup in unused:
+                del self._pending[warmup]
+        for (tool_name, operation), future in unused.items():
+            if future.cancel():
+                with self._lock:
+                    self._stats["cancelled"] += 1
+            elif operation in self.UNDO_OPERATIONS:
+                # Already running or done: undo once it finishes, without blocking the directive
+                future.add_done_callback(lambda done, tool_name=tool_name, operation=operation: self._undo(tool_name, operation, done))
+        return list(unused)
+
+    def _undo(self, tool_name: str, operation: str, future: Future):
+        if future.cancelled() or future.exception() is not None or not future.result():
+            return
+        try:
+            self.run_tool(tool_name, {"operation": self.UNDO_OPERATIONS[operation]})
+            with self._lock:
+                self._stats["undone"] += 1
+        except Exception as e:
+            logger.warning(f"Failed to undo prefetched {operation} of '{tool_name}': {e}")
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
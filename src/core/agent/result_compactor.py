@@ -0,0 +1,115 @@
+from typing import Any, Callable, Dict, List
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ResultCompactor:
+    """
+    Shrinks plan execution results before they are put into the Compile prompt.
+    Detection lists are aggregated into counts per class, long strings (e.g., shell stdout) keep only a head and
+    a tail window, empty values are dropped and non-JSON values are summarized. The windows are then tightened
+    until the serialized payload fits the token budget, as measured by the given token counter.
+    """
+
+    # Smallest string window tried before whole steps are elided
+    MIN_WINDOW_CHARS = 32
+
+    def __init__(self, count_tokens: Callable[[str], int], token_budget: int = 1024, window_chars: int = 400):
+        """
+        Args:
+            count_tokens (Callable[[str], int]): Token counter, ideally the model's own tokenizer.
+            token_budget (int): Maximum number of tokens of the serialized results.
+            window_chars (int): Initial size of the head and tail windows kept from long strings.
+        """
+        self.count_tokens = count_tokens
+        self.token_budget = token_budget
+        self.window_chars = window_chars
+
+    @staticmethod
+    def summarize_detections(detections: List[Dict[str, Any]]) -> Dict[str, Any]:
+        by_class: Dict[str, Dict[str, Any]] = {}
+        for detection in detections:
+            summary = by_class.setdefault(detection.get("class_name", "unknown"), {"count": 0, "max_confidence": 0.0})
+            summary["count"] += 1
+            summary["max_confidence"] = max(summary["max_confidence"], detection.get("confidence", 0.0))
+        return {"count": len(detections), "by_class": by_class}
+
+    @staticmethod
+    def _is_detection_list(value: Any) -> bool:
+        return isinstance(value, list) and bool(value) and all(isinstance(item, dict) and "class_name" in item for item in value)
+
+    def _truncate(self, text: str, window: int) -> str:
+        if len(text) <= 2 * window + 40:
+            return text
+        return f"{text[:window]}...[{len(text) - 2 * window} chars omitted]...{text[-window:]}"
+
+    def _compact_value(self, value: Any, window: int) -> Any:
+        if self._is_detection_list(value):
+            return self.summarize_detections(value)
+        if isinstance(value, str):
+            return self._truncate(value, window)
+        if isinstance(value, dict):
+            compacted = {}
+            for key, item in value.items():
+                item = self._compact_value(item, window)
+                if item is None or item == "" or item == [] or item == {}:
+                    continue
+                compacted[str(key)] = item
+            return compacted
+        if isinstance(value, (list, tuple)):
+            return [self._compact_value(item, window) for item in value]
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        shape = getattr(value, "shape", None)
+        if shape is not None:
+            return f"<{type(value).__name__} shape={tuple(shape)}>"
+        return self._truncate(repr(value), window)
+
+    @staticmethod
+    def serialize(results: Any) -> str:
+        return json.dumps(results, separators=(",", ":"), default=str)
+
+    def compact(self, execution_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Returns {'results': compacted results, 'tokens': token count, 'elided_steps': number of steps left out}.
+        """
+        window = self.window_chars
+        while True:
+            compacted = self._compact_value(execution_results, window)
+            tokens = self.count_tokens(self.serialize(compacted))
+            if tokens <= self.token_budget or window <= self.MIN_WINDOW_CHARS:
+                break
+            window //= 2
+
+        # Still too large: keep the first and last steps and elide the middle, which usually holds intermediate work
+        elided = 0
+        kept = compacted
+        while tokens > self.token_budget and len(compacted) - elided > 2:
+            elided += 1
+            remaining = len(compacted) - elided
+            kept = compacted[:(remaining + 1) // 2] + [{"elided_steps": elided}] + compacted[len(compacted) - remaining // 2:]
+            tokens = self.count_tokens(self.serialize(kept))
+        if elided:
+            logger.info(f"Elided {elided} execution results to fit the compile token budget.")
+        return {"results": kept, "tokens": tokens, "elided_steps": elided}
+
+    def partition(self, items: List[Any]) -> List[List[Any]]:
+        """
+        Splits items (execution results or partial insights) into consecutive chunks whose compacted serialization
+        fits the token budget, for compiling them chunk by chunk. An item too large on its own gets a chunk of its own.
+        """
+        chunks: List[List[Any]] = []
+        chunk: List[Any] = []
+        chunk_tokens = 0
+        for item in items:
+            # Approximate the chunk's size by the sum of its items' sizes, so every item is measured once
+            item_tokens = self.count_tokens(self.serialize(self._compact_value(item, self.window_chars))) + 1
+            if chunk and chunk_tokens + item_tokens > self.token_budget:
+                chunks.append(chunk)
+                chunk, chunk_tokens = [], 0
+            chunk.append(item)
+            chunk_tokens += item_tokens
+        if chunk:
+            chunks.append(chunk)
+        return chunks
@@ -0,0 +1,64 @@
+# JSON schemas of the CAMA stage outputs, used for schema-constrained generation (see LLMProviderInterface.generate_structured)
+
+REFACTOR_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "goal": {"type": "string"},
+        "entities": {"type": "array", "items": {"type": "string"}},
+        "context": {"type": "string"},
+        "required_capabilities": {
+            "type": "object",
+            "additionalProperties": {"type": "array", "items": {"type": "string"}}
+        }
+    },
+    "required": ["goal", "entities", "context", "required_capabilities"]
+}
+
+PLAN_STEP_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "description": {"type": "string"},
+        "tool_call": {
+            "type": "object",
+            "properties": {
+                "tool_name": {"type": "string"},
+                "args": {"type": "object"}
+            },
+            "required": ["tool_name", "args"]
+        },
+        "inputs": {"type": "object", "additionalProperties": {"type": "string"}},
+        "requires": {"type": "array", "items": {"type": "string"}},
+        "outputs": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["description"]
+}
+
+PLAN_SCHEMA = {"type": "array", "items": PLAN_STEP_SCHEMA}
+
+FUSED_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "interpretation": REFACTOR_SCHEMA,
+        "plan": PLAN_SCHEMA
+    },
+    "required": ["interpretation", "plan"]
+}
+
+PLAN_DELTA_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "remove": {"type": "array", "items": {"type": "integer"}},
+        "append": PLAN_SCHEMA
+    },
+    "required": ["remove", "append"]
+}
+
+INSIGHT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "key_findings": {"type": "array", "items": {"type": "string"}},
+        "recommendations": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["summary", "key_findings", "recommendations"]
+}
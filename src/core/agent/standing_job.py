@@ -0,0 +1,196 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import threading
+import time
+
+from src.core.agent.plan_executor import PlanExecutor
+
+logger = logging.getLogger(__name__)
+
+# Operations run once when the job starts, once when it stops, and on every iteration respectively
+SETUP_OPERATIONS = ("connect", "load_model", "load_llm")
+TEARDOWN_OPERATIONS = ("release",)
+ITERATION_OPERATIONS = ("read_data", "predict", "get_status")
+
+def detection_condition(class_names: Optional[List[str]] = None, min_confidence: float = 0.5, min_count: int = 1,
+                        slot: str = "detections") -> Callable[[Dict[str, Any]], bool]:
+    """
+    Builds a trigger condition that fires when at least min_count detections in the given slot match
+    one of class_names (any class if None) with at least min_confidence.
+    """
+    def condition(slots: Dict[str, Any]) -> bool:
+        detections = slots.get(slot) or []
+        matches = [d for d in detections
+                   if (class_names is None or d.get("class_name") in class_names) and d.get("confidence", 1.0) >= min_confidence]
+        return len(matches) >= min_count
+    return condition
+
+class StandingJob:
+    """
+    A plan compiled once and run repeatedly against the sensor stream, without re-planning.
+
+    The plan is split into phases: setup steps (connect, load_model) run once on start, iteration steps
+    (read_data, predict and other side-effect-free tools) run at the target rate, and trigger steps (LLM
+    analysis, alerts, shell commands, steps without tool calls) only run when the condition fires. Only then
+    is the LLM re-entered, to compile an insight. The job invalidates itself when setup fails or iterations
+    keep failing, so the caller can re-plan.
+    """
+
+    def __init__(self, plan: List[Dict[str, Any]], condition: Callable[[Dict[str, Any]], bool],
+                 step_runner: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+                 compile_results: Callable[[List[Dict[str, Any]]], Dict[str, Any]],
+                 tool_definitions: Optional[Dict[str, Dict[str, Any]]] = None, rate_hz: float = 1.0,
+                 trigger_cooldown_seconds: float = 30.0, max_consecutive_failures: int = 5,
+                 on_insight: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 on_invalidated: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            plan (List[Dict[str, Any]]): The plan to compile, with slot declarations (see PlanExecutor).
+            condition (Callable[[Dict[str, Any]], bool]): Evaluated on the slots after every iteration.
+            step_runner (Callable): Executes a single tool call (see PlanExecutor).
+            compile_results (Callable): Turns execution results into an insight; usually the agent's LLM Compile step.
+            tool_definitions (Optional[Dict[str, Dict[str, Any]]]): Tool definitions by name, used to classify steps by side effects.
+            rate_hz (float): Target number of iterations per second.
+            trigger_cooldown_seconds (float): Minimum time between two triggers.
+            max_consecutive_failures (int): Number of failed iterations in a row after which the job is invalidated.
+            on_insight (Optional[Callable[[Dict[str, Any]], None]]): Called with each insight compiled on a trigger.
+            on_invalidated (Optional[Callable[[str], None]]): Called with the reason when the job is invalidated.
+        """
+        self.condition = condition
+        self.compile_results = compile_results
+        self.rate_hz = rate_hz
+        self.trigger_cooldown_seconds = trigger_cooldown_seconds
+        self.max_consecutive_failures = max_consecutive_failures
+        self.on_insight = on_insight
+        self.on_invalidated = on_invalidated
+        self.setup_steps, self.iteration_steps, self.trigger_steps, self.teardown_steps = self.compile(plan, tool_definitions or {})
+
+        self._executor = PlanExecutor(step_runner, max_workers=1)
+        self._setup_slots: Optional[Dict[str, Any]] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_trigger: Optional[float] = None
+        self._consecutive_failures = 0
+        self.invalidated_reason: Optional[str] = None
+        self.stats = {"iterations": 0, "triggers": 0, "failed_iterations": 0, "total_iteration_seconds": 0.0}
+
+    @staticmethod
+    def compile(plan: List[Dict[str, Any]], tool_definitions: Dict[str, Dict[str, Any]]) -> Tuple[List, List, List, List]:
+        """
+        Splits a plan into (setup, iteration, trigger, teardown) steps, preserving plan order within each phase.
+        """
+        setup, iteration, trigger, teardown = [], [], [], []
+        for step in plan:
+            tool_call = step.get("tool_call")
+            if not tool_call:
+                trigger.append(step)
+                continue
+            operation = tool_call.get("args", {}).get("operation")
+            if operation in SETUP_OPERATIONS:
+                setup.append(step)
+            elif operation in TEARDOWN_OPERATIONS:
+                teardown.append(step)
+            elif operation in ITERATION_OPERATIONS:
+                iteration.append(step)
+            elif operation is not None and operation != "generate_response" and not tool_definitions.get(tool_call.get("tool_name"), {}).get("side_effects", True):
+                iteration.append(step)
+            else:
+                trigger.append(step)
+        return setup, iteration, trigger, teardown
+
+    def invalidate(self, reason: str):
+        """
+        Stops the job; the plan has to be recompiled before it can run again.
+        """
+        if self.invalidated_reason is None:
+            self.invalidated_reason = reason
+            logger.warning(f"Standing job invalidated: {reason}")
+            if self.on_invalidated:
+                self.on_invalidated(reason)
+        self._stop_event.set()
+
+    def _setup(self) -> bool:
+        slots: Dict[str, Any] = {}
+        results = self._executor.execute(self.setup_steps, slots)
+        failed = [r for r in results if r.get("status") != "executed"]
+        if failed:
+            self.invalidate(f"Setup failed: {failed[0].get('error', failed[0].get('status'))}")
+            return False
+        self._setup_slots = slots
+        return True
+
+    def run_iteration(self) -> Optional[Dict[str, Any]]:
+        """
+        Runs the iteration steps once and evaluates the condition.
+        Returns the compiled insight if the condition fired, None otherwise.
+        """
+        if self._setup_slots is None and not self._setup():
+            return None
+
+        started = time.monotonic()
+        slots = dict(self._setup_slots)
+        results = self._executor.execute(self.iteration_steps, slots)
+        self.stats["iterations"] += 1
+        self.stats["total_iteration_seconds"] += time.monotonic() - started
+
+        if any(r.get("status") in ("failed", "error") for r in results):
+            self.stats["failed_iterations"] += 1
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.max_consecutive_failures:
+                self.invalidate(f"{self._consecutive_failures} consecutive iterations failed.")
+            return None
+        self._consecutive_failures = 0
+
+        now = time.monotonic()
+        if self._last_trigger is not None and now - self._last_trigger < self.trigger_cooldown_seconds:
+            return None
+        if not self.condition(slots):
+            return None
+
+        self._last_trigger = now
+        self.stats["triggers"] += 1
+        results += self._executor.execute(self.trigger_steps, slots)
+        insight = self.compile_results(results)
+        if self.on_insight:
+            self.on_insight(insight)
+        return insight
+
+    def run(self, max_iterations: Optional[int] = None):
+        """
+        Runs iterations at the target rate until stopped, invalidated or max_iterations is reached, then tears down.
+        """
+        period = 1.0 / self.rate_hz if self.rate_hz > 0 else 0.0
+        iterations = 0
+        try:
+            while not self._stop_event.is_set() and (max_iterations is None or iterations < max_iterations):
+                started = time.monotonic()
+                self.run_iteration()
+                iterations += 1
+                remaining = period - (time.monotonic() - started)
+                if remaining > 0:
+                    self._stop_event.wait(remaining)
+        finally:
+            if self._setup_slots is not None and self.teardown_steps:
+                self._executor.execute(self.teardown_steps, dict(self._setup_slots))
+            self._setup_slots = None
+
+    def start(self):
+        """
+        Runs the job on a background thread.
+        """
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name="standing_job", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        iterations = self.stats["iterations"]
+        return {
+            **self.stats,
+            "avg_iteration_seconds": self.stats["total_iteration_seconds"] / iterations if iterations else 0.0,
+            "invalidated_reason": self.invalidated_reason
+        }
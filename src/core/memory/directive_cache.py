@@ -0,0 +1,102 @@
+from typing import Any, Dict, List, Optional
+import re
+import time
+from .long_term_memory_manager import LongTermMemoryManager
+from .embedding_utils import EmbedFn, cosine_similarity, load_default_embed_fn
+
+class DirectiveCache:
+    """
+    Semantic cache of Refactor and Break Down results, keyed by directive.
+    Identical directives (after normalization) hit directly; paraphrased ones hit when the cosine similarity of
+    their embeddings is above the configured threshold. Entries are persisted in the LongTermMemoryManager's
+    SQLite store, expire after a TTL and are evicted least-recently-used beyond a maximum size.
+    """
+
+    def __init__(self, long_term_memory: LongTermMemoryManager, config: Optional[Dict[str, Any]] = None,
+                 embed_fn: Optional[EmbedFn] = None):
+        """
+        Args:
+            long_term_memory (LongTermMemoryManager): The store in which entries are persisted.
+            config (Optional[Dict[str, Any]]): 'similarity_threshold' (default 0.9), 'ttl_seconds' (default 86400)
+                and 'max_entries' (default 256).
+            embed_fn (Optional[Callable]): Maps a list of texts to embeddings. Defaults to the SentenceTransformer
+                embedding generator, loaded on first use. Without embeddings only exact matches hit.
+        """
+        config = config or {}
+        self.long_term_memory = long_term_memory
+        self.similarity_threshold = config.get("similarity_threshold", 0.9)
+        self.ttl_seconds = config.get("ttl_seconds", 86400)
+        self.max_entries = config.get("max_entries", 256)
+        self._embed_fn = embed_fn
+        self._last_embedding: Optional[tuple] = None # (directive_key, embedding) of the latest lookup
+        self._stats = {"hits": 0, "exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "expired": 0, "evicted": 0}
+
+    @staticmethod
+    def normalize(directive: str) -> str:
+        return re.sub(r"\s+", " ", directive.strip().lower()).rstrip(".!?")
+
+    def _embed(self, directive_key: str) -> Optional[List[float]]:
+        if self._last_embedding and self._last_embedding[0] == directive_key:
+            return self._last_embedding[1]
+        if self._embed_fn is None:
+            self._embed_fn = load_default_embed_fn()
+        embedding = self._embed_fn([directive_key])[0]
+        self._last_embedding = (directive_key, embedding)
+        return embedding
+
+    def lookup(self, directive: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached entry ('refactored_data', 'plan', 'directive', 'similarity', ...) for the directive, or None on a miss.
+        """
+        self._stats["expired"] += self.long_term_memory.delete_expired_directive_cache_entries(time.time() - self.ttl_seconds)
+        directive_key = self.normalize(directive)
+
+        entry = self.long_term_memory.get_directive_cache_entry(directive_key=directive_key)
+        if entry:
+            self._stats["exact_hits"] += 1
+            return self._hit(entry, 1.0)
+
+        embedding = self._embed(directive_key)
+        if embedding is not None:
+            best_id, best_similarity = None, -1.0
+            for entry_id, cached_embedding in self.long_term_memory.get_directive_cache_embeddings():
+                similarity = cosine_similarity(embedding, cached_embedding)
+                if similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+            if best_id is not None and best_similarity >= self.similarity_threshold:
+                entry = self.long_term_memory.get_directive_cache_entry(entry_id=best_id)
+                if entry:
+                    self._stats["semantic_hits"] += 1
+                    return self._hit(entry, best_similarity)
+
+        self._stats["misses"] += 1
+        return None
+
+    def _hit(self, entry: Dict[str, Any], similarity: float) -> Dict[str, Any]:
+        self._stats["hits"] += 1
+        self.long_term_memory.touch_directive_cache_entry(entry["entry_id"])
+        entry["similarity"] = similarity
+        return entry
+
+    def store(self, directive: str, refactored_data: Dict[str, Any], plan: List[Dict[str, Any]]):
+        """
+        Caches the Refactor and Break Down results for a directive, evicting least recently used entries if needed.
+        """
+        directive_key = self.normalize(directive)
+        self.long_term_memory.set_directive_cache_entry(directive_key, directive, self._embed(directive_key), refactored_data, plan)
+        self._stats["stores"] += 1
+        self._stats["evicted"] += self.long_term_memory.evict_directive_cache_entries(self.max_entries)
+
+    def clear(self):
+        self.long_term_memory.clear_directive_cache()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns hit/miss counters and the hit rate since the cache was created (or the stats were reset).
+        """
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {**self._stats, "hit_rate": self._stats["hits"] / lookups if lookups else 0.0}
+
+    def reset_stats(self):
+        for key in self._stats:
+            self._stats[key] = 0
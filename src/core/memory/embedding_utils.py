@@ -0,0 +1,25 @@
+from typing import Callable, List, Optional
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+EmbedFn = Callable[[List[str]], List[Optional[List[float]]]]
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+def load_default_embed_fn() -> EmbedFn:
+    """
+    Returns the SentenceTransformer embedding generator, loading the model on first use.
+    If it can't be loaded, returns a function producing None embeddings, so callers fall back to exact matching.
+    """
+    try:
+        from src.utils.embedding_generator import load_embedding_model, generate_embeddings
+        load_embedding_model()
+        return generate_embeddings
+    except Exception as e:
+        logger.warning(f"Embeddings unavailable, falling back to exact matching: {e}")
+        return lambda texts: [None for _ in texts]
@@ -1,8 +1,9 @@
 import sqlite3
 import os
 import json
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 class LongTermMemoryManager:
     """
@@ -72,6 +73,57 @@ class LongTermMemoryManager:
                     FOREIGN KEY (session_id) REFERENCES sessions(session_id)
                 )
             """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS directive_cache (
+                    entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    directive_key TEXT UNIQUE,
+                    directive TEXT,
+                    embedding TEXT, -- JSON-encoded embedding of the directive
+                    refactored_data TEXT,
+                    plan TEXT,
+                    created_at REAL,
+                    last_accessed REAL,
+                    hit_count INTEGER DEFAULT 0
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS plan_templates (
+                    template_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    goal_key TEXT,
+                    capabilities_key TEXT,
+                    goal TEXT,
+                    required_capabilities TEXT,
+                    entities TEXT, -- Entities of the directive the template was learned from, in placeholder order
+                    plan TEXT, -- Plan with entities replaced by <entity_N> placeholders
+                    embedding TEXT, -- JSON-encoded embedding of the goal
+                    success_count INTEGER DEFAULT 0,
+                    last_used TEXT,
+                    UNIQUE (goal_key, capabilities_key)
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS plan_runs (
+                    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT,
+                    directive_key TEXT,
+                    refactored_data TEXT,
+                    plan TEXT,
+                    plan_checksum TEXT,
+                    created_at REAL,
+                    UNIQUE (session_id, directive_key)
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS step_checkpoints (
+                    run_id INTEGER,
+                    step_checksum TEXT, -- Checksum of the tool call with its bound arguments
+                    occurrence INTEGER, -- Distinguishes repeated identical tool calls within a run
+                    result TEXT,
+                    created_at REAL,
+                    PRIMARY KEY (run_id, step_checksum, occurrence),
+                    FOREIGN KEY (run_id) REFERENCES plan_runs(run_id)
+                )
+            """)
             conn.commit()
 
     def _execute_query(self, query: str, params: tuple = ()) -> List[tuple]:
@@ -187,6 +239,177 @@ class LongTermMemoryManager:
         self._execute_query("DELETE FROM session_data WHERE session_id = ?", (session_id,))
         self._execute_query("DELETE FROM sessions WHERE session_id = ?", (session_id,))
 
+    # --- Directive Cache ---
+    def set_directive_cache_entry(self, directive_key: str, directive: str, embedding: Optional[List[float]],
+                                  refactored_data: Dict[str, Any], plan: List[Dict[str, Any]]) -> int:
+        now = time.time()
+        embedding_str = json.dumps(embedding) if embedding is not None else None
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT OR REPLACE INTO directive_cache (directive_key, directive, embedding, refactored_data, plan, created_at, last_accessed, hit_count) VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (directive_key, directive, embedding_str, json.dumps(refactored_data), json.dumps(plan), now, now)
+            )
+            return cursor.lastrowid
+
+    def get_directive_cache_entry(self, entry_id: Optional[int] = None, directive_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        query = "SELECT entry_id, directive_key, directive, refactored_data, plan, created_at, last_accessed, hit_count FROM directive_cache WHERE "
+        rows = self._execute_query(query + ("entry_id = ?" if entry_id is not None else "directive_key = ?"),
+                                   (entry_id if entry_id is not None else directive_key,))
+        if rows:
+            # Assuming order: entry_id, directive_key, directive, refactored_data, plan, created_at, last_accessed, hit_count
+            return {
+                "entry_id": rows[0][0],
+                "directive_key": rows[0][1],
+                "directive": rows[0][2],
+                "refactored_data": json.loads(rows[0][3]),
+                "plan": json.loads(rows[0][4]),
+                "created_at": rows[0][5],
+                "last_accessed": rows[0][6],
+                "hit_count": rows[0][7]
+            }
+        return None
+
+    def get_directive_cache_embeddings(self) -> List[Tuple[int, List[float]]]:
+        rows = self._execute_query("SELECT entry_id, embedding FROM directive_cache WHERE embedding IS NOT NULL")
+        return [(r[0], json.loads(r[1])) for r in rows]
+
+    def touch_directive_cache_entry(self, entry_id: int):
+        self._execute_query(
+            "UPDATE directive_cache SET last_accessed = ?, hit_count = hit_count + 1 WHERE entry_id = ?",
+            (time.time(), entry_id)
+        )
+
+    def delete_expired_directive_cache_entries(self, created_before: float) -> int:
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute("DELETE FROM directive_cache WHERE created_at < ?", (created_before,))
+            return cursor.rowcount
+
+    def evict_directive_cache_entries(self, max_entries: int) -> int:
+        """
+        Deletes the least recently accessed entries beyond max_entries. Returns the number of deleted entries.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute(
+                "DELETE FROM directive_cache WHERE entry_id NOT IN (SELECT entry_id FROM directive_cache ORDER BY last_accessed DESC LIMIT ?)",
+                (max_entries,)
+            )
+            return cursor.rowcount
+
+    def clear_directive_cache(self):
+        self._execute_query("DELETE FROM directive_cache")
+
+    # --- Procedural Memory (Plan Templates) ---
+    def upsert_plan_template(self, goal_key: str, capabilities_key: str, goal: str, required_capabilities: Dict[str, List[str]],
+                             entities: List[str], plan: List[Dict[str, Any]], embedding: Optional[List[float]] = None) -> int:
+        """
+        Stores a plan template, replacing the plan of an existing template with the same goal and capabilities.
+        Returns the template's success count.
+        """
+        now = datetime.now().isoformat()
+        embedding_str = json.dumps(embedding) if embedding is not None else None
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """INSERT INTO plan_templates (goal_key, capabilities_key, goal, required_capabilities, entities, plan, embedding, success_count, last_used)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)
+                   ON CONFLICT (goal_key, capabilities_key) DO UPDATE SET
+                       entities = excluded.entities, plan = excluded.plan, embedding = COALESCE(excluded.embedding, embedding),
+                       success_count = success_count + 1, last_used = excluded.last_used""",
+                (goal_key, capabilities_key, goal, json.dumps(required_capabilities), json.dumps(entities), json.dumps(plan), embedding_str, now)
+            )
+            cursor.execute("SELECT success_count FROM plan_templates WHERE goal_key = ? AND capabilities_key = ?", (goal_key, capabilities_key))
+            return cursor.fetchone()[0]
+
+    def _plan_template_from_row(self, row: tuple) -> Dict[str, Any]:
+        # Assuming order: template_id, goal_key, capabilities_key, goal, required_capabilities, entities, plan, success_count, last_used
+        return {
+            "template_id": row[0],
+            "goal_key": row[1],
+            "capabilities_key": row[2],
+            "goal": row[3],
+            "required_capabilities": json.loads(row[4]),
+            "entities": json.loads(row[5]),
+            "plan": json.loads(row[6]),
+            "success_count": row[7],
+            "last_used": row[8]
+        }
+
+    def get_plan_template(self, goal_key: Optional[str] = None, capabilities_key: Optional[str] = None,
+                          template_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        query = "SELECT template_id, goal_key, capabilities_key, goal, required_capabilities, entities, plan, success_count, last_used FROM plan_templates WHERE "
+        if template_id is not None:
+            rows = self._execute_query(query + "template_id = ?", (template_id,))
+        else:
+            rows = self._execute_query(query + "goal_key = ? AND capabilities_key = ?", (goal_key, capabilities_key))
+        return self._plan_template_from_row(rows[0]) if rows else None
+
+    def get_plan_template_embeddings(self) -> List[Tuple[int, str, List[float]]]:
+        """
+        Returns (template_id, capabilities_key, embedding) for every template with an embedding.
+        """
+        rows = self._execute_query("SELECT template_id, capabilities_key, embedding FROM plan_templates WHERE embedding IS NOT NULL")
+        return [(r[0], r[1], json.loads(r[2])) for r in rows]
+
+    def touch_plan_template(self, template_id: int):
+        self._execute_query("UPDATE plan_templates SET last_used = ? WHERE template_id = ?", (datetime.now().isoformat(), template_id))
+
+    # --- Plan Checkpoints ---
+    def start_plan_run(self, session_id: str, directive_key: str, refactored_data: Dict[str, Any], plan: List[Dict[str, Any]],
+                       plan_checksum: str) -> int:
+        """
+        Records an in-flight plan run, replacing (and dropping the checkpoints of) a previous run of the same directive.
+        Returns the run_id.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM step_checkpoints WHERE run_id IN (SELECT run_id FROM plan_runs WHERE session_id = ? AND directive_key = ?)",
+                           (session_id, directive_key))
+            cursor.execute(
+                "INSERT OR REPLACE INTO plan_runs (session_id, directive_key, refactored_data, plan, plan_checksum, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, directive_key, json.dumps(refactored_data), json.dumps(plan), plan_checksum, time.time())
+            )
+            return cursor.lastrowid
+
+    def get_plan_run(self, session_id: str, directive_key: str) -> Optional[Dict[str, Any]]:
+        rows = self._execute_query(
+            "SELECT run_id, refactored_data, plan, plan_checksum, created_at FROM plan_runs WHERE session_id = ? AND directive_key = ?",
+            (session_id, directive_key)
+        )
+        if rows:
+            # Assuming order: run_id, refactored_data, plan, plan_checksum, created_at
+            return {
+                "run_id": rows[0][0],
+                "refactored_data": json.loads(rows[0][1]),
+                "plan": json.loads(rows[0][2]),
+                "plan_checksum": rows[0][3],
+                "created_at": rows[0][4]
+            }
+        return None
+
+    def delete_plan_run(self, run_id: int):
+        self._execute_query("DELETE FROM step_checkpoints WHERE run_id = ?", (run_id,))
+        self._execute_query("DELETE FROM plan_runs WHERE run_id = ?", (run_id,))
+
+    def delete_expired_plan_runs(self, created_before: float) -> int:
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("DELETE FROM step_checkpoints WHERE run_id IN (SELECT run_id FROM plan_runs WHERE created_at < ?)", (created_before,))
+            cursor = conn.execute("DELETE FROM plan_runs WHERE created_at < ?", (created_before,))
+            return cursor.rowcount
+
+    def set_step_checkpoint(self, run_id: int, step_checksum: str, occurrence: int, result: Dict[str, Any]):
+        self._execute_query(
+            "INSERT OR REPLACE INTO step_checkpoints (run_id, step_checksum, occurrence, result, created_at) VALUES (?, ?, ?, ?, ?)",
+            (run_id, step_checksum, occurrence, json.dumps(result), time.time())
+        )
+
+    def get_step_checkpoint(self, run_id: int, step_checksum: str, occurrence: int, created_after: float = 0.0) -> Optional[Dict[str, Any]]:
+        rows = self._execute_query(
+            "SELECT result FROM step_checkpoints WHERE run_id = ? AND step_checksum = ? AND occurrence = ? AND created_at >= ?",
+            (run_id, step_checksum, occurrence, created_after)
+        )
+        return json.loads(rows[0][0]) if rows else None
+
 # Example Usage (for testing purposes)
 if __name__ == "__main__":
     db_file = os.path.join(os.getcwd(), ".severino", "test_mnemonic.db")
@@ -0,0 +1,123 @@
+from typing import Any, Dict, List, Optional
+import re
+from .long_term_memory_manager import LongTermMemoryManager
+from .embedding_utils import EmbedFn, cosine_similarity, load_default_embed_fn
+
+# Plan keys whose values identify tools and slots rather than directive entities, and must never be parameterized
+_STRUCTURAL_KEYS = ("tool_name", "operation", "inputs", "requires", "outputs")
+
+class ProceduralMemory:
+    """
+    Library of plan templates learned from successfully executed plans (the CAMA Procedural Memory).
+    Templates are indexed by goal and required capabilities and persisted in the LongTermMemoryManager's store.
+    Directive entities are replaced by <entity_N> placeholders, so a template can be instantiated for a new
+    directive with the same goal but different entities.
+    """
+
+    def __init__(self, long_term_memory: LongTermMemoryManager, config: Optional[Dict[str, Any]] = None,
+                 embed_fn: Optional[EmbedFn] = None):
+        """
+        Args:
+            long_term_memory (LongTermMemoryManager): The store in which templates are persisted.
+            config (Optional[Dict[str, Any]]): 'similarity_threshold' (default 0.85) for vector matches of goals.
+            embed_fn (Optional[Callable]): Maps a list of texts to embeddings. Defaults to the SentenceTransformer
+                embedding generator, loaded on first use. Without embeddings only exact matches are found.
+        """
+        config = config or {}
+        self.long_term_memory = long_term_memory
+        self.similarity_threshold = config.get("similarity_threshold", 0.85)
+        self._embed_fn = embed_fn
+
+    @staticmethod
+    def goal_key(goal: str) -> str:
+        return re.sub(r"[\s_]+", " ", str(goal).strip().lower())
+
+    @staticmethod
+    def capabilities_key(required_capabilities: Dict[str, List[str]]) -> str:
+        return ",".join(sorted(f"{kind}:{capability}" for kind, capabilities in (required_capabilities or {}).items()
+                               for capability in capabilities))
+
+    def _embed(self, text: str) -> Optional[List[float]]:
+        if self._embed_fn is None:
+            self._embed_fn = load_default_embed_fn()
+        return self._embed_fn([text])[0]
+
+    @staticmethod
+    def _substitute(value: Any, replace) -> Any:
+        if isinstance(value, str):
+            return replace(value)
+        if isinstance(value, list):
+            return [ProceduralMemory._substitute(item, replace) for item in value]
+        if isinstance(value, dict):
+            return {key: item if key in _STRUCTURAL_KEYS else ProceduralMemory._substitute(item, replace) for key, item in value.items()}
+        return value
+
+    @staticmethod
+    def parameterize(plan: List[Dict[str, Any]], entities: List[str]) -> List[Dict[str, Any]]:
+        """
+        Replaces whole-word occurrences of the entities in the plan's text with <entity_N> placeholders.
+        """
+        patterns = [(re.compile(rf"\b{re.escape(entity)}\b", re.IGNORECASE), f"<entity_{index}>")
+                    for index, entity in enumerate(entities) if entity]
+
+        def replace(text: str) -> str:
+            for pattern, placeholder in patterns:
+                text = pattern.sub(placeholder, text)
+            return text
+        return ProceduralMemory._substitute(plan, replace)
+
+    @staticmethod
+    def instantiate(template: Dict[str, Any], entities: List[str]) -> List[Dict[str, Any]]:
+        """
+        Fills a template's placeholders with new entities, keeping the original entity where none is given.
+        """
+        values = list(entities) + list(template["entities"][len(entities):])
+
+        def replace(text: str) -> str:
+            return re.sub(r"<entity_(\d+)>", lambda m: values[int(m.group(1))] if int(m.group(1)) < len(values) else m.group(0), text)
+        return ProceduralMemory._substitute(template["plan"], replace)
+
+    def record_success(self, refactored_data: Dict[str, Any], plan: List[Dict[str, Any]]) -> int:
+        """
+        Stores a successfully executed plan as a template for its goal and capabilities. Returns the template's success count.
+        """
+        goal = refactored_data.get("goal", "")
+        entities = [str(entity) for entity in refactored_data.get("entities", [])]
+        required_capabilities = refactored_data.get("required_capabilities", {})
+        return self.long_term_memory.upsert_plan_template(
+            self.goal_key(goal), self.capabilities_key(required_capabilities), goal, required_capabilities,
+            entities, self.parameterize(plan, entities), self._embed(self.goal_key(goal))
+        )
+
+    def find_template(self, refactored_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Finds a template for the refactored directive and instantiates it with the directive's entities.
+        Returns {'template', 'plan', 'match' ('exact' or 'vector'), 'similarity'} or None.
+        An exact match has the same goal and capabilities; a vector match has a similar goal and needs
+        no capability the directive doesn't require.
+        """
+        goal_key = self.goal_key(refactored_data.get("goal", ""))
+        capabilities_key = self.capabilities_key(refactored_data.get("required_capabilities", {}))
+        entities = [str(entity) for entity in refactored_data.get("entities", [])]
+
+        template = self.long_term_memory.get_plan_template(goal_key, capabilities_key)
+        match, similarity = "exact", 1.0
+        if template is None:
+            embedding = self._embed(goal_key)
+            if embedding is None:
+                return None
+            available = set(filter(None, capabilities_key.split(",")))
+            best_id, similarity = None, -1.0
+            for template_id, template_capabilities, template_embedding in self.long_term_memory.get_plan_template_embeddings():
+                if not set(filter(None, template_capabilities.split(","))) <= available:
+                    continue
+                candidate_similarity = cosine_similarity(embedding, template_embedding)
+                if candidate_similarity > similarity:
+                    best_id, similarity = template_id, candidate_similarity
+            if best_id is None or similarity < self.similarity_threshold:
+                return None
+            template = self.long_term_memory.get_plan_template(template_id=best_id)
+            match = "vector"
+
+        self.long_term_memory.touch_plan_template(template["template_id"])
+        return {"template": template, "plan": self.instantiate(template, entities), "match": match, "similarity": similarity}
@@ -1,4 +1,5 @@
 from typing import Any, Dict, List, Optional
+import json
 import logging
 import os
 from .long_term_memory_manager import LongTermMemoryManager
@@ -10,7 +11,15 @@ class WorkingMemoryManager:
     Manages conversational context and long-running sessions using a SQLite backend.
     """
 
-    def __init__(self, session_id: str = "default_session", project_root: str = None):
+    def __init__(self, session_id: str = "default_session", project_root: str = None,
+                 long_term_memory_manager: Optional[LongTermMemoryManager] = None):
+        """
+        Args:
+            session_id (str): The session whose context is managed.
+            project_root (str): The project whose mnemonic.db stores the session.
+            long_term_memory_manager (Optional[LongTermMemoryManager]): An existing manager to share; one is created
+                on the project's mnemonic.db if not given.
+        """
         self.session_id = session_id
         # Determine the project root for the database path
         if project_root is None:
@@ -19,9 +28,11 @@ class WorkingMemoryManager:
             current_dir = os.path.dirname(os.path.abspath(__file__))
             project_root = os.path.abspath(os.path.join(current_dir, "..", "..", ".."))
 
-        db_dir = os.path.join(project_root, ".severino", "knowledge")
-        db_path = os.path.join(db_dir, "mnemonic.db")
-        self.long_term_memory_manager = LongTermMemoryManager(db_path)
+        if long_term_memory_manager is None:
+            db_dir = os.path.join(project_root, ".severino", "knowledge")
+            db_path = os.path.join(db_dir, "mnemonic.db")
+            long_term_memory_manager = LongTermMemoryManager(db_path)
+        self.long_term_memory_manager = long_term_memory_manager
 
         # Ensure the session exists in the database
         if not self.long_term_memory_manager.get_session(self.session_id):
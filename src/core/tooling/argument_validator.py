@@ -0,0 +1,163 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import inspect
+import re
+
+# A compiled check maps an argument value to (value, None), possibly coerced, or (None, error message)
+Check = Callable[[Any], Tuple[Any, Optional[str]]]
+
+_INTEGER_PATTERN = re.compile(r"^[+-]?\d+$")
+_NUMBER_PATTERN = re.compile(r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$")
+
+def _check_string(value: Any) -> Tuple[Any, Optional[str]]:
+    return (value, None) if isinstance(value, str) else (None, "must be a string")
+
+def _check_integer(value: Any) -> Tuple[Any, Optional[str]]:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value, None
+    if isinstance(value, float) and value.is_integer():
+        return int(value), None
+    if isinstance(value, str) and _INTEGER_PATTERN.match(value.strip()): # LLM-generated plans often quote numbers
+        return int(value), None
+    return None, "must be an integer"
+
+def _check_number(value: Any) -> Tuple[Any, Optional[str]]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value, None
+    if isinstance(value, str) and _NUMBER_PATTERN.match(value.strip()):
+        return float(value), None
+    return None, "must be a number"
+
+def _check_boolean(value: Any) -> Tuple[Any, Optional[str]]:
+    if isinstance(value, bool):
+        return value, None
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true", None
+    return None, "must be a boolean"
+
+def _check_array(value: Any) -> Tuple[Any, Optional[str]]:
+    if isinstance(value, list):
+        return value, None
+    if isinstance(value, tuple):
+        return list(value), None
+    return None, "must be an array"
+
+def _check_object(value: Any) -> Tuple[Any, Optional[str]]:
+    return (value, None) if isinstance(value, dict) else (None, "must be an object")
+
+def _check_null(value: Any) -> Tuple[Any, Optional[str]]:
+    return (value, None) if value is None else (None, "must be null")
+
+TYPE_CHECKS: Dict[str, Check] = {
+    "string": _check_string,
+    "integer": _check_integer,
+    "number": _check_number,
+    "boolean": _check_boolean,
+    "array": _check_array,
+    "object": _check_object,
+    "null": _check_null
+}
+
+def compile_check(spec: Dict[str, Any]) -> Optional[Check]:
+    """
+    Compiles a parameter's schema ('type', a type name or a list of them, and 'enum') into a check.
+    Returns None for parameters that accept any value.
+    Raises ValueError for unknown types.
+    """
+    types = spec.get("type")
+    if isinstance(types, str):
+        types = [types]
+    type_checks = []
+    for type_name in types or []:
+        if type_name not in TYPE_CHECKS:
+            raise ValueError(f"Unknown parameter type: {type_name}")
+        type_checks.append(TYPE_CHECKS[type_name])
+    enum = spec.get("enum")
+    if not type_checks and enum is None:
+        return None
+    expected = " or ".join(types or [])
+
+    def check(value: Any) -> Tuple[Any, Optional[str]]:
+        if type_checks:
+            for type_check in type_checks:
+                checked, error = type_check(value)
+                if error is None:
+                    value = checked
+                    break
+            else:
+                return None, type_checks[0](value)[1] if len(type_checks) == 1 else f"must be of type {expected}"
+        if enum is not None and value not in enum:
+            return None, f"must be one of {list(enum)}"
+        return value, None
+    return check
+
+class ArgumentValidator:
+    """
+    Validates and coerces the arguments of a tool's calls against its parameter schema, compiled once per tool.
+    The schema is either a map of parameter names to specs ('type', 'enum', 'required': True) or an object schema
+    ('properties', 'required', 'additionalProperties'). For direct callables, parameters without defaults are
+    required too, and arguments the callable can't accept are rejected.
+    Values are only coerced where lossless (e.g., "5" to 5 for an integer), so plans generated by the LLM
+    aren't rejected for quoting numbers.
+    """
+
+    def __init__(self, tool_definition: Dict[str, Any], implementation: Optional[Callable] = None):
+        """
+        Args:
+            tool_definition (Dict[str, Any]): The tool definition with its 'parameters' schema.
+            implementation (Optional[Callable]): The direct callable implementing the tool, if any.
+        Raises:
+            ValueError: If the schema is malformed.
+        """
+        parameters = tool_definition.get("parameters") or {}
+        if not isinstance(parameters, dict):
+            raise ValueError(f"Parameters of tool '{tool_definition.get('name')}' must be a dictionary.")
+        if isinstance(parameters.get("properties"), dict):
+            properties = parameters["properties"]
+            required = set(parameters.get("required", []))
+            accepted = None if parameters.get("additionalProperties", True) is not False else set(properties)
+        else:
+            properties = parameters
+            required = {name for name, spec in properties.items() if isinstance(spec, dict) and spec.get("required") is True}
+            accepted = None
+
+        self._checks: Dict[str, Check] = {}
+        for name, spec in properties.items():
+            check = compile_check(spec) if isinstance(spec, dict) else None
+            if check is not None:
+                self._checks[name] = check
+
+        if implementation is not None:
+            try:
+                signature = inspect.signature(implementation)
+            except (TypeError, ValueError): # Some builtins have no signature
+                signature = None
+            if signature is not None:
+                keyword_kinds = (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+                keyword_parameters = [parameter for parameter in signature.parameters.values() if parameter.kind in keyword_kinds]
+                required |= {parameter.name for parameter in keyword_parameters if parameter.default is inspect.Parameter.empty}
+                if not any(parameter.kind == inspect.Parameter.VAR_KEYWORD for parameter in signature.parameters.values()):
+                    names = {parameter.name for parameter in keyword_parameters}
+                    accepted = names if accepted is None else accepted & names
+        self.required: Tuple[str, ...] = tuple(sorted(required))
+        self.accepted = frozenset(accepted) if accepted is not None else None
+
+    def validate(self, args: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Returns the arguments, coerced where needed (a copy, if anything was coerced), and the list of errors.
+        """
+        errors = [f"Missing required argument '{name}'." for name in self.required if name not in args]
+        coerced = None
+        for name, value in args.items():
+            check = self._checks.get(name)
+            if check is None:
+                if self.accepted is not None and name not in self.accepted:
+                    errors.append(f"Unexpected argument '{name}'.")
+                continue
+            checked, error = check(value)
+            if error is not None:
+                errors.append(f"Argument '{name}' {error}.")
+            elif checked is not value:
+                if coerced is None:
+                    coerced = dict(args)
+                coerced[name] = checked
+        return (coerced if coerced is not None else args), errors
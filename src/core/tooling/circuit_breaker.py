@@ -0,0 +1,109 @@
+from typing import Any, Dict, Optional
+import random
+import threading
+import time
+
+class RetryPolicy:
+    """
+    Retries failed tool calls with exponentially growing, fully jittered delays, so retries of many callers
+    don't hit a recovering device at the same time. Tools with side effects are only retried if the policy allows it.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            config (Optional[Dict[str, Any]]): 'max_attempts' (default 1, no retries), 'base_delay_seconds' (default 0.2),
+                'max_delay_seconds' (default 5.0), 'retry_side_effects' (default False) and 'count_error_results' (default
+                False; also treat results with status 'error' as failures, for tools that report outages that way).
+        """
+        config = config or {}
+        self.max_attempts = max(int(config.get("max_attempts", 1)), 1)
+        self.base_delay_seconds = config.get("base_delay_seconds", 0.2)
+        self.max_delay_seconds = config.get("max_delay_seconds", 5.0)
+        self.retry_side_effects = config.get("retry_side_effects", False)
+        self.count_error_results = config.get("count_error_results", False)
+
+    def attempts_for(self, tool_definition: Dict[str, Any]) -> int:
+        if tool_definition.get("side_effects", False) and not self.retry_side_effects:
+            return 1
+        return self.max_attempts
+
+    def delay(self, attempt: int) -> float:
+        """
+        Returns the pause before the retry following the given (0-based) attempt.
+        """
+        return random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2 ** attempt))
+
+class CircuitBreaker:
+    """
+    Stops calling a tool that keeps failing. After failure_threshold consecutive failures the circuit opens and
+    calls fail fast; once reset_timeout_seconds have passed it is half-open and lets a single probe call through,
+    which closes the circuit if it succeeds and opens it again if it fails.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._stats = {"failures": 0, "short_circuited": 0, "opened": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """
+        Returns True if a call may proceed; the caller must then report its outcome with record_success or record_failure.
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout_seconds:
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._stats["short_circuited"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._stats["failures"] += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._stats["opened"] += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def retry_after(self) -> float:
+        """
+        Returns the seconds left until the circuit lets a probe call through.
+        """
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(self.reset_timeout_seconds - (time.monotonic() - self._opened_at), 0.0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            return {**self._stats, "state": state, "consecutive_failures": self._failures}
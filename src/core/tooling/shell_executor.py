@@ -0,0 +1,252 @@
+from typing import Any, Callable, Dict, Optional, Set
+import codecs
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# Receives output as it is produced: the stream name ('stdout' or 'stderr') and the decoded text
+OutputCallback = Callable[[str, str], None]
+
+class _CappedOutput:
+    """
+    Keeps the first and last bytes of a stream up to a limit, counting what was dropped in between.
+    """
+
+    def __init__(self, limit_bytes: int):
+        self.head_limit = limit_bytes // 2
+        self.tail_limit = limit_bytes - self.head_limit
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total_bytes = 0
+
+    def append(self, chunk: bytes):
+        self.total_bytes += len(chunk)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += chunk[:room]
+            chunk = chunk[room:]
+        if chunk:
+            self.tail += chunk
+            if len(self.tail) > self.tail_limit:
+                del self.tail[:len(self.tail) - self.tail_limit]
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_bytes > len(self.head) + len(self.tail)
+
+    def text(self) -> str:
+        if not self.truncated:
+            return bytes(self.head + self.tail).decode("utf-8", errors="replace")
+        omitted = self.total_bytes - len(self.head) - len(self.tail)
+        return (f"{self.head.decode('utf-8', errors='replace')}\n...[{omitted} bytes omitted]...\n"
+                f"{self.tail.decode('utf-8', errors='replace')}")
+
+class ShellExecutor:
+    """
+    Runs shell commands for the shell tool, each in its own process group, so a command and everything it spawns
+    can be killed as a unit. Commands run under a per-call timeout and a limit on concurrent commands; stdout and
+    stderr are drained as they are produced and only their head and tail are kept, so a runaway command can neither
+    hang the agent nor exhaust its memory. Output can be streamed to a callback, a running command is killed when
+    its cancel event is set (or by cancel_all), and results report the CPU time of the command and the peak RSS of its
+    process tree, sampled while it runs.
+    """
+
+    # Longest pause between checks for exit, timeout and cancellation
+    MAX_POLL_SECONDS = 0.05
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            config (Optional[Dict[str, Any]]): 'timeout_seconds' (default 60) per command, 'max_concurrent' (default 2)
+                commands running at once, 'max_output_bytes' (default 65536) kept per stream and 'queue_timeout_seconds'
+                (default None, wait indefinitely) for a free slot.
+        """
+        config = config or {}
+        self.timeout_seconds = config.get("timeout_seconds", 60)
+        self.max_output_bytes = config.get("max_output_bytes", 65536)
+        self.queue_timeout_seconds = config.get("queue_timeout_seconds")
+        self._slots = threading.BoundedSemaphore(config.get("max_concurrent", 2))
+        self._running: Set[subprocess.Popen] = set()
+        self._lock = threading.Lock()
+        self._stats = {"runs": 0, "failed": 0, "timed_out": 0, "cancelled": 0, "truncated": 0}
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    @staticmethod
+    def _drain(stream, name: str, output: _CappedOutput, on_output: Optional[OutputCallback]):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        try:
+            for chunk in iter(lambda: stream.read1(8192), b""):
+                output.append(chunk)
+                if on_output:
+                    try:
+                        on_output(name, decoder.decode(chunk))
+                    except Exception as e:
+                        logger.warning(f"Shell output callback failed: {e}")
+        finally:
+            stream.close()
+
+    @staticmethod
+    def _kill(process: subprocess.Popen):
+        try:
+            if os.name == "posix":
+                os.killpg(process.pid, signal.SIGKILL) # The whole process group, including the command's children
+            else:
+                process.kill()
+        except (ProcessLookupError, PermissionError, OSError):
+            pass # Already exited
+
+    @staticmethod
+    def _wait(process: subprocess.Popen) -> Optional[Dict[str, Any]]:
+        """
+        Reaps the process if it has exited, returning its CPU time; None while it's still running.
+        """
+        if not hasattr(os, "wait4"):
+            return None if process.poll() is None else {}
+        pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+        if pid == 0:
+            return None
+        process.returncode = os.waitstatus_to_exitcode(status)
+        # Not ru_maxrss: on Linux it includes the high-water mark the child inherited from the agent when it was forked
+        return {"cpu_seconds": round(usage.ru_utime + usage.ru_stime, 4)}
+
+    @staticmethod
+    def _tree_rss(root: Optional[psutil.Process]) -> int:
+        """
+        Returns the resident memory of a command and all of its descendants, 0 once they're gone.
+        """
+        if root is None:
+            return 0
+        try:
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return 0
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass # Exited since it was listed
+        return total
+
+    def run(self, command: str, timeout_seconds: Optional[float] = None, cwd: Optional[str] = None,
+            on_output: Optional[OutputCallback] = None, cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Runs a shell command and returns {'status', 'returncode', 'stdout', 'stderr', 'stdout_truncated', 'stderr_truncated',
+        'duration_seconds', 'cpu_seconds', 'peak_rss_bytes'}, where peak_rss_bytes is the largest total RSS of the command and
+        its children seen while polling. The status is 'success' for a zero exit code, 'cancelled' if the cancel event
+        was set, and 'error' otherwise, with a 'message' (and 'timed_out': True after a timeout).
+        Args:
+            command (str): The command, run by the system shell.
+            timeout_seconds (Optional[float]): Kills the command after this many seconds (default: the configured timeout).
+            cwd (Optional[str]): Working directory of the command.
+            on_output (Optional[OutputCallback]): Called with output as it is produced.
+            cancel_event (Optional[threading.Event]): Kills the command once set.
+        """
+        timeout_seconds = self.timeout_seconds if timeout_seconds is None else timeout_seconds
+        if not self._slots.acquire(timeout=self.queue_timeout_seconds):
+            return {"status": "error", "message": f"No free slot to run the command within {self.queue_timeout_seconds}s."}
+        try:
+            return self._run(command, timeout_seconds, cwd, on_output, cancel_event)
+        finally:
+            self._slots.release()
+
+    def _run(self, command: str, timeout_seconds: float, cwd: Optional[str], on_output: Optional[OutputCallback],
+             cancel_event: Optional[threading.Event]) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            process = subprocess.Popen(command, shell=True, cwd=cwd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE, start_new_session=(os.name == "posix"))
+        except Exception as e:
+            self._count("failed")
+            return {"status": "error", "message": f"Error running command: {e}"}
+        with self._lock:
+            self._running.add(process)
+            self._stats["runs"] += 1
+        try:
+            tree = psutil.Process(process.pid)
+        except psutil.Error:
+            tree = None
+
+        outputs = {"stdout": _CappedOutput(self.max_output_bytes), "stderr": _CappedOutput(self.max_output_bytes)}
+        readers = [threading.Thread(target=self._drain, args=(getattr(process, name), name, output, on_output), daemon=True)
+                   for name, output in outputs.items()]
+        for reader in readers:
+            reader.start()
+
+        timed_out = cancelled = False
+        usage = None
+        peak_rss = 0
+        poll_seconds = 0.001
+        try:
+            while usage is None:
+                peak_rss = max(peak_rss, self._tree_rss(tree)) # Sampled before reaping, while the process still exists
+                usage = self._wait(process)
+                if usage is not None:
+                    break
+                if cancel_event is not None and cancel_event.is_set():
+                    cancelled = True
+                elif time.monotonic() - started >= timeout_seconds:
+                    timed_out = True
+                if timed_out or cancelled:
+                    self._kill(process)
+                    while usage is None:
+                        time.sleep(0.001)
+                        usage = self._wait(process)
+                    break
+                time.sleep(poll_seconds)
+                poll_seconds = min(poll_seconds * 2, self.MAX_POLL_SECONDS) # Short commands return quickly, long ones poll less
+        finally:
+            if usage is None: # Interrupted (e.g., Ctrl-C): don't leave the command running
+                self._kill(process)
+            with self._lock:
+                self._running.discard(process)
+        for reader in readers:
+            reader.join(timeout=1.0) # A detached grandchild may keep a pipe open
+
+        result: Dict[str, Any] = {
+            "status": "success" if process.returncode == 0 else "error",
+            "returncode": process.returncode,
+            "stdout": outputs["stdout"].text(),
+            "stderr": outputs["stderr"].text(),
+            "stdout_truncated": outputs["stdout"].truncated,
+            "stderr_truncated": outputs["stderr"].truncated,
+            "duration_seconds": round(time.monotonic() - started, 4),
+            "cpu_seconds": usage.get("cpu_seconds"),
+            "peak_rss_bytes": peak_rss or None # None if the command exited before it could be sampled
+        }
+        if outputs["stdout"].truncated or outputs["stderr"].truncated:
+            self._count("truncated")
+        if cancelled:
+            self._count("cancelled")
+            result.update({"status": "cancelled", "message": "Command cancelled and killed."})
+        elif timed_out:
+            self._count("timed_out")
+            result.update({"message": f"Command timed out after {timeout_seconds}s and was killed.", "timed_out": True})
+        elif process.returncode != 0:
+            self._count("failed")
+            result["message"] = f"Command '{command}' returned non-zero exit status {process.returncode}."
+        return result
+
+    def cancel_all(self) -> int:
+        """
+        Kills every running command, e.g. on shutdown. Returns the number of commands killed.
+        """
+        with self._lock:
+            running = list(self._running)
+        for process in running:
+            self._kill(process)
+        return len(running)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "running": len(self._running)}
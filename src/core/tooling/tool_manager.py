@@ -1,4 +1,17 @@
-from typing import Any, Callable, Dict, List, Optional, Type
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type, Union
+import asyncio
+import functools
+import gc
+import inspect
+import logging
+import multiprocessing
+import pickle
+import reprlib
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import psutil
 from src.perception.sensor_factory import SensorFactory
 from src.ml_models.ml_model_factory import MLModelFactory
 from src.llm_inference.llm_factory import LLMFactory
@@ -6,18 +19,149 @@ from src.actions.base_action import ActionInterface
 from src.perception.sensors.base_sensor import SensorInterface
 from src.ml_models.base_ml_model import MLModelInterface
 from src.llm_inference.base_llm import LLMProviderInterface
+from src.core.tooling.tool_result_cache import STATE_CHANGING_OPERATIONS, InvalidationHook, ToolResultCache
+from src.core.tooling.argument_validator import ArgumentValidator
+from src.core.tooling.tool_metrics import ToolMetrics
+from src.core.tooling.circuit_breaker import CircuitBreaker, RetryPolicy
+
+# Decides whether a tool call with side effects may run: called with (tool_name, tool_definition, args), returns a
+# bool or a coroutine resolving to one
+ConfirmationCallback = Callable[[str, Dict[str, Any], Dict[str, Any]], Union[bool, Awaitable[bool]]]
+
+logger = logging.getLogger(__name__)
+
+# Operations that bring a tool instance into a usable state; replayed when an evicted instance is recreated
+SETUP_OPERATIONS = ("connect", "load_model", "load_llm")
+
+def _call_without_args(method: Callable, args: Dict[str, Any]) -> Any:
+    return method()
+
+def _call_with_data(method: Callable, args: Dict[str, Any]) -> Any:
+    return method(args.pop("data"))
+
+def _call_with_prompt(method: Callable, args: Dict[str, Any]) -> Any:
+    return method(args.pop("prompt"), **args)
+
+def _call_with_payload(method: Callable, args: Dict[str, Any]) -> Any:
+    return method(args.pop("payload", {}))
+
+# Operations of each tool interface: (interface, kind, default operation, {operation: (method name, caller)}).
+# Actions have a single operation and ignore the 'operation' argument.
+_INTERFACE_OPERATIONS = (
+    (SensorInterface, "sensor", "read_data", {"connect": ("connect", _call_without_args), "read_data": ("read_data", _call_without_args),
+                                              "get_status": ("get_status", _call_without_args), "release": ("release", _call_without_args)}),
+    (MLModelInterface, "ML model", "predict", {"load_model": ("load_model", _call_without_args), "predict": ("predict", _call_with_data),
+                                               "get_status": ("get_status", _call_without_args)}),
+    (LLMProviderInterface, "LLM provider", "generate_response", {"load_llm": ("load_llm", _call_without_args),
+                                                                 "generate_response": ("generate_response", _call_with_prompt),
+                                                                 "get_status": ("get_status", _call_without_args)}),
+    (ActionInterface, "action", None, {"execute": ("execute", _call_with_payload)})
+)
+
+# Dispatch table of a tool instance: (kind, default operation, {operation: callable taking the call's arguments})
+Dispatch = Tuple[str, Optional[str], Dict[str, Callable[[Dict[str, Any]], Any]]]
+
+def _build_dispatch(instance: Any) -> Dispatch:
+    for interface, kind, default_operation, operations in _INTERFACE_OPERATIONS:
+        if isinstance(instance, interface):
+            return kind, default_operation, {operation: functools.partial(caller, getattr(instance, method))
+                                             for operation, (method, caller) in operations.items()}
+    raise ValueError(f"Unsupported tool instance type: {type(instance)}")
+
+_ARGS_REPR = reprlib.Repr()
+_ARGS_REPR.maxstring = 80
+_ARGS_REPR.maxother = 80
+
+class _ArgsPreview:
+    """
+    Renders tool arguments for log messages only when a message is actually emitted, summarizing arrays
+    (e.g., frames) by their shape and capping the size of everything else.
+    """
+    __slots__ = ("args",)
+    MAX_CHARS = 240
+
+    def __init__(self, args: Dict[str, Any]):
+        self.args = args
+
+    def __str__(self) -> str:
+        parts = []
+        for key, value in self.args.items():
+            shape = getattr(value, "shape", None)
+            parts.append(f"{key}=<{type(value).__name__} shape={tuple(shape)}>" if isinstance(shape, tuple) else f"{key}={_ARGS_REPR.repr(value)}")
+        preview = ", ".join(parts)
+        return preview if len(preview) <= self.MAX_CHARS else preview[:self.MAX_CHARS] + "..."
+
+def _call_implementation(implementation: Callable, args: Dict[str, Any]) -> Any:
+    # Module-level, so it can be sent to the process pool
+    try:
+        return implementation(**args)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
 
 class ToolManager:
     """
     Manages the registration, discovery, and orchestration of various tools.
     Ensures a secure mechanism for user confirmation for sensitive operations.
     Tools can be direct callables or instances of SensorInterface, MLModelInterface, LLMProviderInterface, or ActionInterface.
+    Independent calls can be executed concurrently (execute_tools, execute_tool_async): on a thread pool, or on a
+    process pool for direct callables whose definition declares 'cpu_bound': True.
+    Sensor, ML model and LLM tools are instantiated on first use. With an eviction config, model and LLM instances
+    idle for too long, or least recently used ones under memory pressure, are unloaded; the next call recreates the
+    instance and replays its setup operation (e.g., load_model) transparently.
+    With a resilience config, failed calls are retried with jittered backoff and each tool has a circuit breaker,
+    so calls to an unreachable device fail fast instead of waiting for its timeout every time.
     """
 
-    def __init__(self):
+    def __init__(self, memoization_config: Optional[Dict[str, Any]] = None, confirmation_callback: Optional[ConfirmationCallback] = None,
+                 max_workers: int = 8, max_processes: Optional[int] = None, eviction_config: Optional[Dict[str, Any]] = None,
+                 resilience_config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            memoization_config (Optional[Dict[str, Any]]): Enables reusing results of side-effect-free tool calls
+                (see ToolResultCache for the options); None disables memoization.
+            confirmation_callback (Optional[ConfirmationCallback]): Confirms calls with side effects instead of prompting on stdin.
+            max_workers (int): Size of the thread pool for concurrent calls.
+            max_processes (Optional[int]): Size of the process pool for CPU-bound calls (default: number of CPUs).
+            eviction_config (Optional[Dict[str, Any]]): 'idle_seconds' (default 300) after which instances are unloaded,
+                'memory_threshold_percent' (default 85, None to disable) of system memory use above which least recently
+                used instances are unloaded, 'check_interval_seconds' (default 30) and 'evictable_types' (default
+                ('ml_model', 'llm')). None disables eviction.
+            resilience_config (Optional[Dict[str, Any]]): Retry options (see RetryPolicy), 'failure_threshold' (default 5)
+                and 'reset_timeout_seconds' (default 30) of the circuit breakers, and 'tools' (Dict[str, Dict], per-tool
+                overrides of these options). None disables retries and circuit breakers.
+        """
         self._tools: Dict[str, Dict[str, Any]] = {}
         self._tool_implementations: Dict[str, Callable] = {}
         self._tool_instances: Dict[str, Any] = {} # To store instantiated objects like sensors, models, llms
+        self._dispatch: Dict[str, Dispatch] = {} # Bound operations of each instance, built when it is instantiated
+        self._validators: Dict[str, ArgumentValidator] = {} # Compiled from each tool's parameter schema at registration
+        self._metrics = ToolMetrics()
+        self.resilience_config = resilience_config
+        self._retry_policies: Dict[str, RetryPolicy] = {}
+        self._circuit_breakers: Dict[str, CircuitBreaker] = {}
+        self._resilience_lock = threading.Lock()
+        self._result_cache: Optional[ToolResultCache] = ToolResultCache(memoization_config) if memoization_config is not None else None
+        self.confirmation_callback = confirmation_callback
+        self.max_workers = max_workers
+        self.max_processes = max_processes
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._pools_lock = threading.Lock()
+        self._confirmation_lock = threading.Lock() # Only one stdin prompt at a time
+        # Tool instances hold state such as open streams, so concurrent calls to the same instance are serialized
+        self._instance_locks: Dict[str, threading.Lock] = {}
+        self._factories: Dict[str, Callable[[], Any]] = {} # Factory-backed tools, instantiated on first use
+        self._factory_types: Dict[str, str] = {}
+        self._setup_operations: Dict[str, str] = {} # Last successful setup operation of each instance
+        self._last_used: Dict[str, float] = {}
+        self._lifecycle_events: deque = deque(maxlen=200)
+
+        self.eviction_config = eviction_config
+        self._eviction_stop = threading.Event()
+        self._eviction_thread: Optional[threading.Thread] = None
+        if eviction_config is not None:
+            self._eviction_thread = threading.Thread(target=self._eviction_loop, name="tool_eviction", daemon=True)
+            self._eviction_thread.start()
 
     def register_tool(self, tool_definition: Dict[str, Any], implementation: Optional[Callable] = None, 
                       factory_type: Optional[str] = None, factory_name: Optional[str] = None, config: Optional[Dict[str, Any]] = None):
@@ -35,28 +179,38 @@ class ToolManager:
             raise ValueError("Tool definition must include a 'name'.")
         if tool_name in self._tools:
             print(f"Warning: Tool '{tool_name}' is already registered. Overwriting.")
+        validator = ArgumentValidator(tool_definition, implementation if not factory_type else None)
         
         self._tools[tool_name] = tool_definition
+        self._validators[tool_name] = validator
+        self._instance_locks.setdefault(tool_name, threading.Lock())
+        if self._result_cache:
+            self._result_cache.invalidate(tool_name)
+        self._factories.pop(tool_name, None)
+        self._tool_implementations.pop(tool_name, None)
+        self._tool_instances.pop(tool_name, None)
+        self._dispatch.pop(tool_name, None)
 
         if factory_type:
             if factory_type == "sensor":
                 if not (factory_name and config is not None):
                     raise ValueError(f"For factory_type 'sensor', 'factory_name' and 'config' must be provided.")
-                self._tool_instances[tool_name] = SensorFactory.create_sensor(factory_name, tool_name, config)
+                self._register_factory(tool_name, factory_type, lambda: SensorFactory.create_sensor(factory_name, tool_name, config))
             elif factory_type == "ml_model":
                 if not (factory_name and config is not None):
                     raise ValueError(f"For factory_type 'ml_model', 'factory_name' and 'config' must be provided.")
-                self._tool_instances[tool_name] = MLModelFactory.create_model(factory_name, tool_name, config)
+                self._register_factory(tool_name, factory_type, lambda: MLModelFactory.create_model(factory_name, tool_name, config))
             elif factory_type == "llm":
                 if not (factory_name and config is not None):
                     raise ValueError(f"For factory_type 'llm', 'factory_name' and 'config' must be provided.")
-                self._tool_instances[tool_name] = LLMFactory.create_provider(factory_name, tool_name, config)
+                self._register_factory(tool_name, factory_type, lambda: LLMFactory.create_provider(factory_name, tool_name, config))
             elif factory_type == "action":
                 # For actions, 'implementation' is the class to be instantiated
                 if not (isinstance(implementation, type) and issubclass(implementation, ActionInterface)):
                     raise ValueError(f"For factory_type 'action', 'implementation' must be an ActionInterface class.")
                 # config is optional for actions, but if provided, pass it
                 self._tool_instances[tool_name] = implementation(tool_name, config if config is not None else {})
+                self._dispatch[tool_name] = _build_dispatch(self._tool_instances[tool_name])
                 print(f"Tool '{tool_name}' registered as a factory-managed instance of type {factory_type}.") # No factory_name for actions
             else:
                 raise ValueError(f"Unknown factory_type: {factory_type}")
@@ -66,98 +220,458 @@ class ToolManager:
         else:
             raise ValueError("Either 'implementation' or ('factory_type', 'factory_name', 'config') must be provided.")
 
+    def _register_factory(self, tool_name: str, factory_type: str, factory: Callable[[], Any]):
+        with self._instance_locks[tool_name]:
+            self._tool_instances.pop(tool_name, None) # Re-registered tools are recreated from the new factory
+            self._dispatch.pop(tool_name, None)
+            self._setup_operations.pop(tool_name, None)
+            self._factories[tool_name] = factory
+            self._factory_types[tool_name] = factory_type
+
+    def get_tool_instance(self, tool_name: str) -> Optional[Any]:
+        """
+        Returns the instance behind a sensor, ML model, LLM or action tool, instantiating it if needed; None for direct callables.
+        """
+        if tool_name not in self._factories:
+            return self._tool_instances.get(tool_name)
+        with self._instance_locks[tool_name]:
+            return self._instance_for(tool_name, None)
+
+    def _instance_for(self, tool_name: str, operation: Optional[str]) -> Any:
+        # Called with the tool's instance lock held
+        instance = self._tool_instances.get(tool_name)
+        if instance is not None or tool_name not in self._factories:
+            return instance
+        if self._is_evictable(tool_name) and self._memory_pressure():
+            self._evict_least_recently_used(exclude=tool_name)
+        instance = self._factories[tool_name]()
+        self._dispatch[tool_name] = _build_dispatch(instance)
+        self._tool_instances[tool_name] = instance
+        self._record_event(tool_name, "instantiated")
+        setup_operation = self._setup_operations.get(tool_name)
+        if setup_operation and operation not in SETUP_OPERATIONS and operation != "release":
+            # The instance was evicted after its setup; redo it before serving the call
+            if self._dispatch_call(self._dispatch[tool_name], {"operation": setup_operation}):
+                self._record_event(tool_name, "reloaded", setup_operation)
+        return instance
+
+    def _record_use(self, tool_name: str, operation: Optional[str], result: Any):
+        self._last_used[tool_name] = time.monotonic()
+        if operation in SETUP_OPERATIONS and result:
+            self._setup_operations[tool_name] = operation
+        elif operation == "release":
+            self._setup_operations.pop(tool_name, None)
+
+    def _record_event(self, tool_name: str, event: str, detail: Optional[str] = None):
+        self._lifecycle_events.append({"tool_name": tool_name, "event": event, "detail": detail, "timestamp": time.time()})
+        print(f"Tool '{tool_name}' {event}" + (f" ({detail})." if detail else "."))
+
+    def get_lifecycle_events(self) -> List[Dict[str, Any]]:
+        """
+        Returns the latest instantiation, reload and unload events of factory-backed tools, oldest first.
+        """
+        return list(self._lifecycle_events)
+
+    def _is_evictable(self, tool_name: str) -> bool:
+        if self.eviction_config is None:
+            return False
+        return self._factory_types.get(tool_name) in self.eviction_config.get("evictable_types", ("ml_model", "llm"))
+
+    def _memory_pressure(self) -> bool:
+        threshold = (self.eviction_config or {}).get("memory_threshold_percent", 85)
+        return threshold is not None and psutil.virtual_memory().percent >= threshold
+
+    def unload_tool(self, tool_name: str, reason: str = "requested") -> bool:
+        """
+        Unloads the instance of a factory-backed tool, releasing it first; the next call recreates it.
+        Returns False if there is nothing to unload or the tool is busy.
+        """
+        lock = self._instance_locks.get(tool_name)
+        if tool_name not in self._factories or not lock.acquire(blocking=False):
+            return False
+        try:
+            instance = self._tool_instances.pop(tool_name, None)
+            if instance is None:
+                return False
+            self._dispatch.pop(tool_name, None)
+            release = getattr(instance, "unload", None) or getattr(instance, "release", None)
+            if release:
+                try:
+                    release()
+                except Exception as e:
+                    print(f"Warning: Failed to release tool '{tool_name}': {e}")
+            del instance
+        finally:
+            lock.release()
+        gc.collect()
+        if self._result_cache:
+            self._result_cache.invalidate(tool_name)
+        self._record_event(tool_name, "unloaded", reason)
+        return True
+
+    def _evict_least_recently_used(self, exclude: Optional[str] = None) -> Optional[str]:
+        candidates = sorted((name for name in list(self._tool_instances) if name != exclude and self._is_evictable(name)),
+                            key=lambda name: self._last_used.get(name, 0.0))
+        for name in candidates:
+            if self.unload_tool(name, "memory pressure"):
+                return name
+        return None
+
+    def evict_idle_tools(self) -> List[str]:
+        """
+        Unloads evictable instances idle for longer than the configured idle time, then least recently used ones
+        while memory use is above the threshold. Returns the names of the unloaded tools.
+        """
+        if self.eviction_config is None:
+            return []
+        idle_seconds = self.eviction_config.get("idle_seconds", 300)
+        now = time.monotonic()
+        evicted = [name for name in list(self._tool_instances)
+                   if self._is_evictable(name) and now - self._last_used.get(name, now) >= idle_seconds and self.unload_tool(name, "idle")]
+        while self._memory_pressure():
+            name = self._evict_least_recently_used()
+            if name is None:
+                break
+            evicted.append(name)
+        return evicted
+
+    def _eviction_loop(self):
+        interval = self.eviction_config.get("check_interval_seconds", 30)
+        while not self._eviction_stop.wait(interval):
+            try:
+                self.evict_idle_tools()
+            except Exception as e:
+                print(f"Warning: Tool eviction failed: {e}")
+
     def get_tool_definition(self, tool_name: str) -> Optional[Dict[str, Any]]:
         """
         Retrieves the definition of a registered tool.
         """
         return self._tools.get(tool_name)
 
+    def get_tool_names(self, factory_type: Optional[str] = None) -> List[str]:
+        """
+        Returns the names of the registered tools, or only of those created by the given factory type (e.g., 'sensor').
+        """
+        if factory_type is None:
+            return list(self._tools)
+        return [name for name in self._factories if self._factory_types.get(name) == factory_type]
+
     def get_all_tool_definitions(self) -> List[Dict[str, Any]]:
         """
         Returns a list of all registered tool definitions.
         """
         return list(self._tools.values())
 
+    def add_invalidation_hook(self, tool_name: str, hook: InvalidationHook):
+        """
+        Invalidates memoized results of a tool whenever hook(args) returns a different version (e.g., a file's mtime).
+        """
+        if self._result_cache:
+            self._result_cache.add_invalidation_hook(tool_name, hook)
+
+    def invalidate_cached_results(self, tool_name: Optional[str] = None):
+        """
+        Drops the memoized results of a tool, or of all tools.
+        """
+        if self._result_cache:
+            self._result_cache.invalidate(tool_name)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Returns the memoization hit/miss counters and hit rate; empty if memoization is disabled.
+        """
+        return self._result_cache.get_stats() if self._result_cache else {}
+
+    def _get_tool_definition(self, tool_name: str) -> Dict[str, Any]:
+        tool_definition = self._tools.get(tool_name)
+        if not tool_definition:
+            raise ValueError(f"Tool '{tool_name}' not found.")
+        return tool_definition
+
+    def _validate_arguments(self, tool_name: str, args: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Returns the coerced arguments and, if they don't match the tool's parameter schema, the error result of the call.
+        """
+        args, errors = self._validators[tool_name].validate(args)
+        if not errors:
+            return args, None
+        return args, {"status": "error", "error_type": "invalid_arguments",
+                      "message": f"Invalid arguments for tool '{tool_name}': {' '.join(errors)}", "errors": errors}
+
     def execute_tool(self, tool_name: str, args: Dict[str, Any], require_confirmation: bool = True) -> Any:
         """
-        Executes a registered tool.
+        Executes a registered tool. Results of side-effect-free calls are reused if memoization is enabled.
+        Arguments are validated against the tool's parameter schema first; invalid calls return
+        {'status': 'error', 'error_type': 'invalid_arguments', 'message', 'errors'} without running the tool.
         Args:
             tool_name (str): The name of the tool to execute.
             args (Dict[str, Any]): A dictionary of arguments to pass to the tool's implementation.
-            require_confirmation (bool): If True, prompts the user for confirmation for sensitive operations.
+            require_confirmation (bool): If True, asks for confirmation of sensitive operations (see confirmation_callback).
         """
-        tool_definition = self._tools.get(tool_name)
-        if not tool_definition:
-            raise ValueError(f"Tool '{tool_name}' not found.")
+        tool_definition = self._get_tool_definition(tool_name)
+        args, invalid = self._validate_arguments(tool_name, args)
+        if invalid:
+            self._metrics.count(tool_name, self._operation_label(args), "invalid")
+            return invalid
+        if require_confirmation and tool_definition.get("side_effects", False) and not self._confirm(tool_name, tool_definition, args):
+            print("Tool execution cancelled by user.")
+            self._metrics.count(tool_name, self._operation_label(args), "cancelled")
+            return {"status": "cancelled", "message": "Tool execution cancelled by user."}
+        return self._run_measured(tool_name, tool_definition, args, self._invoke_tool)
+
+    async def execute_tool_async(self, tool_name: str, args: Dict[str, Any], require_confirmation: bool = True) -> Any:
+        """
+        Awaitable variant of execute_tool. The call runs on the thread pool (or the process pool, for CPU-bound tools)
+        and confirmation goes through the confirmation callback, so the event loop stays free.
+        """
+        tool_definition = self._get_tool_definition(tool_name)
+        args, invalid = self._validate_arguments(tool_name, args)
+        if invalid:
+            self._metrics.count(tool_name, self._operation_label(args), "invalid")
+            return invalid
+        if require_confirmation and tool_definition.get("side_effects", False) and not await self._confirm_async(tool_name, tool_definition, args):
+            self._metrics.count(tool_name, self._operation_label(args), "cancelled")
+            return {"status": "cancelled", "message": "Tool execution cancelled by user."}
+        return await asyncio.get_running_loop().run_in_executor(
+            self._get_thread_pool(), self._run_measured, tool_name, tool_definition, args, self._invoker_for(tool_name, tool_definition))
+
+    def execute_tools(self, calls: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Executes independent tool calls concurrently and returns their results in order. A call that fails
+        yields {'status': 'error', 'message': ...} instead of raising.
+        Args:
+            calls (List[Dict[str, Any]]): Calls as {'tool_name', 'args', optional 'require_confirmation' (default True)}.
+        """
+        futures = [self._get_thread_pool().submit(self._execute_call, call) for call in calls]
+        return [future.result() for future in futures]
 
-        has_side_effects = tool_definition.get("side_effects", False)
-
-        if require_confirmation and has_side_effects:
-            print(f"\n--- Tool Execution Confirmation ---")
-            print(f"Tool: {tool_name}")
-            print(f"Description: {tool_definition.get('description', 'No description provided.')}")
-            print(f"Arguments: {args}")
-            print(f"WARNING: This tool may modify the system or data.")
-            confirmation = input("Do you want to proceed? (yes/no): ").lower()
-            if confirmation != 'yes':
-                print("Tool execution cancelled by user.")
+    async def execute_tools_async(self, calls: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Awaitable variant of execute_tools.
+        """
+        async def execute(call: Dict[str, Any]) -> Any:
+            try:
+                return await self.execute_tool_async(call["tool_name"], dict(call.get("args", {})), call.get("require_confirmation", True))
+            except Exception as e:
+                return {"status": "error", "message": str(e)}
+        return list(await asyncio.gather(*(execute(call) for call in calls)))
+
+    def _execute_call(self, call: Dict[str, Any]) -> Any:
+        try:
+            tool_name = call["tool_name"]
+            args = dict(call.get("args", {}))
+            tool_definition = self._get_tool_definition(tool_name)
+            args, invalid = self._validate_arguments(tool_name, args)
+            if invalid:
+                self._metrics.count(tool_name, self._operation_label(args), "invalid")
+                return invalid
+            if call.get("require_confirmation", True) and tool_definition.get("side_effects", False) and not self._confirm(tool_name, tool_definition, args):
+                self._metrics.count(tool_name, self._operation_label(args), "cancelled")
                 return {"status": "cancelled", "message": "Tool execution cancelled by user."}
-
-        print(f"Executing tool '{tool_name}' with arguments: {args}")
-        
-        if tool_name in self._tool_instances:
-            instance = self._tool_instances[tool_name]
-            # Determine which method to call based on the instance type (using interfaces)
-            if isinstance(instance, SensorInterface):
-                operation = args.pop("operation", "read_data")
-                if operation == "connect":
-                    result = instance.connect()
-                elif operation == "read_data":
-                    result = instance.read_data()
-                elif operation == "get_status":
-                    result = instance.get_status()
-                elif operation == "release":
-                    result = instance.release()
-                else:
-                    raise ValueError(f"Unsupported sensor operation: {operation}")
-            elif isinstance(instance, MLModelInterface):
-                operation = args.pop("operation", "predict")
-                if operation == "load_model":
-                    result = instance.load_model()
-                elif operation == "predict":
-                    data = args.pop("data")
-                    result = instance.predict(data)
-                elif operation == "get_status":
-                    result = instance.get_status()
-                else:
-                    raise ValueError(f"Unsupported ML model operation: {operation}")
-            elif isinstance(instance, LLMProviderInterface):
-                operation = args.pop("operation", "generate_response")
-                if operation == "load_llm":
-                    result = instance.load_llm()
-                elif operation == "generate_response":
-                    prompt_value = args.pop("prompt")
-                    result = instance.generate_response(prompt_value, **args)
-                elif operation == "get_status":
-                    result = instance.get_status()
+            return self._run_measured(tool_name, tool_definition, args, self._invoker_for(tool_name, tool_definition))
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        with self._pools_lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tool")
+            return self._thread_pool
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        with self._pools_lock:
+            if self._process_pool is None:
+                # Spawned rather than forked, since the parent runs threads (plan workers, the inference queue)
+                self._process_pool = ProcessPoolExecutor(max_workers=self.max_processes, mp_context=multiprocessing.get_context("spawn"))
+            return self._process_pool
+
+    def shutdown(self, wait: bool = True):
+        self._eviction_stop.set()
+        with self._pools_lock:
+            for pool in (self._thread_pool, self._process_pool):
+                if pool is not None:
+                    pool.shutdown(wait=wait)
+            self._thread_pool = self._process_pool = None
+
+    def _confirm(self, tool_name: str, tool_definition: Dict[str, Any], args: Dict[str, Any]) -> bool:
+        if self.confirmation_callback is None:
+            with self._confirmation_lock:
+                return self._prompt_confirmation(tool_name, tool_definition, args)
+        decision = self.confirmation_callback(tool_name, tool_definition, args)
+        if inspect.iscoroutine(decision):
+            decision = asyncio.run(decision) # Called from a worker thread, which has no running event loop
+        return bool(decision)
+
+    async def _confirm_async(self, tool_name: str, tool_definition: Dict[str, Any], args: Dict[str, Any]) -> bool:
+        if self.confirmation_callback is None:
+            # The stdin prompt blocks, so it runs on the thread pool
+            return await asyncio.get_running_loop().run_in_executor(self._get_thread_pool(), self._confirm, tool_name, tool_definition, args)
+        decision = self.confirmation_callback(tool_name, tool_definition, args)
+        if inspect.isawaitable(decision):
+            decision = await decision
+        return bool(decision)
+
+    @staticmethod
+    def _prompt_confirmation(tool_name: str, tool_definition: Dict[str, Any], args: Dict[str, Any]) -> bool:
+        print(f"\n--- Tool Execution Confirmation ---")
+        print(f"Tool: {tool_name}")
+        print(f"Description: {tool_definition.get('description', 'No description provided.')}")
+        print(f"Arguments: {_ArgsPreview(args)}")
+        print(f"WARNING: This tool may modify the system or data.")
+        confirmation = input("Do you want to proceed? (yes/no): ").lower()
+        return confirmation == 'yes'
+
+    @staticmethod
+    def _operation_label(args: Dict[str, Any]) -> str:
+        return args.get("operation") or "call"
+
+    def _run_measured(self, tool_name: str, tool_definition: Dict[str, Any], args: Dict[str, Any],
+                      invoke: Callable[[str, Dict[str, Any]], Any]) -> Any:
+        operation = self._operation_label(args) # Taken before dispatch pops it
+        self._metrics.begin(tool_name, operation)
+        started = time.perf_counter()
+        outcome = "errors"
+        try:
+            result = self._run_memoized(tool_name, tool_definition, args, self._resilient(tool_name, tool_definition, invoke))
+            status = result.get("status") if isinstance(result, dict) else None
+            outcome = "errors" if status == "error" else "cancelled" if status == "cancelled" else None
+            return result
+        finally:
+            self._metrics.end(tool_name, operation, time.perf_counter() - started, outcome)
+
+    @staticmethod
+    def _is_failed_result(operation: str, result: Any, count_error_results: bool = False) -> bool:
+        # Calls that raised or timed out, failed setup operations and sensor reads without data (see SensorInterface.read_data).
+        # Other error results, like a non-zero exit status or a missing file, come from a working tool
+        if isinstance(result, dict):
+            if result.get("error_type") == "exception" or result.get("timed_out"):
+                return True
+            return count_error_results and result.get("status") == "error"
+        if operation in SETUP_OPERATIONS:
+            return result is False
+        return operation == "read_data" and result is None
+
+    def _resilience_for(self, tool_name: str) -> Tuple[RetryPolicy, CircuitBreaker]:
+        with self._resilience_lock:
+            if tool_name not in self._circuit_breakers:
+                options = {**self.resilience_config, **self.resilience_config.get("tools", {}).get(tool_name, {})}
+                self._retry_policies[tool_name] = RetryPolicy(options)
+                self._circuit_breakers[tool_name] = CircuitBreaker(options.get("failure_threshold", 5), options.get("reset_timeout_seconds", 30.0))
+            return self._retry_policies[tool_name], self._circuit_breakers[tool_name]
+
+    def _resilient(self, tool_name: str, tool_definition: Dict[str, Any],
+                   invoke: Callable[[str, Dict[str, Any]], Any]) -> Callable[[str, Dict[str, Any]], Any]:
+        if self.resilience_config is None:
+            return invoke
+        retry_policy, circuit_breaker = self._resilience_for(tool_name)
+        attempts = retry_policy.attempts_for(tool_definition)
+
+        def invoke_with_retries(tool_name: str, args: Dict[str, Any]) -> Any:
+            operation = self._operation_label(args)
+            for attempt in range(attempts):
+                if not circuit_breaker.allow():
+                    return {"status": "error", "error_type": "circuit_open", "retry_after_seconds": round(circuit_breaker.retry_after(), 3),
+                            "message": f"Tool '{tool_name}' is unavailable after repeated failures; calls fail fast until it recovers."}
+                if attempt:
+                    self._metrics.count(tool_name, operation, "retries")
+                try:
+                    result = invoke(tool_name, dict(args)) # Dispatch consumes the arguments, so every attempt gets a copy
+                except Exception:
+                    circuit_breaker.record_failure()
+                    if attempt == attempts - 1:
+                        raise
                 else:
-                    raise ValueError(f"Unsupported LLM provider operation: {operation}")
-            elif isinstance(instance, ActionInterface):
-                payload = args.pop("payload", {})
-                result = instance.execute(payload)
-            else:
-                raise ValueError(f"Unsupported tool instance type: {type(instance)}")
-        elif tool_name in self._tool_implementations:
-            implementation = self._tool_implementations[tool_name]
+                    if not self._is_failed_result(operation, result, retry_policy.count_error_results):
+                        circuit_breaker.record_success()
+                        return result
+                    circuit_breaker.record_failure()
+                    if attempt == attempts - 1:
+                        return result
+                time.sleep(retry_policy.delay(attempt))
+        return invoke_with_retries
+
+    def get_circuit_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the state ('closed', 'open' or 'half_open'), consecutive failures and counters of each tool's circuit breaker.
+        """
+        with self._resilience_lock:
+            circuit_breakers = dict(self._circuit_breakers)
+        return {tool_name: circuit_breaker.get_stats() for tool_name, circuit_breaker in circuit_breakers.items()}
+
+    def get_metrics(self, tool_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Returns call counts, latency percentiles, error, cancellation and invalid-argument counts and in-flight calls
+        per tool and operation (see ToolMetrics.get_metrics), for one tool or all of them.
+        """
+        return self._metrics.get_metrics(tool_name)
+
+    def reset_metrics(self):
+        self._metrics.reset()
+
+    def _run_memoized(self, tool_name: str, tool_definition: Dict[str, Any], args: Dict[str, Any],
+                      invoke: Callable[[str, Dict[str, Any]], Any]) -> Any:
+        cache_key = self._result_cache.key_for(tool_definition, args) if self._result_cache else None
+        if cache_key is None:
+            if self._result_cache and args.get("operation") in STATE_CHANGING_OPERATIONS:
+                try:
+                    return invoke(tool_name, args)
+                finally:
+                    self._result_cache.invalidate(tool_name) # E.g., a memoized get_status from before load_model is stale
+            return invoke(tool_name, args)
+        version = self._result_cache.version(tool_name, args)
+        hit, result = self._result_cache.lookup(cache_key, version)
+        if hit:
+            self._metrics.count(tool_name, self._operation_label(args), "cache_hits")
+            return result
+        result = invoke(tool_name, dict(args))
+        self._result_cache.store(cache_key, result, self._result_cache.ttl_for(tool_definition), version)
+        return result
+
+    def _invoker_for(self, tool_name: str, tool_definition: Dict[str, Any]) -> Callable[[str, Dict[str, Any]], Any]:
+        if tool_definition.get("cpu_bound") and tool_name in self._tool_implementations:
+            return self._invoke_in_process
+        return self._invoke_tool
+
+    def _invoke_in_process(self, tool_name: str, args: Dict[str, Any]) -> Any:
+        try:
+            return self._get_process_pool().submit(_call_implementation, self._tool_implementations[tool_name], args).result()
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            # Only module-level functions with picklable arguments can be sent to another process
+            print(f"Warning: Tool '{tool_name}' can't run in a separate process ({e}). Running it on a thread.")
+            return self._invoke_tool(tool_name, args)
+
+    @staticmethod
+    def _dispatch_call(dispatch: Dispatch, args: Dict[str, Any]) -> Any:
+        kind, default_operation, operations = dispatch
+        if default_operation is None:
+            return operations["execute"](args)
+        operation = args.pop("operation", default_operation)
+        call = operations.get(operation)
+        if call is None:
+            raise ValueError(f"Unsupported {kind} operation: {operation}")
+        return call(args)
+
+    def _invoke_tool(self, tool_name: str, args: Dict[str, Any]) -> Any:
+        logger.debug("Executing tool '%s' with arguments: %s", tool_name, _ArgsPreview(args))
+
+        implementation = self._tool_implementations.get(tool_name)
+        if implementation is not None:
             try:
                 result = implementation(**args)
             except Exception as e:
                 print(f"Error executing tool '{tool_name}': {e}")
-                return {"status": "error", "message": str(e)}
+                return {"status": "error", "error_type": "exception", "message": str(e)}
+        elif tool_name in self._tool_instances or tool_name in self._factories:
+            operation = args.get("operation")
+            with self._instance_locks[tool_name]:
+                self._instance_for(tool_name, operation)
+                result = self._dispatch_call(self._dispatch[tool_name], args)
+                self._record_use(tool_name, operation, result)
         else:
             raise ValueError(f"Tool '{tool_name}' not found or not properly initialized.")
 
-        print(f"Tool '{tool_name}' executed successfully.")
+        logger.debug("Tool '%s' executed successfully.", tool_name)
         return result
 
 # Example Tool Implementations (for demonstration)
@@ -171,16 +685,6 @@ def _read_file_impl(absolute_path: str) -> Dict[str, Any]:
     except Exception as e:
         return {"status": "error", "message": f"Error reading file: {e}"}
 
-def _run_shell_command_impl(command: str) -> Dict[str, Any]:
-    import subprocess
-    try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, check=True)
-        return {"status": "success", "stdout": result.stdout, "stderr": result.stderr}
-    except subprocess.CalledProcessError as e:
-        return {"status": "error", "stdout": e.stdout, "stderr": e.stderr, "message": str(e)}
-    except Exception as e:
-        return {"status": "error", "message": f"Error running command: {e}"}
-
 # Example Action Implementation
 class NotificationAction(ActionInterface):
     def execute(self, payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -0,0 +1,120 @@
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+
+# Upper bounds of the latency histogram buckets: 0.1 ms to ~105 s, each sqrt(2) wider than the last,
+# so percentiles are estimated within about 20% at a fixed memory cost per operation
+LATENCY_BUCKETS: List[float] = [1e-4 * 2 ** (i / 2) for i in range(41)]
+
+# Outcomes counted besides successful calls
+OUTCOMES = ("errors", "cancelled", "invalid")
+
+class _OperationMetrics:
+
+    __slots__ = ("calls", "errors", "cancelled", "invalid", "cache_hits", "retries", "in_flight", "total_seconds", "max_seconds", "buckets")
+
+    def __init__(self):
+        self.calls = self.errors = self.cancelled = self.invalid = self.cache_hits = self.retries = self.in_flight = 0
+        self.total_seconds = self.max_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1) # The last bucket holds latencies beyond the largest bound
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.calls:
+            return None
+        rank = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(LATENCY_BUCKETS[index], self.max_seconds) if index < len(LATENCY_BUCKETS) else self.max_seconds
+        return self.max_seconds
+
+    def snapshot(self, elapsed_seconds: float) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "invalid": self.invalid,
+            "cache_hits": self.cache_hits,
+            "retries": self.retries,
+            "in_flight": self.in_flight,
+            "total_seconds": round(self.total_seconds, 6),
+            "mean_seconds": round(self.total_seconds / self.calls, 6) if self.calls else None,
+            "max_seconds": round(self.max_seconds, 6),
+            "p50_seconds": self.percentile(0.50),
+            "p95_seconds": self.percentile(0.95),
+            "p99_seconds": self.percentile(0.99),
+            "throughput_per_second": round(self.calls / elapsed_seconds, 3) if elapsed_seconds > 0 else 0.0
+        }
+
+class ToolMetrics:
+    """
+    Per-tool, per-operation call counters, latency histograms (with p50/p95/p99 estimates), error, cancellation
+    and invalid-argument counts, and in-flight gauges, so it's visible which tools (the camera, a detector, the LLM,
+    a shell command) dominate directive time on a node. Recording a call costs a lock and a bisect.
+    """
+
+    def __init__(self):
+        self._operations: Dict[Tuple[str, str], _OperationMetrics] = {}
+        self._lock = threading.Lock()
+        self._since = time.monotonic()
+
+    def _metrics_for(self, tool_name: str, operation: str) -> _OperationMetrics:
+        # Called with the lock held
+        metrics = self._operations.get((tool_name, operation))
+        if metrics is None:
+            metrics = self._operations[(tool_name, operation)] = _OperationMetrics()
+        return metrics
+
+    def begin(self, tool_name: str, operation: str):
+        with self._lock:
+            self._metrics_for(tool_name, operation).in_flight += 1
+
+    def end(self, tool_name: str, operation: str, seconds: float, outcome: Optional[str] = None):
+        """
+        Records a finished call and its latency; outcome is None for a successful call, or one of OUTCOMES.
+        """
+        with self._lock:
+            metrics = self._metrics_for(tool_name, operation)
+            metrics.in_flight = max(metrics.in_flight - 1, 0) # Calls started before a reset
+            metrics.calls += 1
+            metrics.total_seconds += seconds
+            metrics.max_seconds = max(metrics.max_seconds, seconds)
+            metrics.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            if outcome:
+                setattr(metrics, outcome, getattr(metrics, outcome) + 1)
+
+    def count(self, tool_name: str, operation: str, counter: str):
+        """
+        Counts an event other than a finished call: a cache hit, a retry, or a call that was cancelled or rejected.
+        """
+        with self._lock:
+            metrics = self._metrics_for(tool_name, operation)
+            setattr(metrics, counter, getattr(metrics, counter) + 1)
+
+    def get_metrics(self, tool_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Returns {'elapsed_seconds', 'tools': {tool: {'calls', 'errors', 'cancelled', 'invalid', 'in_flight', 'total_seconds',
+        'operations': {operation: metrics}}}}, for one tool or all of them. Throughput is measured since the last reset.
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self._since
+            tools: Dict[str, Dict[str, Any]] = {}
+            for (name, operation), metrics in sorted(self._operations.items()):
+                if tool_name is not None and name != tool_name:
+                    continue
+                tool = tools.setdefault(name, {"calls": 0, "errors": 0, "cancelled": 0, "invalid": 0, "in_flight": 0, "total_seconds": 0.0, "operations": {}})
+                snapshot = metrics.snapshot(elapsed)
+                for key in ("calls", "errors", "cancelled", "invalid", "in_flight", "total_seconds"):
+                    tool[key] += snapshot[key]
+                tool["operations"][operation] = snapshot
+            return {"elapsed_seconds": round(elapsed, 3), "tools": tools}
+
+    def reset(self):
+        """
+        Clears all counters and histograms; gauges of calls still running restart from zero.
+        """
+        with self._lock:
+            self._operations.clear()
+            self._since = time.monotonic()
@@ -0,0 +1,142 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Maps a call's arguments to a version of the state the result depends on (e.g., a file's mtime); a cached result
+# is invalidated once the version changes
+InvalidationHook = Callable[[Dict[str, Any]], Any]
+
+# Operations that change a tool's state or return fresh data on every call, so their results are never reused
+NON_MEMOIZABLE_OPERATIONS = ("connect", "release", "load_model", "load_llm", "read_data")
+
+# Operations that change a tool's state; they invalidate the tool's cached results (e.g., of get_status)
+STATE_CHANGING_OPERATIONS = ("connect", "release", "load_model", "load_llm")
+
+def file_version(path_arg: str) -> InvalidationHook:
+    """
+    Builds an invalidation hook versioning results by the modification time and size of the file in the given argument.
+    """
+    def version(args: Dict[str, Any]) -> Any:
+        try:
+            stat = os.stat(args[path_arg])
+            return (stat.st_mtime_ns, stat.st_size)
+        except (KeyError, OSError):
+            return None
+    return version
+
+DEFAULT_INVALIDATION_HOOKS: Dict[str, InvalidationHook] = {"read_file": file_version("absolute_path")}
+
+class ToolResultCache:
+    """
+    Memoizes results of side-effect-free tool calls, keyed by tool name and a hash of the canonical (JSON, sorted keys)
+    arguments. Entries expire after a per-tool TTL, are evicted least-recently-used beyond a maximum size, and are
+    invalidated when the version reported by the tool's invalidation hook changes or the tool's state changes
+    (see invalidate). Calls whose arguments aren't
+    JSON-serializable (e.g., frames), LLM generations with a non-zero temperature and state-changing operations are not memoized.
+    Cached results are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            config (Optional[Dict[str, Any]]): 'max_entries' (default 256), 'default_ttl_seconds' (default 60) and
+                'ttl_seconds' (Dict[str, float], per tool). A tool definition's 'cache_ttl_seconds' takes precedence
+                over the default; a TTL of 0 disables memoization for the tool.
+        """
+        config = config or {}
+        self.max_entries = config.get("max_entries", 256)
+        self.default_ttl_seconds = config.get("default_ttl_seconds", 60)
+        self.ttl_seconds: Dict[str, float] = dict(config.get("ttl_seconds", {}))
+        self._invalidation_hooks: Dict[str, InvalidationHook] = dict(DEFAULT_INVALIDATION_HOOKS)
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._generations: Dict[Optional[str], int] = {} # Bumped by invalidate, per tool (None for all tools)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "invalidated": 0, "evicted": 0}
+
+    def add_invalidation_hook(self, tool_name: str, hook: InvalidationHook):
+        self._invalidation_hooks[tool_name] = hook
+
+    def ttl_for(self, tool_definition: Dict[str, Any]) -> float:
+        tool_name = tool_definition.get("name")
+        if tool_name in self.ttl_seconds:
+            return self.ttl_seconds[tool_name]
+        return tool_definition.get("cache_ttl_seconds", self.default_ttl_seconds)
+
+    def key_for(self, tool_definition: Dict[str, Any], args: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """
+        Returns the cache key of a call, or None if the call must not be memoized.
+        """
+        if tool_definition.get("side_effects", False) or self.ttl_for(tool_definition) <= 0:
+            return None
+        if args.get("operation") in NON_MEMOIZABLE_OPERATIONS:
+            return None
+        if args.get("operation") == "generate_response" and args.get("temperature") != 0: # Only greedy generations are deterministic
+            return None
+        try:
+            canonical = json.dumps(args, sort_keys=True, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return None
+        return tool_definition.get("name"), hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def version(self, tool_name: str, args: Dict[str, Any]) -> Any:
+        """
+        Returns the version of the state a call's result depends on, taken before the call runs: the hook's version
+        and how often the tool's results were invalidated, so results of calls racing a state change aren't stored.
+        """
+        hook = self._invalidation_hooks.get(tool_name)
+        with self._lock:
+            generation = (self._generations.get(None, 0), self._generations.get(tool_name, 0))
+        return generation, hook(args) if hook else None
+
+    def lookup(self, key: Tuple[str, str], version: Any = None) -> Tuple[bool, Any]:
+        """
+        Returns (True, result) on a hit and (False, None) on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires_at"] <= time.monotonic():
+                del self._entries[key]
+                self._stats["expired"] += 1
+                entry = None
+            elif entry is not None and entry["version"] != version:
+                del self._entries[key]
+                self._stats["invalidated"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return True, entry["result"]
+
+    def store(self, key: Tuple[str, str], result: Any, ttl_seconds: float, version: Any = None):
+        if isinstance(result, dict) and result.get("status") in ("error", "cancelled"):
+            return
+        with self._lock:
+            if isinstance(version, tuple) and version[0] != (self._generations.get(None, 0), self._generations.get(key[0], 0)):
+                return # The tool's state changed while the call ran
+            self._entries[key] = {"result": result, "version": version, "expires_at": time.monotonic() + ttl_seconds}
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evicted"] += 1
+
+    def invalidate(self, tool_name: Optional[str] = None):
+        """
+        Drops the cached results of a tool, or of all tools, including results of calls still running.
+        """
+        with self._lock:
+            self._generations[tool_name] = self._generations.get(tool_name, 0) + 1
+            for key in [key for key in self._entries if tool_name is None or key[0] == tool_name]:
+                del self._entries[key]
+                self._stats["invalidated"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {**self._stats, "entries": len(self._entries), "hit_rate": self._stats["hits"] / lookups if lookups else 0.0}
@@ -0,0 +1,128 @@
+from typing import Any, Callable, Dict, List, Optional, Set
+import json
+import re
+
+from src.core.tooling.tool_manager import ToolManager
+from src.core.memory.embedding_utils import EmbedFn, cosine_similarity, load_default_embed_fn
+
+def _terms(text: str) -> Set[str]:
+    return {term for term in re.split(r"[^a-z0-9]+", text.lower()) if len(term) > 2}
+
+class ToolRetriever:
+    """
+    Selects the tools relevant to a directive, so planning prompts carry a catalog of roughly constant size
+    however many tools are registered. Tool definitions are indexed by an embedding of their name and description
+    and by capability terms (the definition's 'tags', plus the words of its name and description); tools are ranked
+    by embedding similarity to the directive plus the overlap of their terms with the required capabilities.
+    Each tool's catalog snippet is rendered and token-counted once, and re-indexed only when its definition changes.
+    """
+
+    def __init__(self, tool_manager: ToolManager, config: Optional[Dict[str, Any]] = None, embed_fn: Optional[EmbedFn] = None,
+                 count_tokens: Optional[Callable[[str], int]] = None):
+        """
+        Args:
+            tool_manager (ToolManager): The registry whose tools are indexed.
+            config (Optional[Dict[str, Any]]): 'top_k' (default 8) tools selected per directive, 'token_budget' (default 512)
+                of a rendered catalog, 'term_weight' (default 0.5) of the term overlap in the ranking and 'always_include'
+                (names of tools added to every catalog).
+            embed_fn (Optional[Callable]): Maps a list of texts to embeddings. Defaults to the SentenceTransformer
+                embedding generator, loaded on first use. Without embeddings tools are ranked by term overlap only.
+            count_tokens (Optional[Callable[[str], int]]): Token counter, ideally the planning model's own tokenizer.
+        """
+        config = config or {}
+        self.tool_manager = tool_manager
+        self.top_k = config.get("top_k", 8)
+        self.token_budget = config.get("token_budget", 512)
+        self.term_weight = config.get("term_weight", 0.5)
+        self.always_include = list(config.get("always_include", []))
+        self.count_tokens = count_tokens or (lambda text: (len(text) + 3) // 4)
+        self._embed_fn = embed_fn
+        self._index: Dict[str, Dict[str, Any]] = {} # Tool name -> indexed entry
+        self._stats = {"selections": 0, "indexed": 0, "catalog_tokens": 0, "full_catalog_tokens": 0}
+
+    def _embed(self, texts: List[str]) -> List[Optional[List[float]]]:
+        if self._embed_fn is None:
+            self._embed_fn = load_default_embed_fn()
+        return self._embed_fn(texts)
+
+    @staticmethod
+    def render_snippet(tool_definition: Dict[str, Any]) -> str:
+        snippet = {key: tool_definition[key] for key in ("name", "description", "parameters") if key in tool_definition}
+        return json.dumps(snippet, separators=(",", ":"), default=str)
+
+    def refresh(self):
+        """
+        Indexes tools registered or redefined since the last refresh and drops unregistered ones.
+        """
+        definitions = {tool.get("name"): tool for tool in self.tool_manager.get_all_tool_definitions()}
+        for name in set(self._index) - set(definitions):
+            del self._index[name]
+        changed = [definition for name, definition in definitions.items()
+                   if name not in self._index or self._index[name]["definition"] != definition]
+        if not changed:
+            return
+        texts = [f"{definition.get('name', '')}: {definition.get('description', '')}" for definition in changed]
+        for definition, text, embedding in zip(changed, texts, self._embed(texts)):
+            snippet = self.render_snippet(definition)
+            self._index[definition["name"]] = {
+                "definition": dict(definition),
+                "snippet": snippet,
+                "tokens": self.count_tokens(snippet),
+                "embedding": embedding,
+                "terms": _terms(text) | {str(tag).lower() for tag in definition.get("tags", [])}
+            }
+        self._stats["indexed"] += len(changed)
+
+    def select(self, query: str, required_capabilities: Optional[Dict[str, List[str]]] = None) -> List[str]:
+        """
+        Returns the names of the top_k tools most relevant to the query (usually the directive or its goal) and
+        required capabilities, best first, preceded by the always-included tools.
+        """
+        self.refresh()
+        capability_terms = set()
+        for capabilities in (required_capabilities or {}).values():
+            for capability in capabilities:
+                capability_terms |= _terms(str(capability))
+        query_terms = _terms(query) | capability_terms
+        query_embedding = self._embed([query])[0] if any(entry["embedding"] is not None for entry in self._index.values()) else None
+
+        scores = {}
+        for name, entry in self._index.items():
+            if name in self.always_include:
+                continue
+            similarity = cosine_similarity(query_embedding, entry["embedding"]) if query_embedding is not None and entry["embedding"] is not None else 0.0
+            overlap = len(query_terms & entry["terms"]) / len(query_terms) if query_terms else 0.0
+            scores[name] = similarity + self.term_weight * overlap
+        ranked = sorted((name for name, score in scores.items() if score > 0), key=lambda name: -scores[name])
+        self._stats["selections"] += 1
+        return [name for name in self.always_include if name in self._index] + ranked[:self.top_k]
+
+    def render_catalog(self, tool_names: List[str]) -> str:
+        """
+        Joins the cached snippets of the given tools, in order, up to the token budget.
+        """
+        snippets, tokens = [], 0
+        for name in tool_names:
+            entry = self._index.get(name)
+            if entry is None:
+                continue
+            if snippets and tokens + entry["tokens"] > self.token_budget:
+                break
+            snippets.append(entry["snippet"])
+            tokens += entry["tokens"]
+        self._stats["catalog_tokens"] += tokens
+        self._stats["full_catalog_tokens"] += sum(entry["tokens"] for entry in self._index.values())
+        return "[" + ",".join(snippets) + "]"
+
+    def catalog(self, query: str, required_capabilities: Optional[Dict[str, List[str]]] = None) -> str:
+        """
+        Renders the catalog of the tools relevant to a directive, for a planning prompt.
+        """
+        return self.render_catalog(self.select(query, required_capabilities))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns counters and the average share of the full catalog's tokens that made it into the rendered catalogs.
+        """
+        full = self._stats["full_catalog_tokens"]
+        return {**self._stats, "tools_indexed": len(self._index), "catalog_ratio": self._stats["catalog_tokens"] / full if full else 0.0}
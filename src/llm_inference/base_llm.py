@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional
+import json
 
 class LLMProviderInterface(ABC):
     """
@@ -34,6 +35,58 @@ class LLMProviderInterface(ABC):
         """
         pass
 
+    def generate_structured(self, prompt: str, schema: Dict[str, Any], max_tokens: int, temperature: float,
+                            chat_history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """
+        Generates a response that conforms to a JSON schema.
+        Providers that support constrained decoding should override this; the default generates freely and
+        parses the first JSON value out of the output.
+        Args:
+            prompt (str): The input prompt for the LLM.
+            schema (Dict[str, Any]): JSON schema the output must conform to.
+            max_tokens (int): The maximum number of tokens to generate.
+            temperature (float): Controls creativity/randomness.
+            chat_history (Optional[List[Dict[str, str]]]): List of previous messages.
+        Returns:
+            Dict[str, Any]: 'generated_text' (str), 'tokens_generated' (int) and 'data', the parsed JSON value
+            (None if the output could not be parsed).
+        """
+        kwargs: Dict[str, Any] = {"max_tokens": max_tokens, "temperature": temperature}
+        if chat_history is not None:
+            kwargs["chat_history"] = chat_history
+        response = self.generate_response(prompt, **kwargs)
+        return {**response, "data": self.parse_json_output(response.get("generated_text", ""))}
+
+    def generate_structured_batch(self, prompts: List[str], schema: Dict[str, Any], max_tokens: int,
+                                  temperature: float) -> List[Dict[str, Any]]:
+        """
+        Generates schema-conforming responses for several independent prompts.
+        Providers that can evaluate prompts in one batch should override this; the default generates them one by one.
+        Returns one generate_structured response per prompt, in order.
+        """
+        return [self.generate_structured(prompt, schema, max_tokens=max_tokens, temperature=temperature) for prompt in prompts]
+
+    @staticmethod
+    def parse_json_output(text: str) -> Optional[Any]:
+        """
+        Parses the first top-level JSON object or array in the text, ignoring anything around it. Returns None if there is none.
+        """
+        decoder = json.JSONDecoder()
+        for index, char in enumerate(text):
+            if char in "{[":
+                try:
+                    return decoder.raw_decode(text, index)[0]
+                except json.JSONDecodeError:
+                    continue
+        return None
+
+    def count_tokens(self, text: str) -> int:
+        """
+        Returns the number of tokens the text occupies in the model's context.
+        Providers with access to their tokenizer should override this rough estimate (about 4 characters per token).
+        """
+        return (len(text) + 3) // 4
+
     @abstractmethod
     def get_status(self) -> Dict[str, Any]:
         """
@@ -0,0 +1,71 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Any, Dict, List, Optional
+from src.llm_inference.base_llm import LLMProviderInterface
+
+class InferenceQueue:
+    """
+    Serializes generation requests to a single LLM provider through one FIFO worker thread.
+    A loaded model (e.g., a llama.cpp context) can only run one generation at a time, so directives
+    processed concurrently share the model through this queue instead of each loading their own copy.
+    """
+
+    def __init__(self, llm_provider: LLMProviderInterface):
+        self.llm_provider = llm_provider
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm_inference")
+
+    def submit(self, prompt: str, max_tokens: int, temperature: float, chat_history: Optional[List[Dict[str, str]]] = None) -> Future:
+        """
+        Enqueues a generation request. Returns a Future resolving to the provider's response dictionary.
+        """
+        kwargs: Dict[str, Any] = {"max_tokens": max_tokens, "temperature": temperature}
+        if chat_history is not None:
+            kwargs["chat_history"] = chat_history
+        return self._worker.submit(self.llm_provider.generate_response, prompt, **kwargs)
+
+    def submit_structured(self, prompt: str, schema: Dict[str, Any], max_tokens: int, temperature: float,
+                          chat_history: Optional[List[Dict[str, str]]] = None) -> Future:
+        """
+        Enqueues a schema-constrained generation request (see LLMProviderInterface.generate_structured).
+        """
+        kwargs: Dict[str, Any] = {"max_tokens": max_tokens, "temperature": temperature}
+        if chat_history is not None:
+            kwargs["chat_history"] = chat_history
+        return self._worker.submit(self.llm_provider.generate_structured, prompt, schema, **kwargs)
+
+    def generate_response(self, prompt: str, max_tokens: int, temperature: float, chat_history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """
+        Blocks until the request has been processed by the queue and returns the provider's response.
+        """
+        return self.submit(prompt, max_tokens, temperature, chat_history).result()
+
+    def generate_structured(self, prompt: str, schema: Dict[str, Any], max_tokens: int, temperature: float,
+                            chat_history: Optional[List[Dict[str, str]]] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Blocks until the schema-constrained request has been processed and returns the provider's response, including 'data'.
+        Raises concurrent.futures.TimeoutError if no response arrives within timeout seconds; the request is dropped
+        if it hasn't started yet, otherwise its response is discarded once the generation finishes.
+        """
+        future = self.submit_structured(prompt, schema, max_tokens, temperature, chat_history)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def generate_structured_batch(self, prompts: List[str], schema: Dict[str, Any], max_tokens: int, temperature: float) -> List[Dict[str, Any]]:
+        """
+        Processes several schema-constrained prompts as one queue entry, so requests of other directives
+        can't interleave with the batch, and returns one response per prompt.
+        """
+        return self._worker.submit(self.llm_provider.generate_structured_batch, prompts, schema,
+                                   max_tokens=max_tokens, temperature=temperature).result()
+
+    async def generate_response_async(self, prompt: str, max_tokens: int, temperature: float, chat_history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """
+        Awaitable variant of generate_response; the event loop stays free while the request waits and runs.
+        """
+        return await asyncio.wrap_future(self.submit(prompt, max_tokens, temperature, chat_history))
+
+    def shutdown(self, wait: bool = True):
+        self._worker.shutdown(wait=wait)
@@ -1,7 +1,8 @@
 import os
 import sys
+import json
 from contextlib import contextmanager
-from llama_cpp import Llama
+from llama_cpp import Llama, LlamaGrammar
 from typing import Any, Dict, List, Optional
 from ..base_llm import LLMProviderInterface
 
@@ -22,6 +23,7 @@ class LlamaCppProvider(LLMProviderInterface):
         self.n_batch = config.get("n_batch", 512)
         self.verbose = config.get("verbose", False)
         self.llm_instance: Optional[Llama] = None
+        self._grammars: Dict[str, LlamaGrammar] = {} # Compiled grammars by serialized JSON schema
 
         if not self.model_path:
             raise ValueError("Model path must be provided in LLM provider configuration.")
@@ -66,6 +68,24 @@ class LlamaCppProvider(LLMProviderInterface):
             self.llm_instance = None
             return False
 
+    def _format_prompt(self, prompt: str, chat_history: Optional[List[Dict[str, str]]] = None) -> str:
+        # Instruction-tuned models typically expect a specific chat format.
+        # This format helps the model understand its role in a conversation.
+        # <bos> (beginning of sequence) is often added automatically by llama.cpp.
+        # <start_of_turn> and <end_of_turn> are common tokens for instruction-tuned models.
+        
+        # Assuming prompt is already processed or will be processed by a higher layer (Refactor)
+        processed_prompt = prompt # Placeholder for now
+
+        full_prompt_parts = []
+        if chat_history:
+            for turn in chat_history:
+                # Assuming chat_history is a list of {'role': 'user'/'assistant', 'content': '...'}
+                full_prompt_parts.append(f"<start_of_turn>{turn['role']}\n{turn['content']}<end_of_turn>\n")
+        
+        full_prompt_parts.append(f"<start_of_turn>user\n{processed_prompt}<end_of_turn>\n<start_of_turn>model\n")
+        return "".join(full_prompt_parts)
+
     def generate_response(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7, chat_history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
         """
         Runs inference with the locally loaded LLM.
@@ -74,22 +94,7 @@ class LlamaCppProvider(LLMProviderInterface):
             return {"generated_text": "Error: Local LLM model not loaded. Cannot perform inference.", "tokens_generated": 0}
 
         try:
-            # Instruction-tuned models typically expect a specific chat format.
-            # This format helps the model understand its role in a conversation.
-            # <bos> (beginning of sequence) is often added automatically by llama.cpp.
-            # <start_of_turn> and <end_of_turn> are common tokens for instruction-tuned models.
-            
-            # Assuming prompt is already processed or will be processed by a higher layer (Refactor)
-            processed_prompt = prompt # Placeholder for now
-
-            full_prompt_parts = []
-            if chat_history:
-                for turn in chat_history:
-                    # Assuming chat_history is a list of {'role': 'user'/'assistant', 'content': '...'}
-                    full_prompt_parts.append(f"<start_of_turn>{turn['role']}\n{turn['content']}<end_of_turn>\n")
-            
-            full_prompt_parts.append(f"<start_of_turn>user\n{processed_prompt}<end_of_turn>\n<start_of_turn>model\n")
-            formatted_prompt = "".join(full_prompt_parts)
+            formatted_prompt = self._format_prompt(prompt, chat_history)
 
             with self._suppress_stdout_stderr():
                 output = self.llm_instance(
@@ -112,6 +117,51 @@ class LlamaCppProvider(LLMProviderInterface):
         except Exception as e:
             return {"generated_text": f"Error during LLM inference: {e}", "tokens_generated": 0}
 
+    def _grammar_for(self, schema: Dict[str, Any]) -> LlamaGrammar:
+        key = json.dumps(schema, sort_keys=True)
+        if key not in self._grammars:
+            with self._suppress_stdout_stderr():
+                self._grammars[key] = LlamaGrammar.from_json_schema(key, verbose=self.verbose)
+        return self._grammars[key]
+
+    def generate_structured(self, prompt: str, schema: Dict[str, Any], max_tokens: int = 256, temperature: float = 0.7,
+                            chat_history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """
+        Runs grammar-constrained inference: only tokens that keep the output valid under the JSON schema can be sampled,
+        and once the top-level value is closed the grammar only admits end of generation, so no tokens are spent after it.
+        """
+        if self.llm_instance is None:
+            return {"generated_text": "Error: Local LLM model not loaded. Cannot perform inference.", "tokens_generated": 0, "data": None}
+
+        try:
+            grammar = self._grammar_for(schema)
+            with self._suppress_stdout_stderr():
+                output = self.llm_instance(
+                    prompt=self._format_prompt(prompt, chat_history),
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    grammar=grammar,
+                    stop=["<end_of_turn>", "<eos>"],
+                    echo=False
+                )
+            generated_text = output["choices"][0]["text"]
+            return {
+                "generated_text": generated_text,
+                "tokens_generated": output["usage"]["completion_tokens"],
+                # Output cut off by max_tokens is still unparseable
+                "data": self.parse_json_output(generated_text)
+            }
+        except Exception as e:
+            return {"generated_text": f"Error during LLM inference: {e}", "tokens_generated": 0, "data": None}
+
+    def count_tokens(self, text: str) -> int:
+        """
+        Counts tokens with the loaded model's tokenizer, falling back to an estimate if no model is loaded.
+        """
+        if self.llm_instance is None:
+            return super().count_tokens(text)
+        return len(self.llm_instance.tokenize(text.encode("utf-8"), add_bos=False))
+
     def get_status(self) -> Dict[str, Any]:
         """
         Returns the current status of the LLM provider.
@@ -1,6 +1,9 @@
 import unittest
+import asyncio
 import os
+import threading
 import json
+import numpy as np
 from unittest.mock import MagicMock, patch, ANY
 from typing import Any
 
@@ -10,6 +13,8 @@ from src.core.memory.working_memory_manager import WorkingMemoryManager
 from src.core.memory.thought_process_manager import ThoughtProcessManager
 from src.core.tooling.tool_manager import ToolManager
 from src.llm_inference.base_llm import LLMProviderInterface
+from src.core.agent.schemas import REFACTOR_SCHEMA
+from src.core.agent.deadline import Deadline
 
 class TestAgent(unittest.TestCase):
 
@@ -28,6 +33,7 @@ class TestAgent(unittest.TestCase):
         self.mock_tool_manager = MagicMock(spec=ToolManager)
         self.mock_llm_provider = MagicMock(spec=LLMProviderInterface)
         self.mock_llm_provider.config = self.llm_config # Add config attribute to mock
+        self.mock_llm_provider.count_tokens.side_effect = lambda text: (len(text) + 3) // 4
 
         # Patch constructors and methods that Agent calls
         patcher_ltm_class = patch('src.core.agent.agent.LongTermMemoryManager', return_value=self.mock_long_term_memory)
@@ -56,18 +62,20 @@ class TestAgent(unittest.TestCase):
 
     def test_agent_initialization(self):
         agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        agent.warmup()
 
         # Verify managers are instantiated with correct arguments
         expected_db_path = os.path.join(self.project_root, ".severino", "knowledge", "mnemonic.db")
         self.mock_ltm_class.assert_called_once_with(expected_db_path)
-        self.mock_wm_class.assert_called_once_with(session_id=self.session_id, project_root=self.project_root)
+        self.mock_wm_class.assert_called_once_with(session_id=self.session_id, project_root=self.project_root,
+                                                   long_term_memory_manager=self.mock_long_term_memory)
         self.mock_tpm_class.assert_called_once_with(session_id=self.session_id)
         self.mock_tm_class.assert_called_once()
 
         # Verify LLM provider is created and loaded
         self.mock_llm_provider.load_llm.assert_called_once()
         self.mock_tool_manager.register_tool.assert_any_call(
-            tool_definition={'name': 'run_shell_command', 'description': 'Executes a shell command.', 'parameters': {'command': {'type': 'string'}}, 'side_effects': True},
+            tool_definition={'name': 'run_shell_command', 'description': 'Executes a shell command.', 'parameters': {'command': {'type': 'string'}, 'timeout_seconds': {'type': 'number'}}, 'side_effects': True},
             implementation=agent._run_shell_command_impl
         )
         self.mock_tool_manager.register_tool.assert_any_call(
@@ -88,10 +96,33 @@ class TestAgent(unittest.TestCase):
 
     def test_agent_initialization_llm_load_failure(self):
         self.mock_llm_provider.load_llm.return_value = False
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
         with self.assertRaises(RuntimeError) as cm:
-            Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+            agent.warmup()
         self.assertIn("Failed to load LLM provider for the agent.", str(cm.exception))
 
+    def test_agent_components_are_constructed_lazily(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        self.mock_ltm_class.assert_not_called()
+        self.mock_wm_class.assert_not_called()
+        self.mock_tm_class.assert_not_called()
+        self.mock_llm_factory.assert_not_called()
+
+        # Tool-only use registers the core tools without loading the model
+        agent.tool_manager.get_all_tool_definitions()
+        self.assertIs(agent.tool_manager, self.mock_tool_manager)
+        self.mock_tm_class.assert_called_once()
+        self.mock_llm_factory.assert_not_called()
+
+        # The working memory shares the agent's memory manager
+        agent.working_memory
+        self.mock_ltm_class.assert_called_once()
+        self.assertIs(self.mock_wm_class.call_args.kwargs["long_term_memory_manager"], self.mock_long_term_memory)
+
+        agent.llm_provider
+        agent.llm_provider
+        self.mock_llm_provider.load_llm.assert_called_once()
+
     def test_process_directive_flow(self):
         agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
 
@@ -105,11 +136,13 @@ class TestAgent(unittest.TestCase):
         #     {"generated_text": json.dumps({"summary": "Child monitored", "key_findings": ["Child detected near balcony"], "recommendations": ["Continue monitoring"]})}
         # ]
 
+        self.mock_thought_process_manager.get_thought_log.return_value = []
+
         # Mock tool execution for the plan step (if _execute_plan is called)
         self.mock_tool_manager.execute_tool.return_value = {"status": "success", "detections": [{"class_name": "child"}]}
 
         # Patch Agent's internal methods to control their behavior
-        with patch.object(agent, '_refactor_directive', return_value={'goal': 'child_safety', 'entities': ['child', 'balcony'], 'required_capabilities': {'sensors': ['video_camera'], 'ml_models': ['object_detection']}}) as mock_refactor,
+        with (patch.object(agent, '_refactor_directive', return_value={'goal': 'child_safety', 'entities': ['child', 'balcony'], 'required_capabilities': {'sensors': ['video_camera'], 'ml_models': ['object_detection']}}) as mock_refactor,
              patch.object(agent, '_break_down_task', return_value=[{'description': 'Connect camera', 'tool_call': {'tool_name': 'main_camera_sensor', 'args': {'operation': 'connect'}}},
                                                                  {'description': 'Read frame', 'tool_call': {'tool_name': 'main_camera_sensor', 'args': {'operation': 'read_data'}}},
                                                                  {'description': 'Load object detector', 'tool_call': {'tool_name': 'object_detection_model', 'args': {'operation': 'load_model'}}},
@@ -122,7 +155,7 @@ class TestAgent(unittest.TestCase):
                                                               {'step': 'Predict objects', 'result': [{'class_name': 'child', 'box': [1,2,3,4]}]},
                                                               {'step': 'Analyze child position', 'result': {'generated_text': 'Child is near edge.'}},
                                                               {'step': 'Send alert', 'result': {'status': 'success'}}]) as mock_execute_plan,
-             patch.object(agent, '_compile_results', return_value={'summary': 'Child monitored', 'key_findings': ['Child detected near balcony'], 'recommendations': ['Continue monitoring']}) as mock_compile:
+             patch.object(agent, '_compile_results', return_value={'summary': 'Child monitored', 'key_findings': ['Child detected near balcony'], 'recommendations': ['Continue monitoring']}) as mock_compile):
 
             directive = "Watch my child on the balcony."
             result = agent.process_directive(directive)
@@ -141,7 +174,7 @@ class TestAgent(unittest.TestCase):
             # Instead, we assert that the patched methods were called.
             mock_refactor.assert_called_once_with(directive)
             mock_break_down.assert_called_once_with(mock_refactor.return_value)
-            mock_execute_plan.assert_called_once_with(mock_break_down.return_value)
+            mock_execute_plan.assert_called_once_with(mock_break_down.return_value, on_step_complete=ANY, cancel_event=ANY, checkpoint_run_id=None)
             mock_compile.assert_called_once_with(mock_execute_plan.return_value)
 
             # Verify working memory update
@@ -153,5 +186,625 @@ class TestAgent(unittest.TestCase):
             self.assertIsInstance(result["insight"], dict)
             self.assertIsInstance(result["thought_log"], list)
 
+    def test_execute_plan_passes_frame_to_prediction(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        frame = np.zeros((4, 4, 3))
+
+        def execute_tool(tool_name, args, require_confirmation=True):
+            operation = args.get("operation")
+            if operation == "read_data":
+                return frame
+            if operation == "predict":
+                self.assertIs(args["data"], frame)
+                return [{"class_name": "child"}]
+            return True
+        self.mock_tool_manager.execute_tool.side_effect = execute_tool
+
+        plan = [
+            {'description': 'Connect camera', 'tool_call': {'tool_name': 'main_camera_sensor', 'args': {'operation': 'connect'}}},
+            {'description': 'Read frame', 'tool_call': {'tool_name': 'main_camera_sensor', 'args': {'operation': 'read_data'}}},
+            {'description': 'Load object detector', 'tool_call': {'tool_name': 'object_detection_model', 'args': {'operation': 'load_model'}}},
+            {'description': 'Predict objects', 'tool_call': {'tool_name': 'object_detection_model', 'args': {'operation': 'predict', 'data': '<frame_placeholder>'}}},
+            {'description': 'Reason about it'}
+        ]
+        results = agent._execute_plan(plan)
+
+        self.assertEqual([r["status"] for r in results], ["executed", "executed", "executed", "executed", "no_tool_call"])
+        self.assertEqual(results[1]["result"], "Frame captured.")
+        self.assertEqual(results[2]["result"], "Model loaded.")
+        self.assertEqual(results[3]["result"], {"detections": [{"class_name": "child"}]})
+
+    def test_execute_plan_skips_prediction_without_frame(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        self.mock_tool_manager.execute_tool.side_effect = lambda tool_name, args, require_confirmation=True: None if args.get("operation") == "read_data" else True
+
+        plan = [
+            {'description': 'Read frame', 'tool_call': {'tool_name': 'main_camera_sensor', 'args': {'operation': 'read_data'}}},
+            {'description': 'Load object detector', 'tool_call': {'tool_name': 'object_detection_model', 'args': {'operation': 'load_model'}}},
+            {'description': 'Predict objects', 'tool_call': {'tool_name': 'object_detection_model', 'args': {'operation': 'predict', 'data': '<frame_placeholder>'}}}
+        ]
+        results = agent._execute_plan(plan)
+
+        self.assertEqual(results[0]["status"], "failed")
+        self.assertEqual(results[2]["status"], "skipped")
+
+    def test_fused_mode_uses_single_generation(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, pipeline_mode="fused")
+        interpretation = {'goal': 'child_safety', 'entities': ['child'], 'context': '', 'required_capabilities': {}}
+        plan = [{'description': 'Check the balcony'}]
+        fused = {"interpretation": interpretation, "plan": plan}
+        self.mock_llm_provider.generate_structured.return_value = {"generated_text": json.dumps(fused), "data": fused}
+
+        refactored_data, refined_plan = agent._refactor_and_break_down("Watch my child on the balcony.")
+
+        self.assertEqual(refactored_data, interpretation)
+        self.assertEqual(refined_plan, plan)
+        self.mock_llm_provider.generate_structured.assert_called_once()
+
+    def test_fused_mode_falls_back_to_break_down_on_missing_plan(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, pipeline_mode="fused")
+        interpretation = {'goal': 'child_safety', 'entities': ['child'], 'required_capabilities': {}}
+        fused = {"interpretation": interpretation}
+        self.mock_llm_provider.generate_structured.return_value = {"generated_text": json.dumps(fused), "data": fused}
+
+        with patch.object(agent, '_break_down_task', return_value=[{'description': 'fallback'}]) as mock_break_down:
+            refactored_data, refined_plan = agent._refactor_and_break_down("Watch my child on the balcony.")
+
+        mock_break_down.assert_called_once_with(interpretation)
+        self.assertEqual(refined_plan, [{'description': 'fallback'}])
+
+    def test_fused_mode_logs_same_thoughts(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, pipeline_mode="fused")
+        with (patch.object(agent, '_refactor_and_break_down', return_value=({'goal': 'g'}, [])) as mock_fused,
+              patch.object(agent, '_refactor_directive') as mock_refactor,
+              patch.object(agent, '_execute_plan', return_value=[]),
+              patch.object(agent, '_compile_results', return_value={})):
+            agent.process_directive("Watch my child on the balcony.")
+
+        mock_fused.assert_called_once()
+        mock_refactor.assert_not_called()
+        self.mock_thought_process_manager.log_thought.assert_any_call("Refactor Step", "Directive interpreted and initial data structured.", {"refactored_data": {'goal': 'g'}})
+        self.mock_thought_process_manager.log_thought.assert_any_call("Break Down Step", "Task decomposed into a plan.", {"plan": []})
+
+    def test_invalid_pipeline_mode(self):
+        with self.assertRaises(ValueError):
+            Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, pipeline_mode="turbo")
+
+    def test_directive_cache_hit_skips_refactor_and_break_down(self):
+        with patch('src.core.agent.agent.DirectiveCache') as mock_cache_class:
+            agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, directive_cache_config={})
+            agent.warmup()
+        mock_cache_class.assert_called_once_with(self.mock_long_term_memory, {})
+        agent.directive_cache.lookup.return_value = {
+            "directive": "Watch the balcony camera", "similarity": 0.97,
+            "refactored_data": {'goal': 'child_safety'}, "plan": [{'description': 'cached step'}]
+        }
+
+        with (patch.object(agent, '_refactor_directive') as mock_refactor,
+              patch.object(agent, '_break_down_task') as mock_break_down):
+            refactored_data, plan = agent._plan_directive("Monitor balcony cam")
+
+        mock_refactor.assert_not_called()
+        mock_break_down.assert_not_called()
+        self.assertEqual(plan, [{'description': 'cached step'}])
+        agent.directive_cache.store.assert_not_called()
+
+    def test_directive_cache_miss_stores_plan(self):
+        with patch('src.core.agent.agent.DirectiveCache'):
+            agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, directive_cache_config={})
+            agent.warmup()
+        agent.directive_cache.lookup.return_value = None
+
+        with (patch.object(agent, '_refactor_directive', return_value={'goal': 'g'}),
+              patch.object(agent, '_break_down_task', return_value=[{'description': 'step'}])):
+            agent._plan_directive("Watch the balcony camera")
+
+        agent.directive_cache.store.assert_called_once_with("Watch the balcony camera", {'goal': 'g'}, [{'description': 'step'}])
+
+    def test_process_directive_stream_yields_events_in_order(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        agent.thought_process_manager = ThoughtProcessManager(self.session_id)
+        plan = [{'description': 'Connect camera', 'tool_call': {'tool_name': 'main_camera_sensor', 'args': {'operation': 'connect'}}},
+                {'description': 'Think'}]
+        self.mock_tool_manager.execute_tool.return_value = True
+
+        with (patch.object(agent, '_refactor_directive', return_value={'goal': 'g'}),
+              patch.object(agent, '_break_down_task', return_value=plan),
+              patch.object(agent, '_compile_results', return_value={'summary': 'done'})):
+            events = list(agent.process_directive_stream("Check the camera"))
+
+        types = [event["type"] for event in events]
+        self.assertEqual(types[:3], ["thought", "thought", "thought"]) # Directive Received, Refactor, Break Down
+        self.assertEqual(sorted(event["index"] for event in events if event["type"] == "step_result"), [0, 1])
+        self.assertLess(types.index("step_result"), [event.get("entry", {}).get("step_name") for event in events].index("Execution Step"))
+        self.assertEqual(types[-2:], ["insight", "complete"])
+        self.assertEqual(events[-1]["insight"], {'summary': 'done'})
+
+    def test_process_directive_stream_can_be_cancelled(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        agent.thought_process_manager = ThoughtProcessManager(self.session_id)
+        with (patch.object(agent, '_refactor_directive', return_value={'goal': 'g'}),
+              patch.object(agent, '_break_down_task', return_value=[]),
+              patch.object(agent, '_execute_plan') as mock_execute_plan,
+              patch.object(agent, '_compile_results') as mock_compile):
+            stream = agent.process_directive_stream("Check the camera")
+            next(stream) # Directive Received
+            stream.close()
+
+        mock_execute_plan.assert_not_called()
+        mock_compile.assert_not_called()
+
+    def test_process_directive_async_isolates_concurrent_directives(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        barrier = threading.Barrier(2, timeout=5)
+
+        def execute_plan(plan, on_step_complete=None, cancel_event=None, checkpoint_run_id=None):
+            barrier.wait() # Both directives must be executing at the same time
+            return [{"step": plan[0]["description"], "status": "executed"}]
+
+        with (patch('src.core.agent.agent.ThoughtProcessManager', side_effect=lambda session_id: ThoughtProcessManager(session_id)),
+              patch.object(agent, '_refactor_directive', side_effect=lambda directive: {'goal': directive}),
+              patch.object(agent, '_break_down_task', side_effect=lambda data: [{'description': data['goal']}]),
+              patch.object(agent, '_execute_plan', side_effect=execute_plan),
+              patch.object(agent, '_compile_results', side_effect=lambda results: {'summary': results[0]['step']})):
+            async def run():
+                return await asyncio.gather(agent.process_directive_async("watch camera A"), agent.process_directive_async("watch camera B"))
+            result_a, result_b = asyncio.run(run())
+
+        self.assertEqual(result_a["insight"], {'summary': 'watch camera A'})
+        self.assertEqual(result_b["insight"], {'summary': 'watch camera B'})
+        self.assertEqual([entry["description"] for entry in result_a["thought_log"]][0], "watch camera A")
+        self.assertEqual([entry["description"] for entry in result_b["thought_log"]][0], "watch camera B")
+        self.assertEqual(len(result_a["thought_log"]), 5)
+
+    def test_compile_standing_job_plans_once(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        plan = [{'description': 'Read frame', 'tool_call': {'tool_name': 'main_camera_sensor', 'args': {'operation': 'read_data'}}},
+                {'description': 'Predict objects', 'tool_call': {'tool_name': 'object_detection_model', 'args': {'operation': 'predict', 'data': '<frame_placeholder>'}}}]
+        with patch.object(agent, '_plan_directive', return_value=({'goal': 'g'}, plan)) as mock_plan:
+            job = agent.compile_standing_job("Watch the balcony", condition=lambda slots: False, rate_hz=5)
+
+        mock_plan.assert_called_once_with("Watch the balcony")
+        self.assertEqual(len(job.iteration_steps), 2)
+        self.assertEqual(job.iteration_steps[1]["outputs"], ["detections"])
+        self.assertEqual(job.rate_hz, 5)
+
+    def test_procedural_memory_exact_match_skips_break_down(self):
+        with patch('src.core.agent.agent.ProceduralMemory'):
+            agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, procedural_memory_config={})
+            agent.warmup()
+        agent.procedural_memory.find_template.return_value = {
+            "template": {"goal": "child_safety", "template_id": 1}, "plan": [{'description': 'from template'}], "match": "exact", "similarity": 1.0
+        }
+
+        with (patch.object(agent, '_refactor_directive', return_value={'goal': 'child_safety'}),
+              patch.object(agent, '_break_down_task') as mock_break_down):
+            refactored_data, plan = agent._plan_directive("Watch the pool")
+
+        mock_break_down.assert_not_called()
+        self.assertEqual(plan, [{'description': 'from template'}])
+
+    def test_procedural_memory_vector_match_asks_for_delta(self):
+        with patch('src.core.agent.agent.ProceduralMemory'):
+            agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, procedural_memory_config={})
+            agent.warmup()
+        agent.procedural_memory.find_template.return_value = {
+            "template": {"goal": "child_safety", "template_id": 1}, "plan": [{'description': 'a'}, {'description': 'b'}], "match": "vector", "similarity": 0.9
+        }
+        delta = {"remove": [0], "append": [{"description": "c"}]}
+        self.mock_llm_provider.generate_structured.return_value = {"generated_text": json.dumps(delta), "data": delta}
+
+        with patch.object(agent, '_refactor_directive', return_value={'goal': 'pool_safety'}):
+            refactored_data, plan = agent._plan_directive("Watch the pool")
+
+        self.assertEqual(plan, [{'description': 'b'}, {'description': 'c'}])
+        self.assertEqual(self.mock_llm_provider.generate_structured.call_args.kwargs["max_tokens"], 250)
+
+    def test_successful_plan_is_learned(self):
+        with patch('src.core.agent.agent.ProceduralMemory'):
+            agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, procedural_memory_config={})
+            agent.warmup()
+        agent._learn_plan({'goal': 'g'}, [{'description': 's'}], [{'status': 'executed'}])
+        agent.procedural_memory.record_success.assert_called_once_with({'goal': 'g'}, [{'description': 's'}])
+        agent._learn_plan({'goal': 'g'}, [{'description': 's'}], [{'status': 'failed'}])
+        agent.procedural_memory.record_success.assert_called_once()
+
+        deadline = Deadline(10.0)
+        deadline.degraded_stages.append("break_down")
+        token = agent._directive_deadline.set(deadline)
+        try:
+            agent._learn_plan({'goal': 'g'}, [{'description': 's'}], [{'status': 'executed'}]) # A fallback plan isn't learned
+        finally:
+            agent._directive_deadline.reset(token)
+        agent.procedural_memory.record_success.assert_called_once()
+
+    def test_compile_results_prompt_is_compacted(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, compile_token_budget=200)
+        insight = {"summary": "ok", "key_findings": [], "recommendations": []}
+        self.mock_llm_provider.generate_structured.return_value = {"generated_text": json.dumps(insight), "data": insight}
+        detections = [{"class_name": "person", "confidence": 0.9, "box": [0, 0, 10, 10]} for _ in range(500)]
+        execution_results = [
+            {"tool_name": "object_detector", "status": "executed", "result": {"detections": detections}},
+            {"tool_name": "run_shell_command", "status": "executed", "result": {"stdout": "x" * 20000, "stderr": ""}}
+        ]
+
+        insight = agent._compile_results(execution_results)
+
+        self.assertEqual(insight["summary"], "ok")
+        prompt = self.mock_llm_provider.generate_structured.call_args[0][0]
+        self.assertIn('"by_class":{"person":{"count":500', prompt)
+        self.assertIn("chars omitted", prompt)
+        self.assertLess(len(prompt), 3000)
+
+    def test_map_reduce_compile_for_large_results(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, compile_token_budget=100, compile_mode="map_reduce")
+        agent.thought_process_manager = ThoughtProcessManager(self.session_id)
+        execution_results = [{"step": f"Read sensor {index}", "status": "executed", "result": "reading " * 30} for index in range(8)]
+        self.mock_llm_provider.generate_structured_batch.side_effect = lambda prompts, schema, **kwargs: [
+            {"generated_text": "", "data": {"summary": f"part {index}", "key_findings": ["f"], "recommendations": []}} for index in range(len(prompts))]
+        final = {"summary": "all sensors read", "key_findings": ["f"], "recommendations": []}
+        self.mock_llm_provider.generate_structured.return_value = {"generated_text": json.dumps(final), "data": final}
+
+        insight = agent._compile_results(execution_results)
+
+        self.assertEqual(insight, final)
+        map_prompts = self.mock_llm_provider.generate_structured_batch.call_args_list[0][0][0]
+        self.assertGreater(len(map_prompts), 1)
+        self.assertNotIn("elided_steps", "".join(map_prompts)) # Every result reaches a map prompt
+        self.assertIn("partial insights", self.mock_llm_provider.generate_structured.call_args[0][0])
+        self.assertIn("Compile Map", [entry["step_name"] for entry in agent.thought_process_manager.get_thought_log()])
+
+    def test_map_reduce_compile_merges_partials_when_degraded(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, compile_token_budget=100, compile_mode="map_reduce")
+        agent.thought_process_manager = ThoughtProcessManager(self.session_id)
+        agent._stage_latency["compile"] = 60.0
+        self.mock_llm_provider.generate_structured_batch.side_effect = lambda prompts, schema, **kwargs: [
+            {"generated_text": "", "data": {"summary": f"part {index}.", "key_findings": ["same"], "recommendations": []}} for index in range(len(prompts))]
+        execution_results = [{"step": f"Read sensor {index}", "status": "executed", "result": "reading " * 30} for index in range(4)]
+
+        token = agent._directive_deadline.set(Deadline(10.0))
+        try:
+            insight = agent._compile_results(execution_results)
+        finally:
+            agent._directive_deadline.reset(token)
+
+        self.assertTrue(insight["degraded"])
+        self.assertEqual(insight["key_findings"], ["same"])
+        self.assertTrue(insight["summary"].startswith("part 0."))
+        self.mock_llm_provider.generate_structured.assert_not_called()
+
+    def test_map_reduce_compile_stops_reducing_at_the_deadline(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, compile_token_budget=100, compile_mode="map_reduce")
+        agent.thought_process_manager = ThoughtProcessManager(self.session_id)
+        deadline = Deadline(10.0)
+        def map_batch(prompts, schema, **kwargs):
+            deadline.expires_at = 0.0 # The map used up the rest of the budget
+            return [{"generated_text": "", "data": {"summary": f"part {index}.", "key_findings": [f"finding {index}"], "recommendations": []}}
+                    for index in range(len(prompts))]
+        self.mock_llm_provider.generate_structured_batch.side_effect = map_batch
+        execution_results = [{"step": f"Read sensor {index}", "status": "executed", "result": "reading " * 30} for index in range(8)]
+
+        token = agent._directive_deadline.set(deadline)
+        try:
+            insight = agent._compile_results(execution_results)
+            templated = agent._compile_results(execution_results) # No time left before the map either
+        finally:
+            agent._directive_deadline.reset(token)
+
+        self.assertTrue(insight["degraded"])
+        self.assertEqual(len(insight["key_findings"]), len(self.mock_llm_provider.generate_structured_batch.call_args[0][0]))
+        self.assertEqual(self.mock_llm_provider.generate_structured_batch.call_count, 1) # No reduce batches after the deadline
+        self.mock_llm_provider.generate_structured.assert_not_called()
+        self.assertIn("template", templated["summary"])
+        degraded = [entry for entry in agent.thought_process_manager.get_thought_log() if entry["step_name"] == "Stage Degraded"]
+        self.assertEqual([entry["details"]["fallback"] for entry in degraded],
+                         ["merged the partial insights without the LLM", "emitted a templated insight"])
+
+    def test_stages_use_schema_constrained_generation(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        refactored = {'goal': 'child_safety', 'entities': ['child'], 'context': '', 'required_capabilities': {}}
+        self.mock_llm_provider.generate_structured.return_value = {"generated_text": json.dumps(refactored), "tokens_generated": 20, "data": refactored}
+
+        self.assertEqual(agent._refactor_directive("Watch my child."), refactored)
+        self.assertIs(self.mock_llm_provider.generate_structured.call_args[0][1], REFACTOR_SCHEMA)
+        self.mock_llm_provider.generate_response.assert_not_called()
+
+    def test_unparseable_structured_output_falls_back(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        self.mock_llm_provider.generate_structured.return_value = {"generated_text": "not json", "tokens_generated": 2, "data": None}
+
+        self.assertEqual(agent._refactor_directive("Watch my child."), {"raw_directive": "Watch my child.", "interpretation_error": "not json"})
+        self.assertEqual(agent._break_down_task({})[0]["error"], "not json")
+        self.assertEqual(agent._compile_results([])["compilation_error"], "not json")
+
+    def test_deadline_degrades_slow_stages(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        agent.thought_process_manager = ThoughtProcessManager(self.session_id)
+        refactored = {'goal': 'child_safety', 'required_capabilities': {'sensors': ['video_camera'], 'ml_models': ['object_detection']}}
+        agent._stage_latency.update({"break_down": 60.0, "compile": 60.0}) # Observed on an overloaded box
+        execution_results = [{'step': 'Perform object_detection on frame', 'status': 'executed',
+                              'result': {'detections': [{'class_name': 'person', 'confidence': 0.8}]}}]
+
+        with (patch.object(agent, '_refactor_directive', return_value=refactored),
+              patch.object(agent, '_execute_plan', return_value=execution_results) as mock_execute_plan):
+            result = agent.process_directive("Watch my child on the balcony.", deadline_seconds=5.0)
+
+        self.mock_llm_provider.generate_structured.assert_not_called()
+        self.assertEqual(mock_execute_plan.call_args[0][0], Agent._plan_skeleton(refactored))
+        self.assertTrue(result["insight"]["degraded"])
+        self.assertIn("1 person (max confidence 0.80)", result["insight"]["key_findings"][0])
+        degraded = [entry["details"]["stage"] for entry in result["thought_log"] if entry["step_name"] == "Stage Degraded"]
+        self.assertEqual(degraded, ["break_down", "compile"])
+        timings = [entry["details"]["stage"] for entry in result["thought_log"] if entry["step_name"] == "Stage Timing"]
+        self.assertEqual(timings, ["execute"])
+
+    def test_deadline_times_out_generation(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        agent.thought_process_manager = ThoughtProcessManager(self.session_id)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        self.mock_llm_provider.generate_structured.side_effect = lambda *args, **kwargs: release.wait(5) and {"data": []}
+        refactored = {'goal': 'g', 'required_capabilities': {'sensors': ['video_camera']}}
+
+        token = agent._directive_deadline.set(Deadline(0.2))
+        try:
+            plan = agent._break_down_task(refactored)
+        finally:
+            agent._directive_deadline.reset(token)
+
+        self.assertEqual(plan, Agent._plan_skeleton(refactored))
+        self.assertEqual(agent.thought_process_manager.get_thought_log()[-1]["details"]["reason"], "Generation timed out.")
+
+    def test_without_deadline_stages_are_not_degraded(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        agent._stage_latency["compile"] = 60.0
+        insight = {"summary": "ok", "key_findings": [], "recommendations": []}
+        self.mock_llm_provider.generate_structured.return_value = {"generated_text": json.dumps(insight), "data": insight}
+        self.assertEqual(agent._compile_results([]), insight)
+
+    def test_process_directives_batches_stages(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        refactored = {'goal': 'watch', 'entities': [], 'context': '', 'required_capabilities': {'sensors': ['video_camera']}}
+        insight = {"summary": "ok", "key_findings": [], "recommendations": []}
+        self.mock_llm_provider.generate_structured_batch.side_effect = [
+            [{"generated_text": "", "data": refactored}, {"generated_text": "", "data": refactored}], # Refactor
+            [{"generated_text": "", "data": insight}, {"generated_text": "", "data": dict(insight, summary="ok 2")}] # Compile
+        ]
+        plan = [{'description': 'Read frame', 'tool_call': {'tool_name': 'main_camera_sensor', 'args': {'operation': 'read_data'}}}]
+        self.mock_tool_manager.execute_tool.return_value = np.zeros((2, 2, 3))
+
+        directives = ["Watch camera one.", "Watch camera two.", "Watch camera one."]
+        self.mock_tpm_class.side_effect = ThoughtProcessManager # Each directive gets its own thought log
+        with patch.object(agent, '_break_down_task', return_value=plan) as mock_break_down:
+            results = agent.process_directives(directives)
+
+        self.assertEqual(len(results), 3)
+        self.assertIs(results[0], results[2]) # Identical directives are processed once
+        self.assertEqual(results[1]["insight"]["summary"], "ok 2")
+        refactor_prompts = self.mock_llm_provider.generate_structured_batch.call_args_list[0][0][0]
+        self.assertEqual(len(refactor_prompts), 2)
+        mock_break_down.assert_called_once_with(refactored) # Both directives have the same interpretation
+        self.assertEqual(self.mock_tool_manager.execute_tool.call_count, 2) # Sensor reads aren't shared between plans
+        self.mock_llm_provider.generate_structured.assert_not_called()
+        self.assertEqual([entry["step_name"] for entry in results[1]["thought_log"]],
+                         ["Directive Received", "Refactor Step", "Break Down Step", "Execution Step", "Compile Step"])
+
+    def test_process_directives_looks_up_fused_directives_once(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, pipeline_mode="fused", intent_classifier_config={})
+        self.mock_tpm_class.side_effect = ThoughtProcessManager
+        refactored = {'goal': 'watch', 'entities': [], 'context': '', 'required_capabilities': {}}
+        with (patch.object(agent, '_refactor_and_break_down', return_value=(refactored, [])) as mock_fused,
+              patch.object(agent, '_cached_plan', return_value=None) as mock_cached,
+              patch.object(agent, '_compile_results_batch', side_effect=lambda batch: [{'summary': 'done'} for _ in batch])):
+            agent.process_directives(["Watch the balcony.", "Watch the garden."])
+
+        self.assertEqual(agent.intent_classifier.get_stats()["misses"], 2)
+        self.assertEqual(mock_cached.call_count, 2)
+        self.assertEqual(mock_fused.call_count, 2)
+
+    def test_prefetch_warms_tools_during_planning(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, prefetch_config={})
+        agent.thought_process_manager = ThoughtProcessManager(self.session_id)
+        self.addCleanup(lambda: agent.prefetcher.shutdown())
+        connected = threading.Event()
+        self.mock_tool_manager.execute_tool.side_effect = lambda tool_name, args, require_confirmation: connected.set() or True
+        plan = [{'description': 'Connect camera', 'tool_call': {'tool_name': 'main_camera_sensor', 'args': {'operation': 'connect'}}}]
+
+        def break_down(refactored_data):
+            self.assertTrue(connected.wait(5)) # The camera connects while the LLM is still planning
+            return plan
+
+        with (patch.object(agent, '_refactor_directive', return_value={'goal': 'g'}),
+              patch.object(agent, '_break_down_task', side_effect=break_down),
+              patch.object(agent, '_compile_results', return_value={'summary': 'done'})):
+            result = agent.process_directive("Watch the camera.")
+
+        self.mock_tool_manager.execute_tool.assert_called_once_with("main_camera_sensor", {"operation": "connect"}, require_confirmation=False)
+        self.assertEqual(agent.prefetcher.get_stats()["claimed"], 1)
+        self.assertIn("Speculative Prefetch", [entry["step_name"] for entry in result["thought_log"]])
+
+    def test_intent_fast_path_skips_llm_planning(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, intent_classifier_config={})
+        agent.thought_process_manager = ThoughtProcessManager(self.session_id)
+        agent._stage_latency.update({"refactor": 1.5, "break_down": 2.5})
+        self.mock_tool_manager.execute_tool.return_value = True
+        self.mock_tool_manager.get_tool_names.return_value = ["main_camera_sensor", "garage_camera_sensor"]
+
+        with patch.object(agent, '_compile_results', return_value={'summary': 'done'}):
+            result = agent.process_directive("Check camera garage.")
+
+        self.mock_llm_provider.generate_structured.assert_not_called()
+        self.assertEqual(self.mock_tool_manager.execute_tool.call_count, 3)
+        self.mock_tool_manager.get_tool_names.assert_called_with("sensor")
+        self.assertEqual({call.args[0] for call in self.mock_tool_manager.execute_tool.call_args_list}, {"garage_camera_sensor"})
+        refactor_entry = next(entry for entry in result["thought_log"] if entry["step_name"] == "Refactor Step")
+        self.assertEqual(refactor_entry["details"]["refactored_data"]["entities"], ["garage"])
+        stats = agent.intent_classifier.get_stats()
+        self.assertEqual((stats["matches"], stats["estimated_seconds_saved"]), (1, 4.0))
+
+    def test_intent_fast_path_misses_fall_back_to_llm(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, intent_classifier_config={})
+        agent.thought_process_manager = ThoughtProcessManager(self.session_id)
+        with (patch.object(agent, '_refactor_directive', return_value={'goal': 'g'}) as mock_refactor,
+              patch.object(agent, '_break_down_task', return_value=[]),
+              patch.object(agent, '_compile_results', return_value={'summary': 'done'})):
+            agent.process_directive("Tell me if a child is near the balcony.")
+        mock_refactor.assert_called_once()
+        self.assertEqual(agent.intent_classifier.get_stats()["misses"], 1)
+
+    def test_interrupted_run_resumes_from_checkpoints(self):
+        self.mock_tpm_class.side_effect = ThoughtProcessManager
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, checkpoint_config={})
+        agent._components["long_term_memory"] = LongTermMemoryManager(os.path.join(self.project_root, ".severino", "knowledge", "checkpoints.db"))
+        plan = [
+            {'description': 'Build index', 'tool_call': {'tool_name': 'run_shell_command', 'args': {'command': 'make index'}}},
+            {'description': 'Run report', 'tool_call': {'tool_name': 'run_shell_command', 'args': {'command': 'make report'}}}
+        ]
+        attempts = []
+
+        def execute_tool(tool_name, args, require_confirmation):
+            attempts.append(args["command"])
+            if attempts == ["make index", "make report"]:
+                raise ConnectionError("Edge node went away.")
+            return {"stdout": args["command"], "return_code": 0}
+        self.mock_tool_manager.execute_tool.side_effect = execute_tool
+
+        with (patch.object(agent, '_refactor_directive', return_value={'goal': 'report'}) as mock_refactor,
+              patch.object(agent, '_break_down_task', return_value=plan),
+              patch.object(agent, '_compile_results', side_effect=lambda results: {'summary': [r["status"] for r in results]})):
+            first = agent.process_directive("Build the weekly report.")
+            second = agent.process_directive("Build the weekly report.")
+            third = agent.process_directive("Build the weekly report.")
+
+        self.assertEqual(first["insight"]["summary"], ["executed", "error"])
+        self.assertEqual(second["insight"]["summary"], ["executed", "executed"])
+        self.assertEqual(attempts, ["make index", "make report", "make report", "make index", "make report"])
+        self.assertIn("Plan Resumed", [entry["step_name"] for entry in second["thought_log"]])
+        self.assertNotIn("Plan Resumed", [entry["step_name"] for entry in third["thought_log"]]) # Completed runs are dropped
+        self.assertEqual(mock_refactor.call_count, 2)
+        self.assertEqual(agent.plan_checkpointer.get_stats()["restored"], 1)
+
+    @unittest.skipUnless(os.name == "posix", "The shell command below assumes a POSIX shell")
+    def test_shell_steps_pass_their_timeout_and_stream_output(self):
+        chunks = []
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config,
+                      shell_output_callback=lambda stream, text: chunks.append((stream, text)))
+        self.mock_tool_manager.execute_tool.side_effect = lambda tool_name, args, require_confirmation: agent._run_shell_command_impl(**args)
+        plan = [{'description': 'Wait', 'tool_call': {'tool_name': 'run_shell_command',
+                                                      'args': {'command': 'echo waiting; sleep 30', 'timeout_seconds': 0.3, 'reason': 'ignored'}}}]
+
+        results = agent._execute_plan(plan)
+
+        self.assertEqual(self.mock_tool_manager.execute_tool.call_args[0][1], {'command': 'echo waiting; sleep 30', 'timeout_seconds': 0.3})
+        self.assertTrue(results[0]["result"]["timed_out"])
+        self.assertEqual(results[0]["status"], "failed")
+        self.assertEqual(chunks, [("stdout", "waiting\n")])
+
+    def test_failed_shell_commands_fail_their_step(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        self.mock_tool_manager.execute_tool.side_effect = [
+            {"status": "error", "returncode": 2, "stdout": "", "stderr": "No rule to make target.", "message": "Command 'make' returned non-zero exit status 2."},
+            {"status": "success", "returncode": 0, "stdout": "published\n"}
+        ]
+        plan = [{'description': 'Build', 'tool_call': {'tool_name': 'run_shell_command', 'args': {'command': 'make'}}, 'outputs': ['build']},
+                {'description': 'Publish', 'tool_call': {'tool_name': 'run_shell_command', 'args': {'command': 'publish'}}, 'requires': ['build']}]
+
+        results = agent._execute_plan(plan)
+
+        self.assertEqual([result["status"] for result in results], ["failed", "skipped"])
+        self.assertEqual(results[0]["error"], "Command 'make' returned non-zero exit status 2.")
+        self.assertEqual(self.mock_tool_manager.execute_tool.call_count, 1)
+
+    def test_confirmed_steps_run_concurrently(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, max_plan_workers=2)
+        both_running = threading.Barrier(2, timeout=5)
+        def execute_tool(tool_name, args, require_confirmation):
+            both_running.wait() # Raises BrokenBarrierError if the steps were serialized
+            return {"status": "success"}
+        self.mock_tool_manager.execute_tool.side_effect = execute_tool
+        plan = [{'description': 'Probe', 'tool_call': {'tool_name': 'run_shell_command', 'args': {'command': 'probe'}}, 'outputs': ['probe']},
+                {'description': 'Alert', 'tool_call': {'tool_name': 'send_alert_notification', 'args': {'payload': {}}}, 'outputs': ['alert']}]
+
+        results = agent._execute_plan(plan)
+
+        self.assertEqual([result["status"] for result in results], ["executed", "executed"])
+
+    @unittest.skipUnless(os.name == "posix", "The shell command below assumes a POSIX shell")
+    def test_cancelling_a_plan_kills_its_running_shell_command(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        self.mock_tool_manager.execute_tool.side_effect = lambda tool_name, args, require_confirmation: agent._run_shell_command_impl(**args)
+        plan = [{'description': 'Wait', 'tool_call': {'tool_name': 'run_shell_command', 'args': {'command': 'sleep 30'}}}]
+        cancel_event = threading.Event()
+        threading.Timer(0.2, cancel_event.set).start()
+
+        results = agent._execute_plan(plan, cancel_event=cancel_event)
+
+        self.assertEqual((results[0]["status"], results[0]["result"]["status"]), ("cancelled", "cancelled"))
+        self.assertLess(results[0]["result"]["duration_seconds"], 5)
+        self.assertIsNone(agent._step_cancel_event.get())
+
+    @unittest.skipUnless(os.name == "posix", "The shell commands below assume a POSIX shell")
+    def test_killed_steps_are_rerun_when_the_run_resumes(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, checkpoint_config={})
+        agent._components["long_term_memory"] = LongTermMemoryManager(os.path.join(self.project_root, ".severino", "knowledge", "checkpoints.db"))
+        self.mock_tool_manager.execute_tool.side_effect = lambda tool_name, args, require_confirmation: agent._run_shell_command_impl(**args)
+        plan = [{'description': 'Build', 'tool_call': {'tool_name': 'run_shell_command', 'args': {'command': 'sleep 3; echo built'}}},
+                {'description': 'Publish', 'tool_call': {'tool_name': 'run_shell_command', 'args': {'command': 'echo published'}}}]
+        run_id = agent.plan_checkpointer.start_run("Publish the build.", {'goal': 'publish'}, plan)
+        cancel_event = threading.Event()
+        threading.Timer(0.3, cancel_event.set).start()
+
+        first = agent._execute_plan(plan, cancel_event=cancel_event, checkpoint_run_id=run_id)
+        self.assertEqual([result["status"] for result in first], ["cancelled", "cancelled"])
+        self.assertTrue(agent.plan_checkpointer.end_run(run_id, first))
+
+        with patch.object(agent.shell_executor, 'run', return_value={"status": "success", "returncode": 0, "stdout": "ok\n"}) as mock_run:
+            second = agent._execute_plan(plan, checkpoint_run_id=run_id)
+        self.assertEqual([result["status"] for result in second], ["executed", "executed"])
+        self.assertNotIn("restored_from_checkpoint", second[0])
+        self.assertEqual([call.args[0] for call in mock_run.call_args_list], ["sleep 3; echo built", "echo published"])
+
+    def test_runs_failing_for_good_are_planned_again(self):
+        self.mock_tpm_class.side_effect = ThoughtProcessManager
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, checkpoint_config={})
+        agent._components["long_term_memory"] = LongTermMemoryManager(os.path.join(self.project_root, ".severino", "knowledge", "checkpoints.db"))
+        plan = [{'description': 'Run report', 'tool_call': {'tool_name': 'run_shell_command', 'args': {'command': 'make report'}}}]
+        self.mock_tool_manager.execute_tool.side_effect = ValueError("No rule to make target 'report'.")
+
+        with (patch.object(agent, '_refactor_directive', return_value={'goal': 'report'}) as mock_refactor,
+              patch.object(agent, '_break_down_task', return_value=plan),
+              patch.object(agent, '_compile_results', return_value={'summary': 'failed'})):
+            agent.process_directive("Build the weekly report.")
+            second = agent.process_directive("Build the weekly report.")
+
+        self.assertNotIn("Plan Resumed", [entry["step_name"] for entry in second["thought_log"]])
+        self.assertEqual(mock_refactor.call_count, 2)
+        self.assertEqual(agent.plan_checkpointer.get_stats()["dropped_runs"], 2)
+
+    def test_break_down_prompt_lists_retrieved_tools(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config, tool_retrieval_config={"top_k": 2})
+        self.mock_tool_manager.get_all_tool_definitions.return_value = [
+            {"name": "main_camera_sensor", "description": "Main video camera sensor.", "tags": ["video_camera"]}
+        ] + [{"name": f"disk_probe_{index}", "description": f"Reports usage of disk {index}."} for index in range(50)]
+        self.mock_llm_provider.generate_structured.return_value = {"generated_text": "[]", "data": []}
+
+        with patch('src.core.tooling.tool_retriever.load_default_embed_fn', return_value=lambda texts: [None for _ in texts]):
+            agent._break_down_task({'goal': 'watch', 'entities': ['balcony'], 'required_capabilities': {'sensors': ['video_camera']}})
+
+        prompt = self.mock_llm_provider.generate_structured.call_args[0][0]
+        self.assertIn("main_camera_sensor", prompt)
+        self.assertNotIn("disk_probe", prompt)
+
+    def test_break_down_prompt_lists_no_tools_without_retrieval(self):
+        agent = Agent(self.session_id, self.project_root, self.llm_provider_name, self.llm_config)
+        self.mock_tool_manager.get_all_tool_definitions.return_value = [{"name": "main_camera_sensor", "description": "Main video camera sensor."}]
+        self.mock_llm_provider.generate_structured.return_value = {"generated_text": "[]", "data": []}
+
+        agent._break_down_task({'goal': 'watch', 'entities': ['balcony']})
+
+        prompt = self.mock_llm_provider.generate_structured.call_args[0][0]
+        self.assertNotIn("Available tools", prompt)
+        self.assertTrue(prompt.rstrip().endswith("depend on them."))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
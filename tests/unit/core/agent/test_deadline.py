@@ -0,0 +1,31 @@
+import unittest
+from unittest.mock import patch
+
+from src.core.agent.deadline import Deadline
+
+class TestDeadline(unittest.TestCase):
+
+    @patch('src.core.agent.deadline.time.monotonic')
+    def test_stage_budgets_split_remaining_time(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        deadline = Deadline(10.0)
+        self.assertAlmostEqual(deadline.stage_budget("refactor"), 2.0)
+        self.assertAlmostEqual(deadline.stage_budget("refactor", "break_down"), 4.5)
+
+        # Refactor finished early: the time it left over is shared among the remaining stages
+        mock_monotonic.return_value = 101.0
+        self.assertAlmostEqual(deadline.stage_budget("break_down"), 9.0 * 0.25 / 0.8)
+        self.assertAlmostEqual(deadline.stage_budget("compile"), 9.0)
+
+    @patch('src.core.agent.deadline.time.monotonic')
+    def test_expired(self, mock_monotonic):
+        mock_monotonic.return_value = 0.0
+        deadline = Deadline(1.0, stage_shares={"compile": 0.5})
+        self.assertFalse(deadline.expired())
+        self.assertEqual(deadline.stage_shares["compile"], 0.5)
+        mock_monotonic.return_value = 2.0
+        self.assertTrue(deadline.expired())
+        self.assertEqual(deadline.stage_budget("compile"), 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
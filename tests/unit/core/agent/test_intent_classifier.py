@@ -0,0 +1,71 @@
+import unittest
+
+from src.core.agent.intent_classifier import IntentClassifier
+
+class TestIntentClassifier(unittest.TestCase):
+
+    def test_default_rules_fill_entities(self):
+        sensors = ["main_camera_sensor", "garage_camera_sensor", "front_door_camera"]
+        classifier = IntentClassifier(tool_lookup=lambda tool_name, factory_type: factory_type == "sensor" and tool_name in sensors)
+        result = classifier.classify("  Check   the garage camera.")
+        self.assertEqual(result["intent"], "check_camera")
+        self.assertEqual(result["refactored_data"]["entities"], ["garage"])
+        self.assertEqual(result["refactored_data"]["required_capabilities"], {"sensors": ["video_camera"]})
+        self.assertEqual(result["plan"][0]["description"], "Connect to camera garage")
+        self.assertEqual({step["tool_call"]["tool_name"] for step in result["plan"]}, {"garage_camera_sensor"})
+        self.assertEqual(classifier.classify("View the front door camera")["plan"][1]["tool_call"]["tool_name"], "front_door_camera")
+
+        result = classifier.classify("Summarize drift report 2024-06")
+        self.assertEqual(result["intent"], "summarize_drift_report")
+        self.assertEqual(result["refactored_data"]["entities"], ["2024-06"])
+        self.assertIsNone(result["plan"])
+
+    def test_unresolved_cameras_go_through_break_down(self):
+        classifier = IntentClassifier(tool_lookup=lambda tool_name, factory_type: tool_name == "main_camera_sensor")
+        result = classifier.classify("Check camera attic")
+        self.assertEqual(result["refactored_data"]["entities"], ["attic"])
+        self.assertIsNone(result["plan"])
+        self.assertIsNone(IntentClassifier().classify("Check the main camera")["plan"]) # Nothing to resolve against
+
+    def test_literal_braces_in_rules_are_kept(self):
+        rule = {
+            "name": "tag_frame",
+            "patterns": [r"^tag frame (?P<label>\w+)$"],
+            "refactored_data": {"goal": "tag frame", "entities": ["{label}"], "context": "{not a placeholder}", "required_capabilities": {}},
+            "plan": [{"description": "Tag {label}", "tool_call": {"tool_name": "run_shell_command",
+                                                                   "args": {"command": "echo '{\"label\": \"{label}\", \"frame\": {frame_id}}'"}}}]
+        }
+        result = IntentClassifier({"rules": [rule]}).classify("tag frame person")
+        self.assertEqual(result["refactored_data"]["context"], "{not a placeholder}")
+        self.assertEqual(result["plan"][0]["tool_call"]["args"]["command"], "echo '{\"label\": \"person\", \"frame\": {frame_id}}'")
+
+    def test_unknown_directive_misses(self):
+        classifier = IntentClassifier()
+        self.assertIsNone(classifier.classify("Tell me if the child is near the balcony."))
+        stats = classifier.get_stats()
+        self.assertEqual((stats["matches"], stats["misses"], stats["match_rate"]), (0, 1, 0.0))
+
+    def test_custom_rules_take_precedence(self):
+        rule = {
+            "name": "camera_status",
+            "patterns": [r"^check camera (?P<camera>\w+)$"],
+            "refactored_data": {"goal": "camera status", "entities": ["{camera}"], "context": "", "required_capabilities": {}}
+        }
+        classifier = IntentClassifier({"rules": [rule]})
+        self.assertEqual(classifier.classify("check camera porch")["intent"], "camera_status")
+        self.assertIsNone(IntentClassifier({"include_default_rules": False}).classify("check camera porch"))
+        with self.assertRaises(ValueError):
+            classifier.add_rule({"name": "incomplete"})
+
+    def test_custom_matcher(self):
+        classifier = IntentClassifier({"include_default_rules": False})
+        classifier.add_matcher("disk_usage", lambda directive: {"refactored_data": {"goal": "disk usage"}} if "disk" in directive.lower() else None)
+        result = classifier.classify("How full is the disk?")
+        self.assertEqual((result["intent"], result["plan"]), ("disk_usage", None))
+        self.assertIsNone(classifier.classify("Check the weather."))
+        classifier.record_seconds_saved(2.0)
+        stats = classifier.get_stats()
+        self.assertEqual((stats["match_rate"], stats["matches_by_intent"], stats["estimated_seconds_saved"]), (0.5, {"disk_usage": 1}, 2.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from src.core.memory.long_term_memory_manager import LongTermMemoryManager
+from src.core.agent.plan_checkpoint import PlanCheckpointer
+
+class TestPlanCheckpointer(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.long_term_memory = LongTermMemoryManager(os.path.join(self.temp_dir, ".severino", "knowledge", "mnemonic.db"))
+        self.checkpointer = PlanCheckpointer(self.long_term_memory, "session", {"ttl_seconds": 60})
+        self.plan = [{"description": "Run report", "tool_call": {"tool_name": "run_shell_command", "args": {"command": "make report"}}}]
+        self.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def step_runner(self, tool_name, args):
+        self.calls.append((tool_name, args.get("operation", args.get("command"))))
+        return {"result": f"ran {tool_name}", "output": len(self.calls)}
+
+    def test_results_are_restored_within_a_run(self):
+        run_id = self.checkpointer.start_run("Build the report.", {"goal": "report"}, self.plan)
+        self.assertEqual(self.checkpointer.find_run("build the report")["run_id"], run_id)
+
+        first = self.checkpointer.wrap(run_id, self.step_runner)
+        first("run_shell_command", {"command": "make report"})
+        first("run_shell_command", {"command": "make report"}) # A repeated call is checkpointed separately
+
+        resumed = self.checkpointer.wrap(run_id, self.step_runner)
+        self.assertEqual(resumed("run_shell_command", {"command": "make report"}), {"result": "ran run_shell_command", "output": 1, "restored_from_checkpoint": True})
+        self.assertEqual(resumed("run_shell_command", {"command": "make report"})["output"], 2)
+        self.assertNotIn("restored_from_checkpoint", resumed("run_shell_command", {"command": "make clean"})) # Different checksum
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(self.checkpointer.get_stats()["restored"], 2)
+
+        self.checkpointer.finish_run(run_id)
+        self.assertIsNone(self.checkpointer.find_run("Build the report."))
+
+    def test_volatile_and_failed_steps_are_not_checkpointed(self):
+        run_id = self.checkpointer.start_run("Watch the camera.", {"goal": "watch"}, self.plan)
+        runner = self.checkpointer.wrap(run_id, self.step_runner)
+        runner("main_camera_sensor", {"operation": "read_data"})
+        failing = self.checkpointer.wrap(run_id, lambda tool_name, args: {"status": "failed", "error": "No frame."})
+        failing("run_shell_command", {"command": "make report"})
+
+        resumed = self.checkpointer.wrap(run_id, self.step_runner)
+        resumed("main_camera_sensor", {"operation": "read_data"})
+        resumed("run_shell_command", {"command": "make report"})
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(self.checkpointer.get_stats()["checkpointed"], 1)
+
+    def test_runs_that_failed_for_good_are_dropped(self):
+        def flaky(tool_name, args):
+            raise ConnectionError("Edge node went away.")
+        def broken(tool_name, args):
+            raise ValueError("Unknown report target.")
+
+        run_id = self.checkpointer.start_run("Build the report.", {"goal": "report"}, self.plan)
+        with self.assertRaises(ConnectionError):
+            self.checkpointer.wrap(run_id, flaky)("run_shell_command", {"command": "make report"})
+        self.assertTrue(self.checkpointer.end_run(run_id, [{"status": "error"}]))
+        self.assertIsNotNone(self.checkpointer.find_run("Build the report."))
+
+        with self.assertRaises(ValueError):
+            self.checkpointer.wrap(run_id, broken)("run_shell_command", {"command": "make report"})
+        self.assertFalse(self.checkpointer.end_run(run_id, [{"status": "error"}]))
+        self.assertIsNone(self.checkpointer.find_run("Build the report."))
+
+        run_id = self.checkpointer.start_run("Watch the camera.", {"goal": "watch"}, self.plan)
+        self.checkpointer.wrap(run_id, lambda tool_name, args: {"status": "failed", "error": "No frame."})("main_camera_sensor", {"operation": "read_data"})
+        self.assertFalse(self.checkpointer.end_run(run_id, [{"status": "failed"}]))
+        self.assertIsNone(self.checkpointer.find_run("Watch the camera."))
+        self.assertEqual(self.checkpointer.get_stats()["dropped_runs"], 2)
+
+        run_id = self.checkpointer.start_run("Build the report.", {"goal": "report"}, self.plan)
+        self.assertTrue(self.checkpointer.end_run(run_id, [{"status": "cancelled"}])) # Cut short by a deadline or Ctrl-C
+
+    def test_killed_tool_calls_are_not_checkpointed_and_keep_the_run_resumable(self):
+        killed = {"status": "cancelled", "returncode": -9, "message": "Command cancelled and killed."}
+        timed_out = {"status": "error", "returncode": -9, "timed_out": True, "message": "Command timed out after 1s and was killed."}
+        run_id = self.checkpointer.start_run("Build the report.", {"goal": "report"}, self.plan)
+        runner = self.checkpointer.wrap(run_id, lambda tool_name, args: {"result": killed, "output": killed}) # Reported as executed
+        runner("run_shell_command", {"command": "make report"})
+        runner = self.checkpointer.wrap(run_id, lambda tool_name, args: {"status": "failed", "result": timed_out, "error": timed_out["message"]})
+        runner("run_shell_command", {"command": "make index"})
+        self.assertEqual(self.checkpointer.get_stats()["checkpointed"], 0)
+        self.assertTrue(self.checkpointer.end_run(run_id, [{"status": "executed", "result": killed}]))
+
+        resumed = self.checkpointer.wrap(run_id, self.step_runner)
+        self.assertNotIn("restored_from_checkpoint", resumed("run_shell_command", {"command": "make report"}))
+        self.assertEqual(self.calls, [("run_shell_command", "make report")])
+
+        runner = self.checkpointer.wrap(run_id, lambda tool_name, args: {"status": "failed", "result": {"status": "error", "returncode": 2}})
+        runner("run_shell_command", {"command": "make publish"})
+        self.assertFalse(self.checkpointer.end_run(run_id, [{"status": "failed"}])) # A non-zero exit fails for good
+
+    def test_expired_runs_are_not_resumed(self):
+        self.checkpointer.start_run("Build the report.", {"goal": "report"}, self.plan)
+        with patch("src.core.agent.plan_checkpoint.time.time", return_value=10**10):
+            self.assertIsNone(self.checkpointer.find_run("Build the report."))
+        self.assertIsNone(self.checkpointer.start_run("Watch the camera.", {"goal": "watch"}, [{"frame": object()}]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+import unittest
+import threading
+from typing import Any, Dict
+
+from src.core.agent.plan_executor import PlanExecutor
+
+class TestPlanExecutor(unittest.TestCase):
+
+    def test_slots_flow_between_steps(self):
+        calls = []
+
+        def runner(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+            calls.append((tool_name, args))
+            if tool_name == "camera":
+                return {"result": "Frame captured.", "output": "frame-1"}
+            return {"result": args["data"].upper(), "output": args["data"].upper()}
+
+        plan = [
+            {"description": "Read", "tool_call": {"tool_name": "camera", "args": {"operation": "read_data"}}, "outputs": ["frame"]},
+            {"description": "Detect", "tool_call": {"tool_name": "detector", "args": {"operation": "predict"}}, "inputs": {"data": "frame"}},
+        ]
+        results = PlanExecutor(runner).execute(plan)
+
+        self.assertEqual(results[0], {"step": "Read", "status": "executed", "result": "Frame captured."})
+        self.assertEqual(results[1], {"step": "Detect", "status": "executed", "result": "FRAME-1"})
+        self.assertEqual(calls[1], ("detector", {"operation": "predict", "data": "frame-1"}))
+
+    def test_independent_steps_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def runner(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+            barrier.wait() # Deadlocks (and times out) unless both steps run at the same time
+            return {"result": tool_name}
+
+        plan = [
+            {"description": "Connect camera", "tool_call": {"tool_name": "camera", "args": {}}, "outputs": ["camera.connected"]},
+            {"description": "Load model", "tool_call": {"tool_name": "detector", "args": {}}, "outputs": ["detector.loaded"]},
+        ]
+        results = PlanExecutor(runner, max_workers=2).execute(plan)
+        self.assertEqual([r["status"] for r in results], ["executed", "executed"])
+
+    def test_steps_without_slots_keep_plan_order(self):
+        order = []
+        lock = threading.Lock()
+
+        def runner(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+            with lock:
+                order.append(tool_name)
+            return {"result": tool_name}
+
+        plan = [{"description": tool_name, "tool_call": {"tool_name": tool_name, "args": {}}} for tool_name in ["camera", "detector", "alert"]]
+        self.assertEqual(PlanExecutor(runner, max_workers=4).build_dependencies(plan), [set(), {0}, {1}])
+        PlanExecutor(runner, max_workers=4).execute(plan)
+        self.assertEqual(order, ["camera", "detector", "alert"])
+
+    def test_steps_on_same_tool_keep_plan_order(self):
+        order = []
+
+        def runner(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+            order.append(args["operation"])
+            return {"result": True}
+
+        plan = [{"description": op, "tool_call": {"tool_name": "camera", "args": {"operation": op}}}
+                for op in ["connect", "read_data", "release"]]
+        PlanExecutor(runner, max_workers=4).execute(plan)
+        self.assertEqual(order, ["connect", "read_data", "release"])
+
+    def test_failed_producer_skips_dependents(self):
+        def runner(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+            if tool_name == "detector":
+                return {"status": "failed", "error": "Failed to load model."}
+            return {"result": "ran"}
+
+        plan = [
+            {"description": "Load", "tool_call": {"tool_name": "detector", "args": {}}, "outputs": ["detector.loaded"]},
+            {"description": "Predict", "tool_call": {"tool_name": "other", "args": {}}, "requires": ["detector.loaded"]},
+            {"description": "Think", "tool_call": None},
+        ]
+        results = PlanExecutor(runner).execute(plan)
+        self.assertEqual(results[0]["status"], "failed")
+        self.assertEqual(results[1]["status"], "skipped")
+        self.assertIn("detector.loaded", results[1]["error"])
+        self.assertEqual(results[2]["status"], "no_tool_call")
+
+    def test_runner_exception_is_reported_as_error(self):
+        def runner(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+            raise RuntimeError("boom")
+
+        results = PlanExecutor(runner).execute([{"description": "Explode", "tool_call": {"tool_name": "t", "args": {}}}])
+        self.assertEqual(results[0], {"step": "Explode", "status": "error", "error": "boom"})
+
+    def test_initial_slots_are_available(self):
+        def runner(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+            return {"result": args["data"]}
+
+        plan = [{"description": "Use", "tool_call": {"tool_name": "t", "args": {}}, "inputs": {"data": "seed"}}]
+        results = PlanExecutor(runner).execute(plan, slots={"seed": 42})
+        self.assertEqual(results[0]["result"], 42)
+
+    def test_cancel_event_stops_remaining_steps(self):
+        cancel_event = threading.Event()
+        completed = []
+
+        def runner(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+            cancel_event.set() # Cancel while the first step is running
+            return {"result": "done"}
+
+        plan = [{"description": op, "tool_call": {"tool_name": "camera", "args": {"operation": op}}}
+                for op in ["connect", "read_data"]]
+        results = PlanExecutor(runner).execute(plan, on_step_complete=lambda index, result: completed.append(index),
+                                               cancel_event=cancel_event)
+        self.assertEqual([r["status"] for r in results], ["executed", "cancelled"])
+        self.assertEqual(completed, [0, 1])
+
+    def test_merge_shares_identical_sub_plans(self):
+        load = {"description": "Load", "tool_call": {"tool_name": "detector", "args": {"operation": "load_model"}}, "outputs": ["loaded"]}
+        plan_a = [load, {"description": "Status", "tool_call": {"tool_name": "detector", "args": {"operation": "get_status"}}, "requires": ["loaded"]}]
+        plan_b = [dict(load, description="Load again"), {"description": "Status", "tool_call": {"tool_name": "detector", "args": {"operation": "get_status"}}, "requires": ["loaded"]}]
+        plan_c = [{"description": "Load other", "tool_call": {"tool_name": "classifier", "args": {"operation": "load_model"}}, "outputs": ["loaded"]},
+                  {"description": "Status", "tool_call": {"tool_name": "detector", "args": {"operation": "get_status"}}, "requires": ["loaded"]}]
+
+        merged, index_maps = PlanExecutor.merge([plan_a, plan_b, plan_c])
+
+        self.assertEqual(len(merged), 4)
+        self.assertEqual(index_maps, [[0, 1], [0, 1], [2, 3]])
+        # Same slot name, different producers: the status step of plan_c waits for the classifier
+        self.assertEqual(merged[1]["requires"], ["0:loaded"])
+        self.assertEqual(merged[3]["requires"], ["2:loaded"])
+
+    def test_merge_never_shares_volatile_steps_or_steps_of_the_same_plan(self):
+        read = {"description": "Read", "tool_call": {"tool_name": "camera", "args": {"operation": "read_data"}}}
+        alert = {"description": "Alert", "tool_call": {"tool_name": "alert", "args": {"payload": {"message": "person"}}}}
+        status = {"description": "Status", "tool_call": {"tool_name": "detector", "args": {"operation": "get_status"}}}
+        plan = [read, alert, read, alert, status, status]
+
+        merged, index_maps = PlanExecutor.merge([plan, list(plan)])
+
+        self.assertEqual(index_maps[0], [0, 1, 2, 3, 4, 5]) # Repeated steps of one plan all run
+        self.assertEqual(index_maps[1], [6, 7, 8, 9, 4, 5]) # Only the shareable status checks are shared
+        self.assertEqual(len(merged), 10)
+
+    def test_execute_many_runs_repeated_steps_every_time(self):
+        calls = []
+        lock = threading.Lock()
+
+        def runner(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+            with lock:
+                calls.append((tool_name, args.get("operation")))
+            return {"result": tool_name}
+
+        plan = [{"description": "Connect", "tool_call": {"tool_name": "camera", "args": {"operation": "connect"}}},
+                {"description": "Read", "tool_call": {"tool_name": "camera", "args": {"operation": "read_data"}}},
+                {"description": "Alert", "tool_call": {"tool_name": "alert", "args": {}}},
+                {"description": "Read", "tool_call": {"tool_name": "camera", "args": {"operation": "read_data"}}},
+                {"description": "Alert", "tool_call": {"tool_name": "alert", "args": {}}}]
+        results = PlanExecutor(runner, max_workers=2).execute_many([plan])
+
+        self.assertEqual(calls, [("camera", "connect"), ("camera", "read_data"), ("alert", None), ("camera", "read_data"), ("alert", None)])
+        self.assertEqual([result["status"] for result in results[0]], ["executed"] * 5)
+
+    def test_execute_many_runs_shared_steps_once(self):
+        calls = []
+        lock = threading.Lock()
+
+        def runner(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+            with lock:
+                calls.append(tool_name)
+            if tool_name == "detector":
+                return {"result": "Model loaded.", "output": True}
+            return {"result": f"{tool_name}:{args['ready']}"}
+
+        load = {"description": "Load", "tool_call": {"tool_name": "detector", "args": {"operation": "load_model"}}, "outputs": ["loaded"]}
+        plans = [
+            [load, {"description": "Count", "tool_call": {"tool_name": "counter", "args": {}}, "inputs": {"ready": "loaded"}}],
+            [dict(load, description="Load model"), {"description": "Classify", "tool_call": {"tool_name": "classifier", "args": {}}, "inputs": {"ready": "loaded"}}],
+        ]
+        results = PlanExecutor(runner, max_workers=2).execute_many(plans)
+
+        self.assertEqual(calls.count("detector"), 1)
+        self.assertEqual(results[0][1]["result"], "counter:True")
+        self.assertEqual(results[1][0], {"step": "Load model", "status": "executed", "result": "Model loaded."})
+        self.assertEqual(results[1][1]["result"], "classifier:True")
+
+if __name__ == '__main__':
+    unittest.main()
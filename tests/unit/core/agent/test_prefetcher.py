@@ -0,0 +1,58 @@
+import unittest
+import threading
+from typing import Any, Dict
+
+from src.core.agent.prefetcher import ResourcePrefetcher
+
+class TestResourcePrefetcher(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def run_tool(self, tool_name: str, args: Dict[str, Any]) -> Any:
+        with self.lock:
+            self.calls.append((tool_name, args["operation"]))
+        return True
+
+    def make_prefetcher(self, **kwargs) -> ResourcePrefetcher:
+        prefetcher = ResourcePrefetcher(self.run_tool, **kwargs)
+        self.addCleanup(prefetcher.shutdown)
+        return prefetcher
+
+    def test_warmups_from_keywords_and_capabilities(self):
+        prefetcher = self.make_prefetcher()
+        self.assertEqual(prefetcher.warmups_for_directive("Watch the camera and tell me if a child is near the pool."),
+                         [("main_camera_sensor", "connect"), ("object_detection_model", "load_model")])
+        self.assertEqual(prefetcher.warmups_for_directive("What's the disk usage?"), [])
+        self.assertEqual(prefetcher.warmups_for_capabilities({"ml_models": ["object_detection"], "sensors": ["microphone"]}),
+                         [("object_detection_model", "load_model")])
+
+    def test_plan_claims_prefetched_result(self):
+        prefetcher = self.make_prefetcher()
+        self.assertEqual(prefetcher.prefetch([("camera", "connect")]), [("camera", "connect")])
+        self.assertEqual(prefetcher.prefetch([("camera", "connect")]), []) # Already pending
+
+        future = prefetcher.claim("camera", "connect")
+        self.assertTrue(future.result(timeout=5))
+        self.assertIsNone(prefetcher.claim("camera", "connect"))
+        self.assertEqual(self.calls, [("camera", "connect")])
+        self.assertEqual(prefetcher.get_stats()["claimed"], 1)
+
+    def test_unused_connection_is_released(self):
+        prefetcher = self.make_prefetcher()
+        prefetcher.prefetch([("camera", "connect"), ("detector", "load_model")])
+        plan = [{"description": "Load", "tool_call": {"tool_name": "detector", "args": {"operation": "load_model"}}}]
+
+        self.assertEqual(prefetcher.cancel_unused(plan), [("camera", "connect")])
+        prefetcher.shutdown() # Waits for the prefetch and its undo
+
+        self.assertIn(("camera", "release"), self.calls)
+        self.assertIsNotNone(prefetcher.claim("detector", "load_model"))
+
+    def test_unavailable_tools_are_not_prefetched(self):
+        prefetcher = self.make_prefetcher(is_available=lambda tool_name: tool_name != "camera")
+        self.assertEqual(prefetcher.prefetch([("camera", "connect"), ("detector", "load_model")]), [("detector", "load_model")])
+
+if __name__ == '__main__':
+    unittest.main()
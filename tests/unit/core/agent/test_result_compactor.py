@@ -0,0 +1,77 @@
+import unittest
+import numpy as np
+
+from src.core.agent.result_compactor import ResultCompactor
+
+def count_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+class TestResultCompactor(unittest.TestCase):
+
+    def test_detections_are_aggregated_by_class(self):
+        detections = [
+            {"class_name": "person", "confidence": 0.9, "box": [0, 0, 1, 1]},
+            {"class_name": "person", "confidence": 0.6, "box": [1, 1, 2, 2]},
+            {"class_name": "dog", "confidence": 0.7, "box": [2, 2, 3, 3]}
+        ]
+        compactor = ResultCompactor(count_tokens)
+        compacted = compactor.compact([{"tool_name": "object_detector", "result": {"detections": detections}}])
+
+        summary = compacted["results"][0]["result"]["detections"]
+        self.assertEqual(summary["count"], 3)
+        self.assertEqual(summary["by_class"]["person"], {"count": 2, "max_confidence": 0.9})
+        self.assertEqual(summary["by_class"]["dog"], {"count": 1, "max_confidence": 0.7})
+
+    def test_long_strings_keep_head_and_tail(self):
+        stdout = "HEAD" + "x" * 5000 + "TAIL"
+        compactor = ResultCompactor(count_tokens, token_budget=4096, window_chars=100)
+        compacted = compactor.compact([{"tool_name": "run_shell_command", "result": {"stdout": stdout, "stderr": ""}}])
+
+        result = compacted["results"][0]["result"]
+        self.assertTrue(result["stdout"].startswith("HEAD"))
+        self.assertTrue(result["stdout"].endswith("TAIL"))
+        self.assertIn("[4808 chars omitted]", result["stdout"])
+        self.assertNotIn("stderr", result) # Empty values are dropped
+
+    def test_arrays_are_summarized(self):
+        compactor = ResultCompactor(count_tokens)
+        compacted = compactor.compact([{"tool_name": "camera", "result": np.zeros((480, 640, 3), dtype=np.uint8)}])
+        self.assertEqual(compacted["results"][0]["result"], "<ndarray shape=(480, 640, 3)>")
+
+    def test_windows_shrink_to_fit_budget(self):
+        results = [{"step": i, "result": "y" * 2000} for i in range(3)]
+        compactor = ResultCompactor(count_tokens, token_budget=200, window_chars=400)
+        compacted = compactor.compact(results)
+
+        self.assertLessEqual(compacted["tokens"], 200)
+        self.assertEqual(compacted["elided_steps"], 0)
+        self.assertEqual(len(compacted["results"]), 3)
+        self.assertEqual(compacted["tokens"], count_tokens(ResultCompactor.serialize(compacted["results"])))
+
+    def test_middle_steps_are_elided_when_still_too_large(self):
+        results = [{"step": i, "status": "executed", "result": f"result of step {i}"} for i in range(20)]
+        compactor = ResultCompactor(count_tokens, token_budget=60)
+        compacted = compactor.compact(results)
+
+        self.assertLessEqual(compacted["tokens"], 60)
+        self.assertGreater(compacted["elided_steps"], 0)
+        kept = compacted["results"]
+        self.assertEqual(kept[0]["step"], 0)
+        self.assertEqual(kept[-1]["step"], 19)
+        self.assertIn({"elided_steps": compacted["elided_steps"]}, kept)
+        self.assertEqual(len(kept), 20 - compacted["elided_steps"] + 1)
+
+    def test_partition_fits_chunks_to_budget(self):
+        compactor = ResultCompactor(count_tokens, token_budget=60)
+        results = [{"step": f"Step {index}", "status": "executed", "result": "y" * 80} for index in range(6)]
+        chunks = compactor.partition(results)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual([result for chunk in chunks for result in chunk], results) # Order is preserved, nothing dropped
+        for chunk in chunks:
+            self.assertTrue(len(chunk) == 1 or count_tokens(compactor.serialize(chunk)) <= 60)
+        self.assertEqual(compactor.partition([]), [])
+        self.assertEqual(len(ResultCompactor(count_tokens, token_budget=10000).partition(results)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
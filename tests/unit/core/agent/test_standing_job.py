@@ -0,0 +1,78 @@
+import unittest
+from typing import Any, Dict
+from unittest.mock import MagicMock
+
+from src.core.agent.standing_job import StandingJob, detection_condition
+
+PLAN = [
+    {"description": "Connect camera", "tool_call": {"tool_name": "camera", "args": {"operation": "connect"}}},
+    {"description": "Load detector", "tool_call": {"tool_name": "detector", "args": {"operation": "load_model"}}, "outputs": ["detector.loaded"]},
+    {"description": "Read frame", "tool_call": {"tool_name": "camera", "args": {"operation": "read_data"}}, "outputs": ["frame"]},
+    {"description": "Detect", "tool_call": {"tool_name": "detector", "args": {"operation": "predict"}},
+     "inputs": {"data": "frame"}, "requires": ["detector.loaded"], "outputs": ["detections"]},
+    {"description": "Evaluate danger"},
+    {"description": "Alert", "tool_call": {"tool_name": "send_alert_notification", "args": {"payload": {"message": "!"}}}},
+    {"description": "Release camera", "tool_call": {"tool_name": "camera", "args": {"operation": "release"}}},
+]
+
+class TestStandingJob(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.detections = []
+
+        def runner(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+            self.calls.append((tool_name, args.get("operation")))
+            if args.get("operation") == "read_data":
+                return {"result": "Frame captured.", "output": "frame"}
+            if args.get("operation") == "predict":
+                return {"result": {"detections": self.detections}, "output": self.detections}
+            return {"result": True, "output": True}
+
+        self.compile_results = MagicMock(return_value={"summary": "Child near balcony"})
+        self.job = StandingJob(PLAN, detection_condition(["person"]), runner, self.compile_results,
+                               rate_hz=0, trigger_cooldown_seconds=0)
+
+    def test_compile_splits_plan_into_phases(self):
+        self.assertEqual([s["description"] for s in self.job.setup_steps], ["Connect camera", "Load detector"])
+        self.assertEqual([s["description"] for s in self.job.iteration_steps], ["Read frame", "Detect"])
+        self.assertEqual([s["description"] for s in self.job.trigger_steps], ["Evaluate danger", "Alert"])
+        self.assertEqual([s["description"] for s in self.job.teardown_steps], ["Release camera"])
+
+    def test_setup_runs_once_and_llm_only_on_trigger(self):
+        self.job.run(max_iterations=3)
+        self.assertEqual(self.calls.count(("camera", "connect")), 1)
+        self.assertEqual(self.calls.count(("detector", "predict")), 3)
+        self.assertEqual(self.calls[-1], ("camera", "release"))
+        self.compile_results.assert_not_called()
+
+        self.detections.append({"class_name": "person", "confidence": 0.9})
+        insight = self.job.run_iteration()
+        self.assertEqual(insight, {"summary": "Child near balcony"})
+        self.assertIn(("send_alert_notification", None), self.calls)
+        self.assertEqual(self.job.get_stats()["triggers"], 1)
+
+    def test_cooldown_suppresses_repeated_triggers(self):
+        self.job.trigger_cooldown_seconds = 60
+        self.detections.append({"class_name": "person", "confidence": 0.9})
+        self.assertIsNotNone(self.job.run_iteration())
+        self.assertIsNone(self.job.run_iteration())
+        self.assertEqual(self.compile_results.call_count, 1)
+
+    def test_repeated_failures_invalidate_job(self):
+        on_invalidated = MagicMock()
+        job = StandingJob(PLAN, detection_condition(), lambda tool_name, args: {"status": "failed", "error": "no stream"} if args.get("operation") == "read_data" else {"result": True},
+                          self.compile_results, rate_hz=0, max_consecutive_failures=2, on_invalidated=on_invalidated)
+        job.run(max_iterations=10)
+        self.assertEqual(job.get_stats()["iterations"], 2)
+        on_invalidated.assert_called_once()
+        self.assertIsNotNone(job.invalidated_reason)
+
+    def test_detection_condition(self):
+        condition = detection_condition(["person"], min_confidence=0.5, min_count=2)
+        self.assertFalse(condition({"detections": [{"class_name": "person", "confidence": 0.9}]}))
+        self.assertTrue(condition({"detections": [{"class_name": "person", "confidence": 0.9}, {"class_name": "person", "confidence": 0.6}]}))
+        self.assertFalse(condition({}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import itertools
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from src.core.memory.long_term_memory_manager import LongTermMemoryManager
+from src.core.memory.directive_cache import DirectiveCache
+
+# Toy embeddings: directives mentioning the balcony point one way, everything else the other
+def fake_embed(texts):
+    return [[1.0, 0.1] if "balcony" in text else [0.0, 1.0] for text in texts]
+
+class TestDirectiveCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.long_term_memory = LongTermMemoryManager(os.path.join(self.temp_dir, ".severino", "knowledge", "mnemonic.db"))
+        self.cache = DirectiveCache(self.long_term_memory, {"similarity_threshold": 0.95}, embed_fn=fake_embed)
+        self.refactored_data = {"goal": "child_safety"}
+        self.plan = [{"description": "Connect to video_camera"}]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_miss_then_exact_hit(self):
+        self.assertIsNone(self.cache.lookup("Watch the balcony camera"))
+        self.cache.store("Watch the balcony camera", self.refactored_data, self.plan)
+
+        entry = self.cache.lookup("  watch the BALCONY camera. ")
+        self.assertEqual(entry["refactored_data"], self.refactored_data)
+        self.assertEqual(entry["plan"], self.plan)
+        self.assertEqual(entry["similarity"], 1.0)
+        stats = self.cache.get_stats()
+        self.assertEqual((stats["hits"], stats["exact_hits"], stats["misses"]), (1, 1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_semantic_hit_above_threshold(self):
+        self.cache.store("Watch the balcony camera", self.refactored_data, self.plan)
+        entry = self.cache.lookup("Monitor balcony cam")
+        self.assertIsNotNone(entry)
+        self.assertEqual(entry["directive"], "Watch the balcony camera")
+        self.assertEqual(self.cache.get_stats()["semantic_hits"], 1)
+        self.assertIsNone(self.cache.lookup("Summarize the drift report"))
+
+    def test_entries_persist_across_instances(self):
+        self.cache.store("Watch the balcony camera", self.refactored_data, self.plan)
+        other = DirectiveCache(self.long_term_memory, embed_fn=fake_embed)
+        self.assertIsNotNone(other.lookup("watch the balcony camera"))
+
+    def test_expired_entries_are_dropped(self):
+        cache = DirectiveCache(self.long_term_memory, {"ttl_seconds": 60}, embed_fn=fake_embed)
+        with patch("time.time", return_value=1000.0):
+            cache.store("Watch the balcony camera", self.refactored_data, self.plan)
+        with patch("time.time", return_value=1100.0):
+            self.assertIsNone(cache.lookup("Watch the balcony camera"))
+        self.assertEqual(cache.get_stats()["expired"], 1)
+
+    def test_lru_eviction(self):
+        cache = DirectiveCache(self.long_term_memory, {"max_entries": 2}, embed_fn=lambda texts: [None for _ in texts])
+        with patch("time.time", side_effect=itertools.count(1)): # Strictly increasing clock
+            cache.store("first", self.refactored_data, self.plan)
+            cache.store("second", self.refactored_data, self.plan)
+            cache.lookup("first") # Refreshes 'first', leaving 'second' least recently used
+            cache.store("third", self.refactored_data, self.plan)
+        self.assertEqual(cache.get_stats()["evicted"], 1)
+        self.assertIsNotNone(self.long_term_memory.get_directive_cache_entry(directive_key="first"))
+        self.assertIsNone(self.long_term_memory.get_directive_cache_entry(directive_key="second"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from src.core.memory.long_term_memory_manager import LongTermMemoryManager
+from src.core.memory.procedural_memory import ProceduralMemory
+
+def fake_embed(texts):
+    return [[1.0, 0.0] if "safety" in text else [0.0, 1.0] for text in texts]
+
+class TestProceduralMemory(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.long_term_memory = LongTermMemoryManager(os.path.join(self.temp_dir, ".severino", "knowledge", "mnemonic.db"))
+        self.memory = ProceduralMemory(self.long_term_memory, embed_fn=fake_embed)
+        self.refactored_data = {
+            "goal": "child_safety",
+            "entities": ["child", "balcony"],
+            "required_capabilities": {"sensors": ["video_camera"], "ml_models": ["object_detection"]}
+        }
+        self.plan = [
+            {"description": "Read frame from balcony camera", "tool_call": {"tool_name": "main_camera_sensor", "args": {"operation": "read_data"}}, "outputs": ["frame"]},
+            {"description": "Alert if the child is near the balcony edge", "tool_call": {"tool_name": "send_alert_notification", "args": {"payload": {"message": "Child near balcony"}}}}
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_parameterize_keeps_tool_names(self):
+        template = ProceduralMemory.parameterize([{"description": "Watch the camera", "tool_call": {"tool_name": "camera", "args": {"operation": "read_data"}}}], ["camera"])
+        self.assertEqual(template[0]["description"], "Watch the <entity_0>")
+        self.assertEqual(template[0]["tool_call"]["tool_name"], "camera")
+
+    def test_exact_match_instantiates_new_entities(self):
+        self.assertEqual(self.memory.record_success(self.refactored_data, self.plan), 1)
+        self.assertEqual(self.memory.record_success(self.refactored_data, self.plan), 2)
+
+        found = self.memory.find_template({**self.refactored_data, "entities": ["toddler", "pool"]})
+        self.assertEqual(found["match"], "exact")
+        self.assertEqual(found["plan"][0]["description"], "Read frame from pool camera")
+        self.assertEqual(found["plan"][1]["tool_call"]["args"]["payload"]["message"], "toddler near pool")
+        self.assertEqual(found["template"]["success_count"], 2)
+
+    def test_vector_match_requires_compatible_capabilities(self):
+        self.memory.record_success(self.refactored_data, self.plan)
+
+        similar_goal = {**self.refactored_data, "goal": "pool safety", "entities": ["toddler", "pool"],
+                        "required_capabilities": {"sensors": ["video_camera"], "ml_models": ["object_detection"], "actions": ["send_alert"]}}
+        found = self.memory.find_template(similar_goal)
+        self.assertEqual(found["match"], "vector")
+
+        missing_capability = {**similar_goal, "required_capabilities": {"sensors": ["video_camera"]}}
+        self.assertIsNone(self.memory.find_template(missing_capability))
+        self.assertIsNone(self.memory.find_template({**similar_goal, "goal": "summarize drift report"}))
+
+if __name__ == '__main__':
+    unittest.main()
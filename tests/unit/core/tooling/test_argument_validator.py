@@ -0,0 +1,71 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.core.tooling.argument_validator import ArgumentValidator
+from src.core.tooling.tool_manager import ToolManager
+from src.perception.sensors.base_sensor import SensorInterface
+
+def _run_shell_command(command: str, timeout: float = 30.0):
+    return {"status": "success", "command": command, "timeout": timeout}
+
+class TestArgumentValidator(unittest.TestCase):
+
+    def test_values_are_checked_and_coerced_losslessly(self):
+        validator = ArgumentValidator({"name": "llm", "parameters": {
+            "operation": {"type": "string", "enum": ["generate_response"]},
+            "max_tokens": {"type": "integer"},
+            "temperature": {"type": "number"},
+            "stream": {"type": "boolean"},
+            "data": {}
+        }})
+        args = {"operation": "generate_response", "max_tokens": "64", "temperature": "0.2", "stream": "false", "data": object()}
+        coerced, errors = validator.validate(args)
+        self.assertEqual(errors, [])
+        self.assertEqual((coerced["max_tokens"], coerced["temperature"], coerced["stream"]), (64, 0.2, False))
+        self.assertEqual(args["max_tokens"], "64") # The caller's arguments are left untouched
+
+        unchanged = {"operation": "generate_response", "max_tokens": 64}
+        self.assertIs(validator.validate(unchanged)[0], unchanged)
+
+        _, errors = validator.validate({"operation": "summarize", "max_tokens": 6.5, "stream": "maybe"})
+        self.assertEqual(errors, ["Argument 'operation' must be one of ['generate_response'].", "Argument 'max_tokens' must be an integer.",
+                                  "Argument 'stream' must be a boolean."])
+
+    def test_required_and_unexpected_arguments_follow_the_schema_and_signature(self):
+        validator = ArgumentValidator({"name": "run_shell_command", "parameters": {"command": {"type": "string"}}}, _run_shell_command)
+        self.assertEqual(validator.validate({})[1], ["Missing required argument 'command'."])
+        self.assertEqual(validator.validate({"command": "ls", "cwd": "/"})[1], ["Unexpected argument 'cwd'."])
+
+        validator = ArgumentValidator({"name": "probe", "parameters": {"type": "object", "properties": {"device": {"type": "string"}},
+                                                                       "required": ["device"], "additionalProperties": False}})
+        self.assertEqual(validator.validate({"verbose": True})[1], ["Missing required argument 'device'.", "Unexpected argument 'verbose'."])
+
+    def test_malformed_schemas_are_rejected_at_registration(self):
+        with self.assertRaisesRegex(ValueError, "Unknown parameter type: str"):
+            ToolManager().register_tool({"name": "echo", "parameters": {"text": {"type": "str"}}}, implementation=lambda text: text)
+
+    @patch('src.perception.sensor_factory.SensorFactory.create_sensor')
+    def test_invalid_calls_fail_before_instantiation_or_confirmation(self, mock_create_sensor):
+        mock_create_sensor.return_value = MagicMock(spec=SensorInterface)
+        tool_manager = ToolManager()
+        tool_manager.register_tool({"name": "camera", "side_effects": True,
+                                    "parameters": {"operation": {"type": "string", "enum": ["connect", "read_data", "get_status", "release"]}}},
+                                   factory_type="sensor", factory_name="video", config={})
+        with patch('builtins.input') as mock_input:
+            result = tool_manager.execute_tool("camera", {"operation": "open"})
+        mock_input.assert_not_called()
+        mock_create_sensor.assert_not_called()
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(result["error_type"], "invalid_arguments")
+        self.assertEqual(result["errors"], ["Argument 'operation' must be one of ['connect', 'read_data', 'get_status', 'release']."])
+
+        tool_manager.register_tool({"name": "run_shell_command", "parameters": {"command": {"type": "string"}, "timeout": {"type": "number"}}},
+                                   implementation=_run_shell_command)
+        results = tool_manager.execute_tools([{"tool_name": "run_shell_command", "args": {"command": "ls", "timeout": "5"}},
+                                              {"tool_name": "run_shell_command", "args": {}}])
+        self.addCleanup(tool_manager.shutdown)
+        self.assertEqual(results[0], {"status": "success", "command": "ls", "timeout": 5.0})
+        self.assertEqual(results[1]["errors"], ["Missing required argument 'command'."])
+
+if __name__ == '__main__':
+    unittest.main()
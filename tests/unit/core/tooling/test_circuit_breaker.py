@@ -0,0 +1,103 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.core.tooling.circuit_breaker import CircuitBreaker, RetryPolicy
+from src.core.tooling.tool_manager import ToolManager
+from src.perception.sensors.base_sensor import SensorInterface
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    @patch('src.core.tooling.circuit_breaker.time.monotonic')
+    def test_opens_after_repeated_failures_and_probes_recovery(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        circuit_breaker = CircuitBreaker(failure_threshold=2, reset_timeout_seconds=10)
+        for _ in range(2):
+            self.assertTrue(circuit_breaker.allow())
+            circuit_breaker.record_failure()
+        self.assertEqual(circuit_breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(circuit_breaker.allow())
+        self.assertEqual(circuit_breaker.retry_after(), 10)
+
+        mock_monotonic.return_value = 110.0
+        self.assertTrue(circuit_breaker.allow()) # The half-open probe
+        self.assertFalse(circuit_breaker.allow()) # Only one probe at a time
+        circuit_breaker.record_failure()
+        self.assertEqual(circuit_breaker.state, CircuitBreaker.OPEN) # Reopened right away
+
+        mock_monotonic.return_value = 120.0
+        self.assertTrue(circuit_breaker.allow())
+        circuit_breaker.record_success()
+        self.assertEqual(circuit_breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(circuit_breaker.get_stats()["short_circuited"], 2)
+
+    def test_backoff_is_jittered_and_capped(self):
+        retry_policy = RetryPolicy({"max_attempts": 4, "base_delay_seconds": 1.0, "max_delay_seconds": 3.0})
+        delays = [retry_policy.delay(attempt) for attempt in range(6) for _ in range(20)]
+        self.assertTrue(all(0 <= delay <= 3.0 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+        self.assertEqual(retry_policy.attempts_for({"side_effects": True}), 1)
+        self.assertEqual(retry_policy.attempts_for({"side_effects": False}), 4)
+
+class TestToolManagerResilience(unittest.TestCase):
+
+    @patch('src.core.tooling.tool_manager.time.sleep')
+    def test_flaky_calls_are_retried(self, mock_sleep):
+        tool_manager = ToolManager(resilience_config={"max_attempts": 3, "tools": {"remote_status": {"count_error_results": True}}})
+        outcomes = [ConnectionError("reset"), {"status": "error", "message": "busy"}, {"status": "success"}]
+        def notify(message: str):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        tool_manager.register_tool({"name": "remote_status", "side_effects": False}, implementation=notify)
+        tool_manager.register_tool({"name": "remote_alert", "side_effects": True}, implementation=lambda message: {"status": "error"})
+
+        self.assertEqual(tool_manager.execute_tool("remote_status", {"message": "ping"}), {"status": "success"})
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertEqual(tool_manager.get_metrics("remote_status")["tools"]["remote_status"]["operations"]["call"]["retries"], 2)
+
+        mock_sleep.reset_mock()
+        self.assertEqual(tool_manager.execute_tool("remote_alert", {"message": "fire"}, require_confirmation=False), {"status": "error"})
+        mock_sleep.assert_not_called() # Calls with side effects aren't repeated unless the policy allows it
+
+    def test_error_results_of_a_working_tool_dont_trip_the_breaker(self):
+        tool_manager = ToolManager(resilience_config={"failure_threshold": 2})
+        tool_manager.register_tool({"name": "shell", "side_effects": False}, implementation=lambda command: {
+            "status": "error", "returncode": 1, "message": f"Command '{command}' returned non-zero exit status 1."})
+        tool_manager.register_tool({"name": "slow_shell", "side_effects": False}, implementation=lambda command: {
+            "status": "error", "timed_out": True, "message": "Command timed out after 1s and was killed."})
+
+        for _ in range(3):
+            self.assertEqual(tool_manager.execute_tool("shell", {"command": "grep -q person log.txt"})["returncode"], 1)
+        for _ in range(3):
+            tool_manager.execute_tool("slow_shell", {"command": "make"})
+
+        states = tool_manager.get_circuit_states()
+        self.assertEqual((states["shell"]["state"], states["shell"]["failures"]), ("closed", 0))
+        self.assertEqual(states["slow_shell"]["state"], "open") # Timeouts do count
+        self.assertEqual(tool_manager.execute_tool("slow_shell", {"command": "make"})["error_type"], "circuit_open")
+
+    @patch('src.core.tooling.circuit_breaker.time.monotonic')
+    @patch('src.perception.sensor_factory.SensorFactory.create_sensor')
+    def test_unreachable_cameras_fail_fast_until_a_probe_succeeds(self, mock_create_sensor, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        camera = MagicMock(spec=SensorInterface)
+        camera.connect.return_value = False
+        mock_create_sensor.return_value = camera
+        tool_manager = ToolManager(resilience_config={"tools": {"camera": {"failure_threshold": 2, "reset_timeout_seconds": 30}}})
+        tool_manager.register_tool({"name": "camera", "side_effects": False}, factory_type="sensor", factory_name="video", config={})
+
+        for _ in range(2):
+            self.assertFalse(tool_manager.execute_tool("camera", {"operation": "connect"}))
+        result = tool_manager.execute_tool("camera", {"operation": "connect"})
+        self.assertEqual((result["error_type"], result["retry_after_seconds"]), ("circuit_open", 30))
+        self.assertEqual(camera.connect.call_count, 2)
+        self.assertEqual(tool_manager.get_circuit_states()["camera"]["state"], "open")
+
+        mock_monotonic.return_value = 130.0
+        camera.connect.return_value = True
+        self.assertTrue(tool_manager.execute_tool("camera", {"operation": "connect"}))
+        self.assertEqual(tool_manager.get_circuit_states()["camera"]["state"], "closed")
+
+if __name__ == '__main__':
+    unittest.main()
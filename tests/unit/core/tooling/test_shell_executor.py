@@ -0,0 +1,82 @@
+import unittest
+import os
+import sys
+import threading
+import time
+
+from src.core.tooling.shell_executor import ShellExecutor, _CappedOutput
+
+@unittest.skipUnless(os.name == "posix", "The shell commands below assume a POSIX shell")
+class TestShellExecutor(unittest.TestCase):
+
+    def test_successful_and_failing_commands(self):
+        executor = ShellExecutor()
+        result = executor.run("echo hello; echo oops 1>&2")
+        self.assertEqual((result["status"], result["returncode"]), ("success", 0))
+        self.assertEqual((result["stdout"], result["stderr"]), ("hello\n", "oops\n"))
+        self.assertIsNotNone(result["cpu_seconds"])
+
+        result = executor.run("exit 3")
+        self.assertEqual((result["status"], result["returncode"]), ("error", 3))
+        self.assertEqual(result["message"], "Command 'exit 3' returned non-zero exit status 3.")
+
+    def test_peak_rss_is_measured_on_the_command_not_the_agent(self):
+        executor = ShellExecutor()
+        ballast = bytearray(256 * 1024 * 1024) # Raises the agent's RSS high-water mark, which forked children inherit
+        ballast[::4096] = b"x" * len(ballast[::4096])
+        result = executor.run("sleep 0.3")
+        del ballast
+        self.assertLess(result["peak_rss_bytes"], 64 * 1024 * 1024)
+
+        allocate = "a = bytearray(96 * 1024 * 1024); a[::4096] = b'x' * len(a[::4096]); import time; time.sleep(0.3)"
+        result = executor.run(f'"{sys.executable}" -c "{allocate}"')
+        self.assertEqual(result["status"], "success")
+        self.assertGreater(result["peak_rss_bytes"], 96 * 1024 * 1024)
+
+    def test_runaway_commands_are_killed_and_their_output_capped(self):
+        executor = ShellExecutor({"max_output_bytes": 1024})
+        started = time.monotonic()
+        result = executor.run("yes severino", timeout_seconds=0.3)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertTrue(result["timed_out"])
+        self.assertEqual(result["status"], "error")
+        self.assertTrue(result["stdout_truncated"])
+        self.assertIn("bytes omitted", result["stdout"])
+        self.assertLess(len(result["stdout"]), 1200)
+        self.assertTrue(result["stdout"].startswith("severino\n"))
+        self.assertEqual(executor.get_stats()["timed_out"], 1)
+
+    def test_output_is_streamed_and_commands_are_killed_on_cancel(self):
+        executor = ShellExecutor()
+        cancel_event = threading.Event()
+        chunks = []
+        def on_output(stream, text):
+            chunks.append((stream, text))
+            cancel_event.set() # Cancel as soon as the command reports progress
+        result = executor.run("echo started; sleep 30; echo never", on_output=on_output, cancel_event=cancel_event)
+        self.assertEqual(result["status"], "cancelled")
+        self.assertEqual(chunks, [("stdout", "started\n")])
+        self.assertLess(result["duration_seconds"], 5)
+
+    def test_concurrent_commands_are_limited(self):
+        executor = ShellExecutor({"max_concurrent": 1, "queue_timeout_seconds": 0.1})
+        running = threading.Thread(target=executor.run, args=("sleep 1",))
+        running.start()
+        time.sleep(0.2)
+        self.assertEqual(executor.get_stats()["running"], 1)
+        self.assertIn("No free slot", executor.run("echo hi")["message"])
+        self.assertEqual(executor.cancel_all(), 1)
+        running.join(timeout=5)
+        self.assertFalse(running.is_alive())
+
+class TestCappedOutput(unittest.TestCase):
+
+    def test_head_and_tail_are_kept(self):
+        output = _CappedOutput(8)
+        for chunk in (b"abc", b"defgh", b"ijklmn"):
+            output.append(chunk)
+        self.assertTrue(output.truncated)
+        self.assertEqual(output.text(), "abcd\n...[6 bytes omitted]...\nklmn")
+
+if __name__ == '__main__':
+    unittest.main()
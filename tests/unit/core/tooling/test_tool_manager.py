@@ -1,8 +1,11 @@
 import unittest
+import asyncio
+import os
+import threading
 from unittest.mock import MagicMock, patch
 from typing import Any, Dict
 
-from src.core.tooling.tool_manager import ToolManager
+from src.core.tooling.tool_manager import ToolManager, _ArgsPreview, _build_dispatch
 from src.perception.sensors.base_sensor import SensorInterface
 from src.ml_models.base_ml_model import MLModelInterface
 from src.llm_inference.base_llm import LLMProviderInterface
@@ -22,6 +25,10 @@ class NotificationAction(ActionInterface):
     def get_status(self) -> Dict[str, Any]:
         return {"action_id": self.action_id, "type": "NotificationAction", "ready": True}
 
+# CPU-bound tool; module-level so it can run in the process pool
+def _checksum(data: str) -> Dict[str, Any]:
+    return {"checksum": sum(data.encode()), "pid": os.getpid()}
+
 class TestToolManager(unittest.TestCase):
 
     def setUp(self):
@@ -48,8 +55,9 @@ class TestToolManager(unittest.TestCase):
             factory_type="sensor", factory_name="video", config=config
         )
         self.assertIn("test_sensor", self.tool_manager._tools)
-        self.assertIn("test_sensor", self.tool_manager._tool_instances)
-        self.assertEqual(self.tool_manager._tool_instances["test_sensor"], mock_sensor_instance)
+        self.assertNotIn("test_sensor", self.tool_manager._tool_instances) # Instantiated on first use
+        mock_create_sensor.assert_not_called()
+        self.assertEqual(self.tool_manager.get_tool_instance("test_sensor"), mock_sensor_instance)
         mock_create_sensor.assert_called_once_with("video", "test_sensor", config)
 
     @patch('src.ml_models.ml_model_factory.MLModelFactory.create_model')
@@ -63,8 +71,9 @@ class TestToolManager(unittest.TestCase):
             factory_type="ml_model", factory_name="object_detector", config=config
         )
         self.assertIn("test_model", self.tool_manager._tools)
-        self.assertIn("test_model", self.tool_manager._tool_instances)
-        self.assertEqual(self.tool_manager._tool_instances["test_model"], mock_model_instance)
+        self.assertNotIn("test_model", self.tool_manager._tool_instances) # Instantiated on first use
+        mock_create_model.assert_not_called()
+        self.assertEqual(self.tool_manager.get_tool_instance("test_model"), mock_model_instance)
         mock_create_model.assert_called_once_with("object_detector", "test_model", config)
 
     @patch('src.llm_inference.llm_factory.LLMFactory.create_provider')
@@ -78,8 +87,9 @@ class TestToolManager(unittest.TestCase):
             factory_type="llm", factory_name="llama_cpp", config=config
         )
         self.assertIn("test_llm", self.tool_manager._tools)
-        self.assertIn("test_llm", self.tool_manager._tool_instances)
-        self.assertEqual(self.tool_manager._tool_instances["test_llm"], mock_llm_instance)
+        self.assertNotIn("test_llm", self.tool_manager._tool_instances) # Instantiated on first use
+        mock_create_provider.assert_not_called()
+        self.assertEqual(self.tool_manager.get_tool_instance("test_llm"), mock_llm_instance)
         mock_create_provider.assert_called_once_with("llama_cpp", "test_llm", config)
 
     def test_register_tool_action_factory(self):
@@ -114,6 +124,14 @@ class TestToolManager(unittest.TestCase):
         self.assertIn({"name": "tool1"}, all_defs)
         self.assertIn({"name": "tool2"}, all_defs)
 
+    def test_get_tool_names_by_factory_type(self):
+        self.tool_manager.register_tool({"name": "tool1"}, lambda: None)
+        self.tool_manager.register_tool({"name": "porch_camera"}, factory_type="sensor", factory_name="video", config={})
+        self.tool_manager.register_tool({"name": "garage_camera"}, factory_type="sensor", factory_name="video", config={})
+        self.tool_manager.register_tool({"name": "garage_camera"}, lambda: None) # No longer a sensor
+        self.assertEqual(self.tool_manager.get_tool_names(), ["tool1", "porch_camera", "garage_camera"])
+        self.assertEqual(self.tool_manager.get_tool_names("sensor"), ["porch_camera"])
+
     def test_execute_tool_not_found(self):
         with self.assertRaises(ValueError) as cm:
             self.tool_manager.execute_tool("non_existent_tool", {})
@@ -204,5 +222,124 @@ class TestToolManager(unittest.TestCase):
         result = self.tool_manager.execute_tool("test_action", {"payload": payload})
         self.assertEqual(result, {"status": "success", "message_sent": "Hello", "recipient": "user"})
 
+    def test_execute_tools_runs_calls_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+        def probe(device: str):
+            barrier.wait() # All three probes must be running at the same time
+            return {"device": device, "ok": True}
+        self.tool_manager.register_tool({"name": "probe", "side_effects": False}, implementation=probe)
+        self.addCleanup(self.tool_manager.shutdown)
+
+        results = self.tool_manager.execute_tools([{"tool_name": "probe", "args": {"device": device}} for device in ("cam", "mic", "disk")]
+                                                  + [{"tool_name": "missing", "args": {}}])
+        self.assertEqual([result.get("device") for result in results[:3]], ["cam", "mic", "disk"])
+        self.assertEqual(results[3], {"status": "error", "message": "Tool 'missing' not found."})
+
+    def test_execute_tool_async_uses_confirmation_callback(self):
+        decisions = []
+        async def confirm(tool_name, tool_definition, args):
+            decisions.append(tool_name)
+            return args["command"] != "rm -rf /"
+        tool_manager = ToolManager(confirmation_callback=confirm)
+        self.addCleanup(tool_manager.shutdown)
+        tool_manager.register_tool({"name": "shell", "side_effects": True}, implementation=lambda command: {"ran": command})
+
+        async def run():
+            return await tool_manager.execute_tools_async([{"tool_name": "shell", "args": {"command": "ls"}},
+                                                           {"tool_name": "shell", "args": {"command": "rm -rf /"}}])
+        with patch('builtins.input') as mock_input:
+            results = asyncio.run(run())
+            self.assertEqual(tool_manager.execute_tool("shell", {"command": "pwd"}), {"ran": "pwd"}) # Coroutine callbacks also work synchronously
+        mock_input.assert_not_called()
+        self.assertEqual(results[0], {"ran": "ls"})
+        self.assertEqual(results[1]["status"], "cancelled")
+        self.assertEqual(len(decisions), 3)
+
+    def test_cpu_bound_tools_run_in_a_process_pool(self):
+        tool_manager = ToolManager(max_processes=1)
+        self.addCleanup(tool_manager.shutdown)
+        tool_manager.register_tool({"name": "checksum", "side_effects": False, "cpu_bound": True}, implementation=_checksum)
+        tool_manager.register_tool({"name": "local_checksum", "side_effects": False, "cpu_bound": True},
+                                   implementation=lambda data: {"pid": os.getpid()}) # Not picklable, falls back to a thread
+
+        results = tool_manager.execute_tools([{"tool_name": "checksum", "args": {"data": "abc"}},
+                                              {"tool_name": "local_checksum", "args": {"data": "abc"}}])
+        self.assertEqual(results[0]["checksum"], 294)
+        self.assertNotEqual(results[0]["pid"], os.getpid())
+        self.assertEqual(results[1]["pid"], os.getpid())
+
+    @patch('src.ml_models.ml_model_factory.MLModelFactory.create_model')
+    def test_idle_models_are_unloaded_and_reloaded_transparently(self, mock_create_model):
+        first, second = MagicMock(spec=MLModelInterface), MagicMock(spec=MLModelInterface)
+        for model in (first, second):
+            model.load_model.return_value = True
+            model.predict.return_value = [{"class": "person"}]
+        mock_create_model.side_effect = [first, second]
+        tool_manager = ToolManager(eviction_config={"idle_seconds": 60, "memory_threshold_percent": None, "check_interval_seconds": 3600})
+        self.addCleanup(tool_manager.shutdown)
+        tool_manager.register_tool({"name": "detector", "side_effects": False}, factory_type="ml_model", factory_name="object_detector", config={})
+        mock_create_model.assert_not_called()
+
+        with patch('src.core.tooling.tool_manager.time.monotonic', return_value=100.0):
+            self.assertTrue(tool_manager.execute_tool("detector", {"operation": "load_model"}))
+            self.assertEqual(tool_manager.evict_idle_tools(), []) # Just used
+        with patch('src.core.tooling.tool_manager.time.monotonic', return_value=200.0):
+            self.assertEqual(tool_manager.evict_idle_tools(), ["detector"])
+        self.assertNotIn("detector", tool_manager._tool_instances)
+
+        frame = MagicMock()
+        self.assertEqual(tool_manager.execute_tool("detector", {"operation": "predict", "data": frame}), [{"class": "person"}])
+        second.load_model.assert_called_once() # Replayed before serving the call
+        second.predict.assert_called_once_with(frame)
+        self.assertEqual([(event["event"], event["detail"]) for event in tool_manager.get_lifecycle_events()],
+                         [("instantiated", None), ("unloaded", "idle"), ("instantiated", None), ("reloaded", "load_model")])
+
+    @patch('src.core.tooling.tool_manager.psutil.virtual_memory')
+    @patch('src.llm_inference.llm_factory.LLMFactory.create_provider')
+    def test_least_recently_used_instances_are_unloaded_under_memory_pressure(self, mock_create_provider, mock_virtual_memory):
+        mock_create_provider.side_effect = lambda factory_name, tool_name, config: MagicMock(spec=LLMProviderInterface)
+        mock_virtual_memory.return_value = MagicMock(percent=50.0)
+        tool_manager = ToolManager(eviction_config={"memory_threshold_percent": 90, "check_interval_seconds": 3600})
+        self.addCleanup(tool_manager.shutdown)
+        for name in ("planner_llm", "summary_llm"):
+            tool_manager.register_tool({"name": name, "side_effects": True}, factory_type="llm", factory_name="llama_cpp", config={})
+            tool_manager.execute_tool(name, {"operation": "load_llm"}, require_confirmation=False)
+
+        mock_virtual_memory.return_value = MagicMock(percent=95.0)
+        tool_manager.register_tool({"name": "vision_llm", "side_effects": True}, factory_type="llm", factory_name="llama_cpp", config={})
+        tool_manager.execute_tool("vision_llm", {"operation": "load_llm"}, require_confirmation=False)
+        self.assertEqual(sorted(tool_manager._tool_instances), ["summary_llm", "vision_llm"])
+        self.assertIn({"tool_name": "planner_llm", "event": "unloaded", "detail": "memory pressure"},
+                      [{key: event[key] for key in ("tool_name", "event", "detail")} for event in tool_manager.get_lifecycle_events()])
+
+    @patch('src.perception.sensor_factory.SensorFactory.create_sensor')
+    def test_operations_dispatch_through_a_table_built_once_per_instance(self, mock_create_sensor):
+        mock_sensor_instance = MagicMock(spec=SensorInterface)
+        mock_sensor_instance.read_data.return_value = "frame"
+        mock_create_sensor.return_value = mock_sensor_instance
+        self.tool_manager.register_tool({"name": "camera", "side_effects": False}, factory_type="sensor", factory_name="video", config={})
+
+        with patch('src.core.tooling.tool_manager._build_dispatch', wraps=_build_dispatch) as mock_build:
+            self.assertEqual([self.tool_manager.execute_tool("camera", {}) for _ in range(3)], ["frame"] * 3) # read_data by default
+            with self.assertRaisesRegex(ValueError, "Unsupported sensor operation: predict"):
+                self.tool_manager.execute_tool("camera", {"operation": "predict"})
+        mock_build.assert_called_once_with(mock_sensor_instance)
+        self.assertEqual(mock_sensor_instance.read_data.call_count, 3)
+
+    def test_argument_logging_is_lazy_and_capped(self):
+        class Frame:
+            shape = (1080, 1920, 3)
+            def __repr__(self):
+                raise AssertionError("Frames must not be rendered")
+        preview = _ArgsPreview({"operation": "predict", "data": Frame(), "prompt": "x" * 10000})
+        text = str(preview)
+        self.assertIn("data=<Frame shape=(1080, 1920, 3)>", text)
+        self.assertLessEqual(len(text), _ArgsPreview.MAX_CHARS + 3)
+
+        with patch('src.core.tooling.tool_manager._ArgsPreview.__str__') as mock_str:
+            self.tool_manager.register_tool({"name": "echo", "side_effects": False}, implementation=lambda text: text)
+            self.assertEqual(self.tool_manager.execute_tool("echo", {"text": "hi"}), "hi")
+        mock_str.assert_not_called() # Debug logging is off
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,68 @@
+import unittest
+import threading
+from unittest.mock import patch
+
+from src.core.tooling.tool_manager import ToolManager
+from src.core.tooling.tool_metrics import ToolMetrics
+
+class TestToolMetrics(unittest.TestCase):
+
+    def test_percentiles_are_estimated_from_the_histogram(self):
+        metrics = ToolMetrics()
+        for _ in range(90):
+            metrics.begin("camera", "read_data")
+            metrics.end("camera", "read_data", 0.010)
+        for _ in range(10):
+            metrics.begin("camera", "read_data")
+            metrics.end("camera", "read_data", 2.0, "errors")
+
+        snapshot = metrics.get_metrics()["tools"]["camera"]["operations"]["read_data"]
+        self.assertEqual((snapshot["calls"], snapshot["errors"], snapshot["in_flight"]), (100, 10, 0))
+        self.assertAlmostEqual(snapshot["p50_seconds"], 0.010, delta=0.003)
+        self.assertAlmostEqual(snapshot["p95_seconds"], 2.0, delta=0.5)
+        self.assertEqual(snapshot["max_seconds"], 2.0)
+        self.assertAlmostEqual(snapshot["total_seconds"], 20.9)
+
+        metrics.reset()
+        self.assertEqual(metrics.get_metrics()["tools"], {})
+
+    def test_tool_manager_records_outcomes_per_tool_and_operation(self):
+        tool_manager = ToolManager(memoization_config={})
+        self.addCleanup(tool_manager.shutdown)
+        release, started = threading.Event(), threading.Event()
+        def probe(device: str):
+            if device == "slow":
+                started.set()
+                release.wait(5)
+            if device == "dead":
+                raise ConnectionError("unreachable")
+            return {"status": "success", "device": device}
+        tool_manager.register_tool({"name": "probe", "side_effects": False, "parameters": {"device": {"type": "string"}}}, implementation=probe)
+        tool_manager.register_tool({"name": "alert", "side_effects": True}, implementation=lambda message: {"sent": message})
+
+        tool_manager.execute_tool("probe", {"device": "cam"})
+        tool_manager.execute_tool("probe", {"device": "cam"}) # Memoized
+        tool_manager.execute_tool("probe", {"device": "dead"})
+        tool_manager.execute_tool("probe", {"device": 42})
+        with patch('builtins.input', return_value='no'):
+            tool_manager.execute_tool("alert", {"message": "hi"})
+
+        slow = threading.Thread(target=tool_manager.execute_tool, args=("probe", {"device": "slow"}))
+        slow.start()
+        started.wait(5)
+        self.assertEqual(tool_manager.get_metrics("probe")["tools"]["probe"]["in_flight"], 1)
+        release.set()
+        slow.join(5)
+
+        metrics = tool_manager.get_metrics()["tools"]
+        probe_metrics = metrics["probe"]["operations"]["call"]
+        self.assertEqual((probe_metrics["calls"], probe_metrics["errors"], probe_metrics["invalid"], probe_metrics["cache_hits"]), (4, 1, 1, 1))
+        self.assertEqual(probe_metrics["in_flight"], 0)
+        self.assertIsNotNone(probe_metrics["p99_seconds"])
+        self.assertEqual((metrics["alert"]["calls"], metrics["alert"]["cancelled"]), (0, 1))
+
+        tool_manager.reset_metrics()
+        self.assertEqual(tool_manager.get_metrics()["tools"], {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from src.core.tooling.tool_manager import ToolManager
+from src.core.tooling.tool_result_cache import ToolResultCache
+from src.llm_inference.base_llm import LLMProviderInterface
+from src.perception.sensors.base_sensor import SensorInterface
+
+def _read_file(absolute_path):
+    with open(absolute_path) as f:
+        return {"status": "success", "content": f.read()}
+
+class TestToolResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tool_manager = ToolManager(memoization_config={"max_entries": 2, "ttl_seconds": {"get_status": 5}})
+        self.calls = []
+
+    def register(self, name, side_effects=False, **definition):
+        def implementation(**kwargs):
+            self.calls.append((name, kwargs))
+            return {"status": "success", "call": len(self.calls)}
+        self.tool_manager.register_tool({"name": name, "side_effects": side_effects, **definition}, implementation=implementation)
+
+    def test_identical_side_effect_free_calls_are_reused(self):
+        self.register("get_status")
+        first = self.tool_manager.execute_tool("get_status", {"verbose": True, "device": "cam"})
+        second = self.tool_manager.execute_tool("get_status", {"device": "cam", "verbose": True}) # Same arguments, other order
+        self.tool_manager.execute_tool("get_status", {"device": "mic", "verbose": True})
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.calls), 2)
+        stats = self.tool_manager.get_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+
+    def test_side_effects_and_nondeterministic_calls_are_not_memoized(self):
+        self.register("send_alert", side_effects=True)
+        self.register("probe")
+        self.tool_manager.execute_tool("send_alert", {"message": "hi"}, require_confirmation=False)
+        self.tool_manager.execute_tool("send_alert", {"message": "hi"}, require_confirmation=False)
+        self.tool_manager.execute_tool("probe", {"operation": "read_data"})
+        self.tool_manager.execute_tool("probe", {"operation": "read_data"})
+        self.assertEqual(len(self.calls), 4)
+
+        llm = MagicMock(spec=LLMProviderInterface)
+        llm.generate_response.return_value = {"generated_text": "Paris"}
+        with patch('src.llm_inference.llm_factory.LLMFactory.create_provider', return_value=llm):
+            self.tool_manager.register_tool({"name": "llm", "side_effects": False}, factory_type="llm", factory_name="llama_cpp", config={})
+            for temperature in (0.0, 0.0, 0.7, 0.7):
+                self.tool_manager.execute_tool("llm", {"operation": "generate_response", "prompt": "Capital of France?", "temperature": temperature})
+        self.assertEqual(llm.generate_response.call_count, 3)
+
+    def test_ttl_and_lru_eviction(self):
+        self.register("get_status")
+        self.register("lookup")
+        with patch('src.core.tooling.tool_result_cache.time.monotonic', return_value=100.0):
+            self.tool_manager.execute_tool("get_status", {})
+        with patch('src.core.tooling.tool_result_cache.time.monotonic', return_value=106.0):
+            self.tool_manager.execute_tool("get_status", {}) # Expired after its 5s TTL
+        for key in ("a", "b", "c", "a"):
+            self.tool_manager.execute_tool("lookup", {"key": key})
+        self.assertEqual(len(self.calls), 6) # 'a' was evicted by 'b' and 'c'
+        stats = self.tool_manager.get_cache_stats()
+        self.assertEqual((stats["expired"], stats["entries"]), (1, 2))
+        self.assertGreater(stats["evicted"], 0)
+
+    def test_read_file_is_invalidated_when_the_file_changes(self):
+        self.tool_manager.register_tool({"name": "read_file", "side_effects": False}, implementation=_read_file)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "notes.txt")
+            with open(path, "w") as f:
+                f.write("one")
+            self.assertEqual(self.tool_manager.execute_tool("read_file", {"absolute_path": path})["content"], "one")
+            with open(path, "w") as f:
+                f.write("two!")
+            self.assertEqual(self.tool_manager.execute_tool("read_file", {"absolute_path": path})["content"], "two!")
+            self.assertEqual(self.tool_manager.execute_tool("read_file", {"absolute_path": path})["content"], "two!")
+        stats = self.tool_manager.get_cache_stats()
+        self.assertEqual((stats["invalidated"], stats["hits"]), (1, 1))
+
+    @patch('src.perception.sensor_factory.SensorFactory.create_sensor')
+    def test_state_changing_operations_invalidate_the_tool(self, mock_create_sensor):
+        camera = MagicMock(spec=SensorInterface)
+        connected = []
+        camera.connect.side_effect = lambda: connected.append(True) or True
+        camera.release.side_effect = lambda: connected.clear()
+        camera.get_status.side_effect = lambda: {"connected": bool(connected)}
+        mock_create_sensor.return_value = camera
+        self.tool_manager.register_tool({"name": "camera", "side_effects": False}, factory_type="sensor", factory_name="video", config={})
+        self.register("lookup")
+        self.tool_manager.execute_tool("lookup", {"key": "a"})
+
+        self.assertEqual(self.tool_manager.execute_tool("camera", {"operation": "get_status"}), {"connected": False})
+        self.tool_manager.execute_tool("camera", {"operation": "connect"})
+        self.assertEqual(self.tool_manager.execute_tool("camera", {"operation": "get_status"}), {"connected": True})
+        self.assertEqual(self.tool_manager.execute_tool("camera", {"operation": "get_status"}), {"connected": True}) # Memoized again
+        self.tool_manager.execute_tool("camera", {"operation": "release"})
+        self.assertEqual(self.tool_manager.execute_tool("camera", {"operation": "get_status"}), {"connected": False})
+        self.assertEqual(camera.get_status.call_count, 3)
+
+        self.tool_manager.execute_tool("lookup", {"key": "a"})
+        self.assertEqual(len(self.calls), 1) # Other tools keep their results
+
+    def test_results_of_calls_racing_an_invalidation_are_not_stored(self):
+        cache = ToolResultCache()
+        key = ("detector", "status")
+        version = cache.version("detector", {})
+        cache.invalidate("detector") # load_model finished while get_status was running
+        cache.store(key, {"loaded": False}, 60, version)
+        self.assertEqual(cache.lookup(key, cache.version("detector", {})), (False, None))
+
+    def test_disabled_by_default(self):
+        tool_manager = ToolManager()
+        tool_manager.register_tool({"name": "get_status", "side_effects": False}, implementation=lambda: self.calls.append(1))
+        tool_manager.execute_tool("get_status", {})
+        tool_manager.execute_tool("get_status", {})
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(tool_manager.get_cache_stats(), {})
+
+if __name__ == '__main__':
+    unittest.main()
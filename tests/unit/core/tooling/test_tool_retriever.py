@@ -0,0 +1,66 @@
+import unittest
+import json
+
+from src.core.tooling.tool_manager import ToolManager
+from src.core.tooling.tool_retriever import ToolRetriever
+
+# Toy embeddings: camera-related texts point one way, everything else the other
+def fake_embed(texts):
+    return [[1.0, 0.0] if "camera" in text.lower() or "frame" in text.lower() else [0.0, 1.0] for text in texts]
+
+class TestToolRetriever(unittest.TestCase):
+
+    def setUp(self):
+        self.tool_manager = ToolManager()
+        self.register("main_camera_sensor", "Main video camera sensor.", tags=["video_camera"])
+        self.register("object_detection_model", "YOLOv8 object detection model.", tags=["object_detection"])
+        self.register("run_shell_command", "Executes a shell command.")
+        for index in range(40):
+            self.register(f"disk_probe_{index}", f"Reports usage of disk {index}.")
+        self.embedded = []
+
+    def register(self, name, description, tags=None):
+        definition = {"name": name, "description": description, "parameters": {"operation": {"type": "string"}}}
+        if tags:
+            definition["tags"] = tags
+        self.tool_manager.register_tool(definition, implementation=lambda **kwargs: None)
+
+    def embed(self, texts):
+        self.embedded.extend(texts)
+        return fake_embed(texts)
+
+    def test_selects_relevant_tools(self):
+        retriever = ToolRetriever(self.tool_manager, {"top_k": 2, "always_include": ["run_shell_command"]}, embed_fn=self.embed)
+        selected = retriever.select("Watch the balcony camera for people", {"sensors": ["video_camera"], "ml_models": ["object_detection"]})
+        self.assertEqual(selected[0], "run_shell_command")
+        self.assertEqual(set(selected[1:]), {"main_camera_sensor", "object_detection_model"})
+
+    def test_catalog_size_stays_constant_as_registry_grows(self):
+        retriever = ToolRetriever(self.tool_manager, {"top_k": 3}, embed_fn=fake_embed)
+        small = retriever.catalog("Check the camera", {"sensors": ["video_camera"]})
+        for index in range(40, 200):
+            self.register(f"disk_probe_{index}", f"Reports usage of disk {index}.")
+        large = retriever.catalog("Check the camera", {"sensors": ["video_camera"]})
+
+        self.assertEqual(small, large)
+        self.assertEqual(json.loads(large)[0]["name"], "main_camera_sensor")
+        self.assertLess(retriever.get_stats()["catalog_ratio"], 0.1)
+
+    def test_token_budget_caps_catalog(self):
+        retriever = ToolRetriever(self.tool_manager, {"top_k": 50, "token_budget": 60}, embed_fn=fake_embed)
+        catalog = retriever.catalog("Report disk usage")
+        self.assertLessEqual(len(catalog) // 4, 70)
+        self.assertGreater(len(json.loads(catalog)), 0)
+
+    def test_snippets_are_indexed_once(self):
+        retriever = ToolRetriever(self.tool_manager, embed_fn=self.embed)
+        retriever.refresh()
+        indexed = len(self.embedded)
+        retriever.catalog("Check the camera")
+        self.register("run_shell_command", "Executes a shell command with a timeout.") # Redefined tools are re-indexed
+        retriever.refresh()
+        self.assertEqual(len(self.embedded), indexed + 2) # The query, then the redefined tool
+        self.assertEqual(retriever.get_stats()["tools_indexed"], 43)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -120,5 +120,55 @@ class TestLlamaCppProvider(unittest.TestCase):
         self.assertEqual(status["n_gpu_layers"], self.config["n_gpu_layers"])
         self.assertEqual(status["n_ctx"], self.config["n_ctx"])
 
+    @patch('os.path.exists', return_value=True)
+    @patch('src.llm_inference.providers.llama_cpp_provider.Llama')
+    @patch('src.llm_inference.providers.llama_cpp_provider.open', new_callable=mock_open)
+    def test_count_tokens_uses_model_tokenizer(self, mock_file_open, mock_llama_class, mock_exists):
+        mock_llama_instance = MagicMock()
+        mock_llama_instance.tokenize.return_value = [1, 2, 3]
+        mock_llama_class.return_value = mock_llama_instance
+
+        provider = LlamaCppProvider(self.provider_id, self.config)
+        self.assertEqual(provider.count_tokens("Hello LLM"), 3) # Estimate before loading: 9 chars -> 3 tokens
+        mock_llama_instance.tokenize.assert_not_called()
+
+        provider.load_llm()
+        self.assertEqual(provider.count_tokens("Hello LLM"), 3)
+        mock_llama_instance.tokenize.assert_called_once_with(b"Hello LLM", add_bos=False)
+
+    @patch('os.path.exists', return_value=True)
+    @patch('src.llm_inference.providers.llama_cpp_provider.LlamaGrammar')
+    @patch('src.llm_inference.providers.llama_cpp_provider.Llama')
+    @patch('src.llm_inference.providers.llama_cpp_provider.open', new_callable=mock_open)
+    def test_generate_structured_uses_cached_grammar(self, mock_file_open, mock_llama_class, mock_grammar_class, mock_exists):
+        mock_llama_instance = MagicMock()
+        mock_llama_instance.return_value = {
+            "choices": [{"text": '{"goal": "safety"}'}],
+            "usage": {"completion_tokens": 6}
+        }
+        mock_llama_class.return_value = mock_llama_instance
+        schema = {"type": "object", "properties": {"goal": {"type": "string"}}, "required": ["goal"]}
+
+        provider = LlamaCppProvider(self.provider_id, self.config)
+        provider.load_llm()
+        response = provider.generate_structured("Prompt", schema, max_tokens=50, temperature=0.2)
+        provider.generate_structured("Prompt", schema, max_tokens=50, temperature=0.2)
+
+        self.assertEqual(response["data"], {"goal": "safety"})
+        self.assertEqual(response["tokens_generated"], 6)
+        mock_grammar_class.from_json_schema.assert_called_once()
+        self.assertIs(mock_llama_instance.call_args.kwargs["grammar"], mock_grammar_class.from_json_schema.return_value)
+
+    def test_generate_structured_llm_not_loaded(self):
+        provider = LlamaCppProvider(self.provider_id, self.config)
+        response = provider.generate_structured("Prompt", {"type": "object"}, max_tokens=10)
+        self.assertIsNone(response["data"])
+        self.assertEqual(response["tokens_generated"], 0)
+
+    def test_parse_json_output_ignores_surrounding_text(self):
+        self.assertEqual(LLMProviderInterface.parse_json_output('Sure! {"a": [1, 2]} Hope this helps.'), {"a": [1, 2]})
+        self.assertEqual(LLMProviderInterface.parse_json_output('[{"description": "x"}]'), [{"description": "x"}])
+        self.assertIsNone(LLMProviderInterface.parse_json_output('{"a": '))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+from src.llm_inference.base_llm import LLMProviderInterface
+from src.llm_inference.inference_queue import InferenceQueue
+
+class TestInferenceQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_llm_provider = MagicMock(spec=LLMProviderInterface)
+        self.inference_queue = InferenceQueue(self.mock_llm_provider)
+        self.addCleanup(self.inference_queue.shutdown)
+
+    def test_generate_response_delegates_to_provider(self):
+        self.mock_llm_provider.generate_response.return_value = {"generated_text": "hi", "tokens_generated": 1}
+        result = self.inference_queue.generate_response("hello", max_tokens=10, temperature=0.2)
+        self.assertEqual(result, {"generated_text": "hi", "tokens_generated": 1})
+        self.mock_llm_provider.generate_response.assert_called_once_with("hello", max_tokens=10, temperature=0.2)
+
+    def test_generate_structured_delegates_to_provider(self):
+        schema = {"type": "object"}
+        self.mock_llm_provider.generate_structured.return_value = {"generated_text": "{}", "tokens_generated": 1, "data": {}}
+        result = self.inference_queue.generate_structured("hello", schema, max_tokens=10, temperature=0.2)
+        self.assertEqual(result["data"], {})
+        self.mock_llm_provider.generate_structured.assert_called_once_with("hello", schema, max_tokens=10, temperature=0.2)
+
+    def test_generate_structured_batch_is_one_queue_entry(self):
+        self.mock_llm_provider.generate_structured_batch.return_value = [{"data": 1}, {"data": 2}]
+        result = self.inference_queue.generate_structured_batch(["a", "b"], {"type": "integer"}, max_tokens=10, temperature=0.2)
+        self.assertEqual(result, [{"data": 1}, {"data": 2}])
+        self.mock_llm_provider.generate_structured_batch.assert_called_once_with(["a", "b"], {"type": "integer"}, max_tokens=10, temperature=0.2)
+
+    def test_requests_never_overlap(self):
+        active = []
+        overlaps = []
+        lock = threading.Lock()
+
+        def generate_response(prompt, max_tokens, temperature):
+            with lock:
+                active.append(prompt)
+                if len(active) > 1:
+                    overlaps.append(list(active))
+            time.sleep(0.01)
+            with lock:
+                active.remove(prompt)
+            return {"generated_text": prompt, "tokens_generated": 1}
+        self.mock_llm_provider.generate_response.side_effect = generate_response
+
+        async def run():
+            return await asyncio.gather(*(self.inference_queue.generate_response_async(f"p{i}", max_tokens=5, temperature=0.0) for i in range(5)))
+        results = asyncio.run(run())
+
+        self.assertEqual([r["generated_text"] for r in results], [f"p{i}" for i in range(5)])
+        self.assertEqual(overlaps, [])
+
+if __name__ == '__main__':
+    unittest.main()